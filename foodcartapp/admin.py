@@ -1,24 +1,141 @@
-from django.contrib import admin
-from django.shortcuts import redirect, reverse
-from django.templatetags.static import static
+import io
+
+import requests
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.forms.models import BaseInlineFormSet
+from django.http import QueryDict
+from django.shortcuts import redirect, render, reverse
+from django.urls import path
 from django.utils.html import format_html
 from django.utils.http import url_has_allowed_host_and_scheme
 
-from .models import (Order, OrderItem, Product, ProductCategory, Restaurant,
-                     RestaurantMenuItem)
+from .menu_import import import_menu
+from .models import (ArchivedOrder, ArchivedOrderItem, Order, OrderItem,
+                     Product, ProductCategory, Restaurant, RestaurantMenuItem)
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """Autocomplete that renders the selected object from `preloaded` instead of querying it for each row."""
+    preloaded = None
+
+    def optgroups(self, name, value, attr=None):
+        selected_choices = {str(v) for v in value if str(v) not in self.choices.field.empty_values}
+        preloaded = self.preloaded or {}
+        if not selected_choices.issubset(preloaded):
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required and not self.allow_multiple_selected:
+            options.append(self.create_option(name, '', '', False, 0))
+        for key in selected_choices:
+            obj = preloaded[key]
+            label = self.choices.field.label_from_instance(obj)
+            options.append(self.create_option(name, obj.pk, label, selected_choices, len(options)))
+        return [(None, options, 0)]
+
+
+class RelatedChoicesOnceMixin:
+    """Query foreign key choices once per formset instead of once per inline row.
+
+    Fields from `autocomplete_fields` list no choices at all, their selected
+    objects are taken from the related objects loaded with the inline rows.
+    """
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name in self.get_autocomplete_fields(request) and 'widget' not in kwargs:
+            kwargs['widget'] = PreloadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site, using=kwargs.get('using'))
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if formfield is not None and not isinstance(formfield.widget, AutocompleteSelect):
+            formfield.choices = list(formfield.choices)
+        return formfield
+
+
+class PaginatedInlineFormSet(BaseInlineFormSet):
+    """Inline formset showing one page of related objects.
+
+    The page number comes from the `<prefix>-page` query parameter, the
+    change form posts to the same URL, so saving keeps the page. Page links
+    keep the other query parameters, such as `_changelist_filters`.
+    """
+    per_page = 50
+    page_number = 1
+    query_params = QueryDict()
+
+    def get_queryset(self):
+        if not hasattr(self, '_page_queryset'):
+            # pages of an unordered queryset may repeat or skip rows
+            self.paginator = Paginator(super().get_queryset().order_by('pk'), self.per_page)
+            self.page = self.paginator.get_page(self.page_number)
+            self._page_queryset = self.page.object_list
+        return self._page_queryset
+
+    @classmethod
+    def get_page_param(cls):
+        return f'{cls.get_default_prefix()}-page'
+
+    def get_page_links(self):
+        """`(page number, query string)` for every page."""
+        params = self.query_params.copy()
+        links = []
+        for number in self.paginator.page_range:
+            params[self.get_page_param()] = number
+            links.append((number, params.urlencode()))
+        return links
 
+    def _construct_form(self, i, **kwargs):
+        form = super()._construct_form(i, **kwargs)
+        for name, field in form.fields.items():
+            widget = getattr(field.widget, 'widget', field.widget)
+            related = form.instance._state.fields_cache.get(name) if form.instance.pk else None
+            if isinstance(widget, PreloadedAutocompleteSelect) and related is not None:
+                widget.preloaded = {str(related.pk): related}
+        return form
 
-class RestaurantMenuItemInline(admin.TabularInline):
+
+class PaginatedInlineMixin:
+    formset = PaginatedInlineFormSet
+    template = 'admin/edit_inline/paginated_tabular.html'
+    per_page = 50
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        return type(formset.__name__, (formset,), {
+            'per_page': self.per_page,
+            'page_number': request.GET.get(formset.get_page_param(), 1),
+            'query_params': request.GET,
+        })
+
+
+class MenuImportForm(forms.Form):
+    file = forms.FileField(label='CSV-файл')
+
+
+class RestaurantMenuItemInline(PaginatedInlineMixin, RelatedChoicesOnceMixin, admin.TabularInline):
     model = RestaurantMenuItem
     extra = 0
+    autocomplete_fields = ['restaurant', 'product']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('restaurant', 'product')
 
 
-class OrderItemInline(admin.TabularInline):
+class OrderItemInline(RelatedChoicesOnceMixin, admin.TabularInline):
     model = OrderItem
+    autocomplete_fields = ['product']
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('order', 'product')
 
 
 @admin.register(Restaurant)
 class RestaurantAdmin(admin.ModelAdmin):
+    changelist_query_budget = 6
+    change_form_query_budget = 8
+
     search_fields = [
         'name',
         'address',
@@ -28,14 +145,55 @@ class RestaurantAdmin(admin.ModelAdmin):
         'name',
         'address',
         'contact_phone',
+        'capacity',
     ]
     inlines = [
         RestaurantMenuItemInline
     ]
 
+    def get_urls(self):
+        return [
+            path('import-menu/', self.admin_site.admin_view(self.import_menu_view),
+                 name='foodcartapp_restaurant_import_menu'),
+            *super().get_urls(),
+        ]
+
+    def import_menu_view(self, request):
+        if not self.has_change_permission(request):
+            raise PermissionDenied
+        report = None
+        form = MenuImportForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            csv_file = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+            report = import_menu(csv_file)
+        return render(request, 'admin/foodcartapp/restaurant/import_menu.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Импорт меню из CSV',
+            'form': form,
+            'report': report,
+        })
+
+    def save_model(self, request, obj, form, change):
+        coordinates_edited = {'latitude', 'longitude'} & set(form.changed_data)
+        if not coordinates_edited and ('address' in form.changed_data or obj.coordinates is None):
+            try:
+                obj.geocode_address()
+            except requests.exceptions.RequestException:
+                self.message_user(request, 'Геокодер не ответил, ресторан сохранён без координат. Сохраните его '
+                                           'ещё раз позже или запустите команду geocode_restaurants.', messages.WARNING)
+            else:
+                if obj.address and obj.coordinates is None:
+                    self.message_user(request, 'Геокодер не нашёл адрес, ресторан сохранён без координат.',
+                                      messages.WARNING)
+        super().save_model(request, obj, form, change)
+
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
+    changelist_query_budget = 7
+    change_form_query_budget = 9
+
     list_display = [
         'get_image_list_preview',
         'name',
@@ -45,6 +203,9 @@ class ProductAdmin(admin.ModelAdmin):
     list_display_links = [
         'name',
     ]
+    list_select_related = [
+        'category',
+    ]
     list_filter = [
         'category',
     ]
@@ -86,14 +247,14 @@ class ProductAdmin(admin.ModelAdmin):
     class Media:
         css = {
             "all": (
-                static("admin/foodcartapp.css")
+                "admin/foodcartapp.css",
             )
         }
 
     def get_image_preview(self, obj):
         if not obj.image:
             return 'выберите картинку'
-        return format_html('<img src="{url}" height="200"/>', url=obj.image.url)
+        return format_html('<img src="{url}" height="200"/>', url=obj.get_image_url('medium'))
 
     get_image_preview.short_description = 'превью'
 
@@ -102,7 +263,7 @@ class ProductAdmin(admin.ModelAdmin):
             return 'нет картинки'
         edit_url = reverse('admin:foodcartapp_product_change', args=(obj.id,))
         return format_html('<a href="{edit_url}"><img src="{src}" height="50"/></a>', edit_url=edit_url,
-                           src=obj.image.url)
+                           src=obj.small_image_url)
 
     get_image_list_preview.short_description = 'превью'
 
@@ -121,6 +282,9 @@ order_name.short_description = 'Заказ'
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
+    changelist_query_budget = 6
+    change_form_query_budget = 18
+
     def response_post_save_change(self, request, obj):
         res = super().response_post_save_change(request, obj)
         next_page = request.GET.get('next')
@@ -135,8 +299,56 @@ class OrderAdmin(admin.ModelAdmin):
         'phonenumber',
     ]
     list_display = [
-        order_name
+        order_name,
+        'total_price',
+    ]
+    readonly_fields = [
+        'total_price',
     ]
     inlines = [
         OrderItemInline
     ]
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.update_total_price()
+
+
+class ReadOnlyAdminMixin:
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class ArchivedOrderItemInline(ReadOnlyAdminMixin, admin.TabularInline):
+    model = ArchivedOrderItem
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('product', 'order')
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(ReadOnlyAdminMixin, admin.ModelAdmin):
+    changelist_query_budget = 8
+    change_form_query_budget = 8
+
+    search_fields = [
+        'firstname',
+        'lastname',
+        'address',
+        'phonenumber',
+    ]
+    list_display = [
+        order_name,
+        'total_price',
+        'delivered',
+    ]
+    date_hierarchy = 'created'
+    inlines = [
+        ArchivedOrderItemInline
+    ]
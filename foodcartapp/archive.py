@@ -0,0 +1,55 @@
+"""Move finished orders from the hot `Order`/`OrderItem` tables to the archive ones."""
+from django.db import transaction
+from django.db.models import Q
+
+from foodcartapp.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem
+
+ARCHIVED_FIELDS = [
+    'id', 'firstname', 'lastname', 'address', 'phonenumber', 'order_status', 'comment',
+    'created', 'called', 'delivered', 'payment', 'restaurant_id', 'total_price',
+]
+
+
+class ArchiveConflict(Exception):
+    """The archive already has orders with the ids of the orders being archived."""
+
+
+def archivable_orders(finished_before):
+    """Orders finished before the moment, orders without a delivery time count by creation time.
+
+    Orders not yet counted in the sales rollups stay until `refresh_sales_rollups`.
+    """
+    return Order.objects.filter(order_status='finished', rollup_dirty=False).filter(
+        Q(delivered__lt=finished_before) | Q(delivered__isnull=True, created__lt=finished_before)
+    )
+
+
+@transaction.atomic
+def archive_batch(order_ids):
+    """Copy the orders with their items to the archive and delete them. Returns the number of orders moved.
+
+    Raises `ArchiveConflict` without moving anything if an order id is already in the archive.
+    """
+    orders = list(Order.objects.filter(pk__in=order_ids).values(*ARCHIVED_FIELDS))
+    if not orders:
+        return 0
+    # a batch is moved in one transaction, so a taken id belongs to another order, e.g. after a sequence reset
+    taken = sorted(ArchivedOrder.objects.filter(pk__in=order_ids).values_list('pk', flat=True))
+    if taken:
+        raise ArchiveConflict(f'Archived orders with the same ids already exist: {", ".join(map(str, taken))}')
+    items = OrderItem.objects.filter(order_id__in=order_ids).values('order_id', 'product_id', 'quantity', 'price')
+
+    ArchivedOrder.objects.bulk_create([ArchivedOrder(**order) for order in orders])
+    ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**item) for item in items])
+    OrderItem.objects.filter(order_id__in=order_ids).delete()
+    Order.objects.filter(pk__in=order_ids).delete()
+    return len(orders)
+
+
+def archive_orders(finished_before, batch_size=1000):
+    archived = 0
+    while True:
+        order_ids = list(archivable_orders(finished_before).order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not order_ids:
+            return archived
+        archived += archive_batch(order_ids)
@@ -0,0 +1,341 @@
+"""Assign new orders to restaurants in one batch.
+
+A restaurant takes at most `Restaurant.capacity` orders that are new or
+being prepared. Among the restaurants that have every product of an order
+available, the batch assigns as many orders as possible and, among such
+assignments, minimizes the total distance to the customers:
+
+1. greedy by regret: first goes the order that loses most if it does not
+   get its nearest restaurant with free capacity, equal regrets go nearest
+   first;
+2. improvement passes move orders to nearer restaurants with free capacity
+   and swap orders between two restaurants when that shortens the sum;
+3. exchanges of the min-cost flow: in a graph of the restaurants, the pool
+   of unassigned orders and the free slots, a path from the pool to a free
+   slot places one more order, a cycle of negative cost lowers the total
+   distance. Without both the assignment is optimal.
+
+Exchanges stop after `TIME_BUDGET` seconds with the best assignment found:
+100 orders × 100 restaurants are solved exactly in tens of milliseconds,
+1000 orders end within a fraction of a percent of the optimum. `solve`
+knows nothing about the database, `assign_new_orders` loads the data,
+solves and saves `Order.restaurant`.
+"""
+import heapq
+import math
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from foodcartapp import geodata_functions, menu_cache
+from foodcartapp.models import Order, OrderItem, get_restaurant_capabilities
+
+# orders that occupy the kitchen
+ACTIVE_STATUSES = ['new', 'preparation']
+MAX_IMPROVEMENT_PASSES = 5
+TIME_BUDGET = 0.2
+# keeps IN clauses under the SQLite bound parameters limit
+IDS_PER_QUERY = 900
+# nodes of the exchange graph besides the restaurants
+_POOL = 'unassigned orders'
+_FREE = 'free slots'
+
+
+def _regret(options, free):
+    """Best open `(distance, restaurant)` of the order and how much the next one is farther."""
+    open_options = []
+    for option in options:
+        if free[option[1]] > 0:
+            open_options.append(option)
+            if len(open_options) == 2:
+                break
+    if not open_options:
+        return None, None
+    if len(open_options) == 1:
+        return open_options[0], math.inf
+    return open_options[0], open_options[1][0] - open_options[0][0]
+
+
+def _greedy(candidates, free):
+    assignment = {}
+    # equal regrets, infinite ones of orders with a single option among them, go nearest first
+    heap = []
+    for order_id, options in candidates.items():
+        option, regret = _regret(options, free)
+        if option is not None:
+            heap.append((-regret, option[0], order_id, option[1]))
+    heapq.heapify(heap)
+    while heap:
+        negative_regret, distance, order_id, restaurant_id = heapq.heappop(heap)
+        if free[restaurant_id] > 0:
+            assignment[order_id] = restaurant_id
+            free[restaurant_id] -= 1
+            continue
+        # the restaurant filled up since the order was queued
+        option, regret = _regret(candidates[order_id], free)
+        if option is not None:
+            heapq.heappush(heap, (-regret, option[0], order_id, option[1]))
+    return assignment
+
+
+def _improve_locally(candidates, distances, assignment, free):
+    """Move orders to nearer restaurants with free slots and swap orders of two restaurants."""
+    members = defaultdict(set)
+    for order_id, restaurant_id in assignment.items():
+        members[restaurant_id].add(order_id)
+
+    for _ in range(MAX_IMPROVEMENT_PASSES):
+        improved = False
+        for order_id in list(assignment):
+            current = assignment[order_id]
+            current_distance = distances[order_id][current]
+            for distance, restaurant_id in candidates[order_id]:
+                if distance >= current_distance:
+                    break
+                if free[restaurant_id] > 0:
+                    members[current].discard(order_id)
+                    members[restaurant_id].add(order_id)
+                    free[current] += 1
+                    free[restaurant_id] -= 1
+                    assignment[order_id] = restaurant_id
+                    improved = True
+                    break
+                swap = next((
+                    other for other in members[restaurant_id]
+                    if current in distances[other] and
+                    distance + distances[other][current] < current_distance + distances[other][restaurant_id] - 1e-9
+                ), None)
+                if swap is not None:
+                    members[current].discard(order_id)
+                    members[restaurant_id].discard(swap)
+                    members[current].add(swap)
+                    members[restaurant_id].add(order_id)
+                    assignment[order_id], assignment[swap] = restaurant_id, current
+                    improved = True
+                    break
+        if not improved:
+            break
+
+
+def _exchange_graph(candidates, distances, assignment, free):
+    """`{from: {to: (cost, order)}}`, the cheapest move of a single order between two nodes.
+
+    Nodes are restaurants, `_POOL` of the unassigned orders and `_FREE` of the free slots.
+    """
+    graph = defaultdict(dict)
+    for order_id, options in candidates.items():
+        current = assignment.get(order_id)
+        if current is None:
+            moves, base = graph[_POOL], 0
+        else:
+            moves, base = graph[current], distances[order_id][current]
+            eject = moves.get(_POOL)
+            if eject is None or -base < eject[0]:
+                moves[_POOL] = (-base, order_id)
+        for distance, restaurant_id in options:
+            if restaurant_id == current:
+                continue
+            move = moves.get(restaurant_id)
+            if move is None or distance - base < move[0]:
+                moves[restaurant_id] = (distance - base, order_id)
+    for restaurant_id, count in free.items():
+        graph[_FREE][restaurant_id] = (0, None)
+        if count > 0:
+            graph[restaurant_id][_FREE] = (0, None)
+    return graph
+
+
+def _augmenting_path(graph):
+    """Moves placing one more order: a path from `_POOL` to `_FREE`, None if there is none."""
+    parents = {_POOL: None}
+    queue = [_POOL]
+    for node in queue:
+        for target in graph.get(node, ()):
+            if target not in parents:
+                parents[target] = node
+                queue.append(target)
+    if _FREE not in parents:
+        return None
+    path, node = [], _FREE
+    while parents[node] is not None:
+        path.append((parents[node], node))
+        node = parents[node]
+    return path[::-1]
+
+
+def _negative_cycle(graph):
+    """Moves lowering the total distance: a cycle of negative cost, None if there is none.
+
+    Bellman-Ford from all nodes at once, relaxing only the moves from the nodes
+    improved in the previous round; a cycle is looked for among their parents.
+    """
+    distance = defaultdict(int)
+    parents = {}
+    nodes = set(graph).union(*graph.values())
+    changed = set(graph)
+    for _ in range(len(nodes)):
+        improved = set()
+        for source in changed:
+            for target, (cost, _) in graph.get(source, {}).items():
+                if distance[source] + cost < distance[target] - 1e-9:
+                    distance[target] = distance[source] + cost
+                    parents[target] = source
+                    improved.add(target)
+        if not improved:
+            return None
+        visited = {}
+        for start in improved:
+            node = start
+            while node in parents and node not in visited:
+                visited[node] = start
+                node = parents[node]
+            if visited.get(node) == start:
+                cycle, target = [], node
+                while True:
+                    cycle.append((parents[target], target))
+                    target = parents[target]
+                    if target == node:
+                        break
+                cycle.reverse()
+                if sum(graph[source][target][0] for source, target in cycle) < -1e-9:
+                    return cycle
+        changed = improved
+    return None
+
+
+def _negative_cycles(graph):
+    """Negative cycles without common nodes: they move different orders and are applied together."""
+    moves = []
+    while True:
+        cycle = _negative_cycle(graph)
+        if cycle is None:
+            return moves
+        moves.extend(cycle)
+        used = {node for move in cycle for node in move}
+        graph = {
+            source: {target: move for target, move in targets.items() if target not in used}
+            for source, targets in graph.items() if source not in used
+        }
+
+
+def _apply_moves(moves, graph, assignment, free):
+    # a path or a cycle leaves every node once, so the orders of its moves are all different
+    for order_id, target in [(graph[source][target][1], target) for source, target in moves]:
+        if order_id is None:
+            continue
+        current = assignment.pop(order_id, None)
+        if current is not None:
+            free[current] += 1
+        if target != _POOL:
+            assignment[order_id] = target
+            free[target] -= 1
+
+
+def solve(candidates, capacities, time_budget=TIME_BUDGET):
+    """Assign orders to restaurants minimizing the total distance.
+
+    `candidates` maps an order to `[(distance, restaurant), ...]` sorted by
+    distance, `capacities` maps a restaurant to its free slots. Returns
+    `{order: restaurant}`, orders that did not fit anywhere are left out.
+    """
+    free = defaultdict(int, capacities)
+    assignment = _greedy(candidates, free)
+    distances = {order_id: {restaurant_id: distance for distance, restaurant_id in options}
+                 for order_id, options in candidates.items()}
+    deadline = time.perf_counter() + time_budget
+
+    may_augment = True
+    while True:
+        _improve_locally(candidates, distances, assignment, free)
+        if time.perf_counter() > deadline:
+            break
+        graph = _exchange_graph(candidates, distances, assignment, free)
+        moves = _augmenting_path(graph) if may_augment else None
+        if moves is None:
+            # exchanges keep the number of assigned orders, which can not grow anymore
+            may_augment = False
+            moves = _negative_cycles(graph)
+        if not moves:
+            break
+        _apply_moves(moves, graph, assignment, free)
+    return assignment
+
+
+class AssignmentReport:
+    def __init__(self):
+        self.assigned = {}
+        self.total_distance = 0
+        self.without_coordinates = 0
+        self.without_restaurants = 0
+        self.without_capacity = 0
+
+
+def build_candidates(orders, restaurants, coordinates):
+    """`solve` candidates for `(order id, address, product ids)` and `(restaurant, product ids)`."""
+    report = AssignmentReport()
+    candidates = {}
+    for order_id, address, product_ids in orders:
+        capable = [restaurant for restaurant, available in restaurants if available.issuperset(product_ids)]
+        if not capable:
+            report.without_restaurants += 1
+            continue
+        found = coordinates.get(address)
+        if not found:
+            report.without_coordinates += 1
+            continue
+        # the geocoder answers longitude first
+        order_coordinates = (found[1], found[0])
+        candidates[order_id] = sorted(
+            (geodata_functions.distance_km(order_coordinates, restaurant.coordinates), restaurant.id) for restaurant in capable
+        )
+    return candidates, report
+
+
+def assign_new_orders(dry_run=False):
+    """Assign the new orders without a restaurant, returns an `AssignmentReport`."""
+    orders = defaultdict(set)
+    addresses = {}
+    items = OrderItem.objects.filter(order__order_status='new', order__restaurant__isnull=True).values_list(
+        'order_id', 'order__address', 'product_id')
+    for order_id, address, product_id in items:
+        orders[order_id].add(product_id)
+        addresses[order_id] = address
+
+    restaurants = [
+        (restaurant, available)
+        for restaurant, available in menu_cache.get_or_set('restaurant_capabilities', get_restaurant_capabilities)
+        if restaurant.coordinates
+    ]
+    coordinates = geodata_functions.get_coordinates_for_addresses(settings.YANDEX_API_KEY, set(addresses.values()))
+    candidates, report = build_candidates(
+        [(order_id, addresses[order_id], product_ids) for order_id, product_ids in orders.items()],
+        restaurants, coordinates)
+
+    load = dict(Order.objects.filter(order_status__in=ACTIVE_STATUSES, restaurant__isnull=False).values_list(
+        'restaurant_id').annotate(count=Count('id')).order_by())
+    capacities = {restaurant.id: max(restaurant.capacity - load.get(restaurant.id, 0), 0)
+                  for restaurant, _ in restaurants}
+    report.assigned = solve(candidates, capacities)
+    report.without_capacity = len(candidates) - len(report.assigned)
+    report.total_distance = sum(
+        next(distance for distance, option in candidates[order_id] if option == restaurant_id)
+        for order_id, restaurant_id in report.assigned.items()
+    )
+    if not dry_run:
+        save_assignment(report.assigned)
+    return report
+
+
+@transaction.atomic
+def save_assignment(assignment):
+    by_restaurant = defaultdict(list)
+    for order_id, restaurant_id in assignment.items():
+        by_restaurant[restaurant_id].append(order_id)
+    for restaurant_id, order_ids in by_restaurant.items():
+        for start in range(0, len(order_ids), IDS_PER_QUERY):
+            # orders assigned by hand meanwhile keep their restaurant
+            Order.objects.filter(pk__in=order_ids[start:start + IDS_PER_QUERY], restaurant__isnull=True).update(
+                restaurant_id=restaurant_id, rollup_dirty=True)
@@ -0,0 +1,161 @@
+"""Group orders handed to couriers into runs.
+
+Orders of a restaurant are put on a grid of `CELL_KM` cells. The oldest
+order not in a run yet starts a new run, which takes the nearest orders
+from its own and the neighbouring cells while:
+
+- the run has at most `MAX_STOPS` orders;
+- the orders got ready within `READY_WINDOW_MINUTES` of the first one;
+- the route takes at most `MAX_RUN_MINUTES` at `COURIER_SPEED_KMH` with
+  `STOP_MINUTES` per stop.
+
+Stops are ordered by the nearest neighbour heuristic improved with 2-opt,
+starting from the restaurant. Within a city the coordinates are projected
+onto a plane, which is accurate enough and much cheaper than geodesics.
+"""
+import datetime
+import math
+from collections import defaultdict
+
+from django.conf import settings
+
+from foodcartapp import geodata_functions
+from foodcartapp.models import Order
+
+CELL_KM = 1.0
+MAX_STOPS = 5
+READY_WINDOW_MINUTES = 10
+MAX_RUN_MINUTES = 60
+COURIER_SPEED_KMH = 20
+STOP_MINUTES = 3
+KM_PER_DEGREE = 111.32
+
+
+class CourierRun:
+    def __init__(self, restaurant, orders, distance):
+        self.restaurant = restaurant
+        # in the order of the stops
+        self.orders = orders
+        self.distance = distance
+
+    @property
+    def minutes(self):
+        return route_minutes(self.distance, len(self.orders))
+
+
+def route_minutes(distance, stops):
+    return distance / COURIER_SPEED_KMH * 60 + stops * STOP_MINUTES
+
+
+def _project(origin, coordinates):
+    """Kilometres east and north of the origin, both `(latitude, longitude)`."""
+    latitude, longitude = coordinates
+    return (
+        (longitude - origin[1]) * KM_PER_DEGREE * math.cos(math.radians(origin[0])),
+        (latitude - origin[0]) * KM_PER_DEGREE,
+    )
+
+
+def _route_length(points, route):
+    length, previous = 0, (0, 0)
+    for index in route:
+        length += math.dist(previous, points[index])
+        previous = points[index]
+    return length
+
+
+def order_stops(points, stops):
+    """Order the stops of a route starting at `(0, 0)`: nearest neighbour, then 2-opt."""
+    route, position, remaining = [], (0, 0), set(stops)
+    while remaining:
+        nearest = min(remaining, key=lambda index: math.dist(position, points[index]))
+        route.append(nearest)
+        remaining.discard(nearest)
+        position = points[nearest]
+
+    improved = True
+    while improved:
+        improved = False
+        for start in range(len(route) - 1):
+            before = points[route[start - 1]] if start else (0, 0)
+            for end in range(start + 1, len(route)):
+                after = points[route[end + 1]] if end + 1 < len(route) else None
+                # the route is open: nothing follows the last stop
+                old = math.dist(before, points[route[start]]) + (
+                    math.dist(points[route[end]], after) if after else 0)
+                new = math.dist(before, points[route[end]]) + (
+                    math.dist(points[route[start]], after) if after else 0)
+                if new < old - 1e-9:
+                    route[start:end + 1] = reversed(route[start:end + 1])
+                    improved = True
+    return route
+
+
+def plan_restaurant_runs(points, ready_at):
+    """Split the orders of one restaurant into runs.
+
+    `points` are the orders' kilometres from the restaurant, `ready_at` the
+    moments they got ready. Returns lists of order indexes in the order of
+    the stops.
+    """
+    cells = defaultdict(set)
+    for index, (x, y) in enumerate(points):
+        cells[(math.floor(x / CELL_KM), math.floor(y / CELL_KM))].add(index)
+    window = datetime.timedelta(minutes=READY_WINDOW_MINUTES)
+
+    runs = []
+    for seed in sorted(range(len(points)), key=lambda index: ready_at[index]):
+        seed_cell = (math.floor(points[seed][0] / CELL_KM), math.floor(points[seed][1] / CELL_KM))
+        if seed not in cells[seed_cell]:
+            continue
+        cells[seed_cell].discard(seed)
+        nearby = sorted(
+            (
+                index
+                for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                for index in cells.get((seed_cell[0] + dx, seed_cell[1] + dy), ())
+                if abs(ready_at[index] - ready_at[seed]) <= window
+            ),
+            key=lambda index: math.dist(points[seed], points[index]),
+        )
+        route = [seed]
+        for index in nearby:
+            if len(route) == MAX_STOPS:
+                break
+            candidate = order_stops(points, route + [index])
+            if route_minutes(_route_length(points, candidate), len(candidate)) <= MAX_RUN_MINUTES:
+                route = candidate
+                cells[(math.floor(points[index][0] / CELL_KM), math.floor(points[index][1] / CELL_KM))].discard(index)
+        runs.append(route)
+    return runs
+
+
+def plan_courier_runs(orders=None):
+    """Runs for the orders handed to couriers, and the orders that could not be placed on the map.
+
+    Returns `(runs, orders without coordinates)`, runs are sorted by restaurant and by the oldest order.
+    """
+    if orders is None:
+        orders = Order.objects.filter(order_status='in_delivery').select_related('restaurant').order_by('called')
+    orders = list(orders)
+    coordinates = geodata_functions.get_coordinates_for_addresses(
+        settings.YANDEX_API_KEY, [order.address for order in orders])
+
+    by_restaurant = defaultdict(list)
+    unplaced = []
+    for order in orders:
+        found = coordinates.get(order.address)
+        if not order.restaurant or not order.restaurant.coordinates or not found:
+            unplaced.append(order)
+            continue
+        # the geocoder answers longitude first
+        by_restaurant[order.restaurant].append((order, (found[1], found[0])))
+
+    runs = []
+    for restaurant, restaurant_orders in sorted(by_restaurant.items(), key=lambda item: item[0].name):
+        points = [_project(restaurant.coordinates, order_coordinates) for _, order_coordinates in restaurant_orders]
+        ready_at = [order.called or order.created for order, _ in restaurant_orders]
+        for route in plan_restaurant_runs(points, ready_at):
+            runs.append(CourierRun(
+                restaurant, [restaurant_orders[index][0] for index in route], _route_length(points, route)))
+    return runs, unplaced
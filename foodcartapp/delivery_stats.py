@@ -0,0 +1,80 @@
+"""Delivery time histograms per day, hour and restaurant.
+
+Time to call is `called - created`, time to deliver is `delivered - created`,
+both in minutes. The histograms are recomputed together with the sales
+rollups for the days of changed orders, see `foodcartapp.sales`, so the
+dashboard sums a few rows per day instead of reading the orders.
+"""
+from collections import defaultdict
+
+from django.utils import timezone
+
+from foodcartapp.models import ArchivedOrder, DeliveryTimeStats, Order
+from monitoring import metrics
+
+# upper bounds in minutes, stored in the layout of `monitoring.metrics.histogram_state`
+CALL_BUCKETS = (1, 2, 3, 5, 10, 15, 20, 30, 45, 60, 120)
+DELIVERY_BUCKETS = (15, 20, 25, 30, 35, 40, 45, 50, 60, 75, 90, 120, 180)
+
+
+def empty_histograms():
+    """Histograms of the minutes to call and to deliver."""
+    return metrics.histogram_state(CALL_BUCKETS), metrics.histogram_state(DELIVERY_BUCKETS)
+
+
+def merge(histogram, other):
+    for index, value in enumerate(other):
+        histogram[index] += value
+
+
+def recompute_day(day, start, end):
+    stats = defaultdict(empty_histograms)
+    for model in (Order, ArchivedOrder):
+        orders = model.objects.filter(created__gte=start, created__lt=end, called__isnull=False).values_list(
+            'restaurant_id', 'created', 'called', 'delivered')
+        for restaurant_id, created, called, delivered in orders.iterator():
+            call_histogram, delivery_histogram = stats[(timezone.localtime(created).hour, restaurant_id)]
+            if called >= created:
+                metrics.observe_histogram(CALL_BUCKETS, call_histogram, (called - created).total_seconds() / 60)
+            if delivered and delivered >= created:
+                metrics.observe_histogram(
+                    DELIVERY_BUCKETS, delivery_histogram, (delivered - created).total_seconds() / 60)
+
+    DeliveryTimeStats.objects.filter(day=day).delete()
+    DeliveryTimeStats.objects.bulk_create([
+        DeliveryTimeStats(day=day, hour=hour, restaurant_id=restaurant_id,
+                          call_minutes=call_histogram, delivery_minutes=delivery_histogram)
+        for (hour, restaurant_id), (call_histogram, delivery_histogram) in stats.items()
+    ])
+
+
+def delivery_report(since, until, quantiles=(0.5, 0.9)):
+    """Percentiles of the minutes to call and to deliver by restaurant and by hour of the day."""
+    by_restaurant = defaultdict(empty_histograms)
+    by_hour = defaultdict(empty_histograms)
+    rows = DeliveryTimeStats.objects.filter(day__gte=since, day__lte=until).values_list(
+        'restaurant__name', 'hour', 'call_minutes', 'delivery_minutes')
+    for restaurant_name, hour, call_minutes, delivery_minutes in rows:
+        for histograms in (by_restaurant[restaurant_name], by_hour[hour]):
+            merge(histograms[0], call_minutes)
+            merge(histograms[1], delivery_minutes)
+
+    def summarize(groups):
+        return [
+            {
+                'name': name,
+                'called': call_histogram[-1],
+                'delivered': delivery_histogram[-1],
+                'call': [metrics.histogram_quantile(CALL_BUCKETS, call_histogram, quantile) for quantile in quantiles],
+                'delivery': [
+                    metrics.histogram_quantile(DELIVERY_BUCKETS, delivery_histogram, quantile) for quantile in quantiles
+                ],
+            }
+            for name, (call_histogram, delivery_histogram) in groups
+        ]
+
+    return {
+        'quantiles': [f'p{int(quantile * 100)}' for quantile in quantiles],
+        'restaurants': summarize(sorted(by_restaurant.items(), key=lambda item: item[0] or '')),
+        'hours': summarize((f'{hour:02d}:00', histograms) for hour, histograms in sorted(by_hour.items())),
+    }
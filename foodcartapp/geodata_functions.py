@@ -1,27 +1,225 @@
+import asyncio
+import datetime
+import math
+import time
+
+import httpx
 import requests
-from django.core.exceptions import ObjectDoesNotExist
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
 
 from foodcartapp import models
+from monitoring import metrics
 
+GEOCODER_URL = "https://geocode-maps.yandex.ru/1.x"
+EARTH_RADIUS_KM = 6371.0
+ADDRESSES_PER_QUERY = 500
 
-def fetch_coordinates(apikey, place):
-    base_url = "https://geocode-maps.yandex.ru/1.x"
-    params = {"geocode": place, "apikey": apikey, "format": "json"}
-    response = requests.get(base_url, params=params)
-    response.raise_for_status()
-    found_places = response.json()['response']['GeoObjectCollection']['featureMember']
+GEOCODER_LOOKUPS = metrics.Counter('geocoder_lookups_total', 'Запросы координат адреса')
+GEOCODER_CACHE_HITS = metrics.Counter('geocoder_cache_hits_total', 'Адреса, найденные в кэше процесса')
+GEOCODER_DB_HITS = metrics.Counter('geocoder_db_hits_total', 'Адреса, найденные в таблице Place')
+GEOCODER_API_CALLS = metrics.Counter('geocoder_api_calls_total', 'Запросы к API Геокодера Яндекса')
+GEOCODER_HTTP_ERRORS = metrics.Counter('geocoder_http_errors_total', 'Ошибки HTTP от API Геокодера')
+GEOCODER_EMPTY_RESULTS = metrics.Counter('geocoder_empty_results_total', 'Адреса, которые Геокодер не нашёл')
+GEOCODER_LATENCY = metrics.Histogram('geocoder_api_latency_seconds', 'Время ответа API Геокодера')
+
+# address -> ((longitude, latitude) or None if the geocoder did not find it, expiry time)
+_coordinates_cache = {}
+_NOT_CACHED = object()
+
+
+def get_today_api_requests():
+    usage = models.GeocoderDailyUsage.objects.filter(date=timezone.localdate()).first()
+    return usage.requests if usage else 0
+
+
+metrics.Gauge('geocoder_daily_api_requests', 'Запросы к API Геокодера за сегодня', get_today_api_requests)
+metrics.Gauge('geocoder_daily_api_limit', 'Дневная квота API Геокодера', lambda: settings.YANDEX_GEOCODER_DAILY_LIMIT)
+
+
+def register_api_request(count=1):
+    today = timezone.localdate()
+    if models.GeocoderDailyUsage.objects.filter(date=today).update(requests=F('requests') + count):
+        return
+    try:
+        with transaction.atomic():
+            models.GeocoderDailyUsage.objects.create(date=today, requests=count)
+    except IntegrityError:
+        models.GeocoderDailyUsage.objects.filter(date=today).update(requests=F('requests') + count)
+
+
+def _parse_found_place(data):
+    found_places = data['response']['GeoObjectCollection']['featureMember']
+    if not found_places:
+        GEOCODER_EMPTY_RESULTS.inc()
+        return None
     most_relevant = found_places[0]
     lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
     return lon, lat
 
 
+def fetch_coordinates(apikey, place):
+    params = {"geocode": place, "apikey": apikey, "format": "json"}
+    GEOCODER_API_CALLS.inc()
+    register_api_request()
+    started = time.perf_counter()
+    try:
+        response = requests.get(GEOCODER_URL, params=params, timeout=settings.GEOCODER_TIMEOUT)
+        response.raise_for_status()
+    except requests.exceptions.RequestException:
+        GEOCODER_HTTP_ERRORS.inc()
+        raise
+    finally:
+        GEOCODER_LATENCY.observe(time.perf_counter() - started)
+    return _parse_found_place(response.json())
+
+
+async def fetch_coordinates_async(client, apikey, place):
+    params = {"geocode": place, "apikey": apikey, "format": "json"}
+    GEOCODER_API_CALLS.inc()
+    started = time.perf_counter()
+    try:
+        response = await client.get(GEOCODER_URL, params=params)
+        response.raise_for_status()
+    except httpx.HTTPError:
+        GEOCODER_HTTP_ERRORS.inc()
+        raise
+    finally:
+        GEOCODER_LATENCY.observe(time.perf_counter() - started)
+    return _parse_found_place(response.json())
+
+
+async def fetch_many_coordinates(apikey, places):
+    """Geocode places concurrently, at most GEOCODER_CONCURRENCY at a time.
+
+    Places not found map to None, places that failed are left out.
+    """
+    semaphore = asyncio.Semaphore(settings.GEOCODER_CONCURRENCY)
+
+    async def fetch(client, place):
+        async with semaphore:
+            try:
+                return await fetch_coordinates_async(client, apikey, place)
+            except httpx.HTTPError:
+                return _NOT_CACHED
+
+    async with httpx.AsyncClient(timeout=settings.GEOCODER_TIMEOUT) as client:
+        found = await asyncio.gather(*[fetch(client, place) for place in places])
+    return {place: coordinates for place, coordinates in zip(places, found) if coordinates is not _NOT_CACHED}
+
+
+def _get_cached(address):
+    """Cached coordinates, None for an address the geocoder did not find, `_NOT_CACHED` otherwise."""
+    cached = _coordinates_cache.get(address)
+    if cached and cached[1] > time.monotonic():
+        GEOCODER_CACHE_HITS.inc()
+        return cached[0]
+    return _NOT_CACHED
+
+
+def _cache(address, coordinates):
+    if len(_coordinates_cache) >= settings.GEOCODER_CACHE_SIZE:
+        _coordinates_cache.clear()
+    _coordinates_cache[address] = (coordinates, time.monotonic() + settings.GEOCODER_CACHE_TTL)
+    return coordinates
+
+
+def _store(address, found):
+    """Save the geocoder answer, an address it did not find is saved without coordinates."""
+    longitude, latitude = found or (None, None)
+    models.Place.objects.update_or_create(address=address, defaults={'longitude': longitude, 'latitude': latitude})
+    return _cache(address, (float(longitude), float(latitude)) if found else None)
+
+
+def _is_known(place):
+    """A place with coordinates, or not found by the geocoder recently enough not to ask again."""
+    if place.longitude is not None:
+        return True
+    return place.updated > timezone.now() - datetime.timedelta(days=settings.GEOCODER_NOT_FOUND_RETRY_DAYS)
+
+
+def _cache_place(place):
+    GEOCODER_DB_HITS.inc()
+    return _cache(place.address, (place.longitude, place.latitude) if place.longitude is not None else None)
+
+
+def geocode(apikey, address):
+    """`(longitude, latitude)` from the process cache, `Place` or the geocoder, None if the address is not found.
+
+    Raises `requests.exceptions.RequestException` if the geocoder failed.
+    """
+    GEOCODER_LOOKUPS.inc()
+    coordinates = _get_cached(address)
+    if coordinates is not _NOT_CACHED:
+        return coordinates
+    place = models.Place.objects.filter(address=address).first()
+    if place and _is_known(place):
+        return _cache_place(place)
+    return _store(address, fetch_coordinates(apikey, address))
+
+
 def get_coordinates_from_db_or_api(apikey, address):
+    """`geocode` answering None if the geocoder failed."""
     try:
-        place = models.Place.objects.get(address=address)
-    except ObjectDoesNotExist:
-        try:
-            longitude, latitude = fetch_coordinates(apikey, address)
-            place = models.Place.objects.create(address=address, longitude=longitude, latitude=latitude)
-        except requests.exceptions.HTTPError:
-            return None
-    return place.longitude, place.latitude
+        return geocode(apikey, address)
+    except requests.exceptions.RequestException:
+        return None
+
+
+def _find_known(addresses):
+    """Coordinates of the addresses in the process cache or in `Place`, and the other addresses."""
+    GEOCODER_LOOKUPS.inc(len(addresses))
+    coordinates = {}
+    pending = []
+    for address in addresses:
+        cached = _get_cached(address)
+        if cached is not _NOT_CACHED:
+            coordinates[address] = cached
+        else:
+            pending.append(address)
+
+    # keep the IN clause under the SQLite bound parameters limit
+    for start in range(0, len(pending), ADDRESSES_PER_QUERY):
+        for place in models.Place.objects.filter(address__in=pending[start:start + ADDRESSES_PER_QUERY]):
+            if _is_known(place):
+                coordinates[place.address] = _cache_place(place)
+    return coordinates, list(addresses - set(coordinates))
+
+
+def _store_found(coordinates, found):
+    for address, place in found.items():
+        coordinates[address] = _store(address, place)
+    return coordinates
+
+
+def get_coordinates_for_addresses(apikey, addresses):
+    """Resolve many addresses with one `Place` query, geocoding the misses concurrently.
+
+    Addresses the geocoder did not find map to None, those it failed on are left out.
+    """
+    coordinates, missing = _find_known(set(addresses))
+    if missing:
+        register_api_request(len(missing))
+        _store_found(coordinates, async_to_sync(fetch_many_coordinates)(apikey, missing))
+    return coordinates
+
+
+async def get_coordinates_for_addresses_async(apikey, addresses):
+    """`get_coordinates_for_addresses` for async views, the event loop serves other requests while geocoding."""
+    coordinates, missing = await sync_to_async(_find_known)(set(addresses))
+    if missing:
+        await sync_to_async(register_api_request)(len(missing))
+        found = await fetch_many_coordinates(apikey, missing)
+        await sync_to_async(_store_found)(coordinates, found)
+    return coordinates
+
+
+def distance_km(first, second):
+    """Great-circle distance between `(latitude, longitude)` points, much cheaper than geopy's geodesic."""
+    lat1, lon1 = math.radians(first[0]), math.radians(first[1])
+    lat2, lon2 = math.radians(second[0]), math.radians(second[1])
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
@@ -0,0 +1,124 @@
+"""Resized copies of product images.
+
+Every variant fits into a square box of its size, keeps the aspect ratio
+and is never upscaled. It is saved in the format of the original and, if
+Pillow was built with WebP support, in WebP as well. Variant names start
+with the id of the product, so products sharing an image keep their own
+files. `Product.image_variants` stores the storage names:
+
+    {
+        "source": "burger.jpg",
+        "small": {"width": 100, "height": 75, "original": "variants/7-burger_jpg-small.jpg",
+                  "webp": "variants/7-burger_jpg-small.webp"},
+        ...
+    }
+"""
+import io
+import logging
+import os
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = {
+    'small': 100,
+    'medium': 400,
+    'large': 800,
+}
+VARIANTS_DIR = 'variants'
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+
+def webp_supported():
+    Image.init()
+    return 'WEBP' in Image.SAVE
+
+
+def _encode(image, image_format):
+    buffer = io.BytesIO()
+    if image_format == 'JPEG':
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    elif image_format == 'WEBP':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=6)
+    else:
+        image.save(buffer, image_format, optimize=True)
+    return buffer.getvalue()
+
+
+def delete_variants(variants, storage=default_storage):
+    for name, variant in variants.items():
+        if name == 'source':
+            continue
+        for stored_name in variant.values():
+            if isinstance(stored_name, str):
+                storage.delete(stored_name)
+
+
+def generate_variants(image_field, old_variants=None, storage=default_storage):
+    """Resize the image of an `ImageField` into every size of `VARIANT_SIZES`.
+
+    The field must belong to a saved object, its id goes into the variant
+    names. Returns the new value of `Product.image_variants`. Images that can
+    not be read give an empty dict, so the original is used everywhere.
+    """
+    try:
+        with image_field.open('rb'):
+            source = Image.open(image_field)
+            source.load()
+    except (OSError, ValueError):
+        logger.warning('Can not read product image %s', image_field.name)
+        return {}
+    if old_variants:
+        delete_variants(old_variants, storage)
+
+    image_format = source.format if source.format in ('JPEG', 'PNG') else 'JPEG'
+    if image_format == 'JPEG' or source.mode not in ('RGB', 'RGBA'):
+        source = source.convert('RGBA' if image_format == 'PNG' else 'RGB')
+    # keep the extension in the name: burger.jpg and burger.png get separate variants,
+    # the id keeps other products with the same image from replacing them
+    stem = f'{image_field.instance.pk}-' + os.path.basename(image_field.name).replace('.', '_')
+    extension = '.jpg' if image_format == 'JPEG' else '.png'
+    with_webp = webp_supported()
+
+    variants = {'source': image_field.name}
+    for size_name, size in VARIANT_SIZES.items():
+        resized = source.copy()
+        resized.thumbnail((size, size), Image.LANCZOS)
+        variant = {'width': resized.width, 'height': resized.height}
+        variant['original'] = _save(storage, f'{VARIANTS_DIR}/{stem}-{size_name}{extension}',
+                                    _encode(resized, image_format))
+        if with_webp:
+            variant['webp'] = _save(storage, f'{VARIANTS_DIR}/{stem}-{size_name}.webp', _encode(resized, 'WEBP'))
+        variants[size_name] = variant
+    return variants
+
+
+def _save(storage, name, content):
+    # regenerated variants replace the old files instead of piling up next to them
+    storage.delete(name)
+    return storage.save(name, ContentFile(content))
+
+
+def variant_url(image_field, variants, size_name, storage=default_storage):
+    """URL of the variant in the original format, or of the image itself, None without an image."""
+    if not image_field:
+        return None
+    variant = variants.get(size_name)
+    if variant and variants.get('source') == image_field.name:
+        return storage.url(variant['original'])
+    return image_field.url
+
+
+def srcset(image_field, variants, image_format='original', storage=default_storage):
+    """`srcset` attribute value listing the variants by width."""
+    if not image_field or variants.get('source') != image_field.name:
+        return ''
+    return ', '.join(
+        f'{storage.url(variants[size_name][image_format])} {variants[size_name]["width"]}w'
+        for size_name in VARIANT_SIZES
+        if image_format in variants.get(size_name, {})
+    )
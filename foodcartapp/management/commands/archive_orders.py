@@ -0,0 +1,32 @@
+import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from foodcartapp.archive import ArchiveConflict, archivable_orders, archive_orders
+from foodcartapp.sales import refresh_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Переносит доставленные давно заказы в архивные таблицы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS,
+                            help='архивировать заказы, доставленные больше стольких дней назад')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='сколько заказов переносить в одной транзакции')
+        parser.add_argument('--dry-run', action='store_true', help='только посчитать заказы для архивации')
+
+    def handle(self, *args, **options):
+        finished_before = timezone.now() - datetime.timedelta(days=options['days'])
+        if options['dry_run']:
+            count = archivable_orders(finished_before).count()
+            self.stdout.write(f'Заказов для архивации: {count}')
+            return
+        refresh_sales_rollups()
+        try:
+            archived = archive_orders(finished_before, options['batch_size'])
+        except ArchiveConflict as error:
+            raise CommandError(error)
+        self.stdout.write(f'Перенесено в архив заказов: {archived}')
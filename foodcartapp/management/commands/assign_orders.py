@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.assignment import assign_new_orders
+
+
+class Command(BaseCommand):
+    help = 'Назначает новым заказам ближайшие рестораны с учётом их вместимости'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='только рассчитать назначение, не сохраняя')
+
+    def handle(self, *args, **options):
+        report = assign_new_orders(dry_run=options['dry_run'])
+        self.stdout.write(f'Назначено заказов: {len(report.assigned)}, суммарно {report.total_distance:.1f} км')
+        self.stdout.write(f'Нет ресторана со всеми товарами: {report.without_restaurants}')
+        self.stdout.write(f'Не найдены координаты адреса: {report.without_coordinates}')
+        self.stdout.write(f'Не хватило вместимости ресторанов: {report.without_capacity}')
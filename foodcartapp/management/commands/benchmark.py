@@ -0,0 +1,211 @@
+import datetime
+import itertools
+import json
+import os
+import random
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+
+from foodcartapp import assignment, courier_batching, geodata_functions, menu_cache, perf_tools, split_orders
+from foodcartapp.models import Order, Place, Restaurant
+from foodcartapp.views import product_list_api
+from restaurateur.views import view_products
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmark_baseline.json')
+
+
+def bench_fetch_restaurants(size):
+    return lambda: list(Order.objects.fetch_restaurants())
+
+
+def bench_total_price(size):
+    return lambda: list(Order.objects.values_list('id', 'total_price'))
+
+
+def bench_product_list_api(size):
+    request = RequestFactory().get('/api/products/')
+
+    def run():
+        # every run builds the menu, as the first request after a menu change does
+        menu_cache.clear()
+        async_to_sync(product_list_api)(request)
+    return run
+
+
+def bench_product_list_api_cached(size):
+    request = RequestFactory().get('/api/products/')
+    return lambda: async_to_sync(product_list_api)(request)
+
+
+def bench_view_products(size):
+    request = RequestFactory().get('/manager/products/')
+    request.user = get_user_model().objects.get(username='benchmark-manager')
+    return lambda: view_products(request)
+
+
+def bench_geocoder_hits(size):
+    addresses = list(Place.objects.values_list('address', flat=True)[:size])
+
+    def run():
+        # every address is read from the Place table, not from the process cache
+        geodata_functions._coordinates_cache.clear()
+        for address in addresses:
+            geodata_functions.get_coordinates_from_db_or_api(settings.YANDEX_API_KEY, address)
+    return run
+
+
+def bench_geocoder_cache_hits(size):
+    addresses = list(Place.objects.values_list('address', flat=True)[:size])
+
+    def run():
+        for address in addresses:
+            geodata_functions.get_coordinates_from_db_or_api(settings.YANDEX_API_KEY, address)
+    return run
+
+
+def bench_geocoder_misses(size):
+    counter = itertools.count()
+
+    def run():
+        batch = next(counter)
+        for number in range(size):
+            geodata_functions.get_coordinates_from_db_or_api(
+                settings.YANDEX_API_KEY, f'Москва, новый адрес {batch}-{number}')
+    return run
+
+
+def bench_assignment(size):
+    # synthetic: `size` orders, 100 restaurants in Moscow, each has the products of 60% of the orders
+    rnd = random.Random(0)
+    restaurants = [(55.6 + rnd.random() * 0.3, 37.4 + rnd.random() * 0.4) for _ in range(100)]
+    orders = [(55.6 + rnd.random() * 0.3, 37.4 + rnd.random() * 0.4) for _ in range(size)]
+    candidates = {
+        order_id: sorted(
+            (geodata_functions.distance_km(order, restaurant), restaurant_id)
+            for restaurant_id, restaurant in enumerate(restaurants) if rnd.random() < 0.6
+        )
+        for order_id, order in enumerate(orders)
+    }
+    capacities = {restaurant_id: max(1, size // 100) for restaurant_id in range(len(restaurants))}
+    return lambda: assignment.solve(candidates, capacities)
+
+
+def bench_split_orders(size):
+    # synthetic: `size` orders of 2-6 products, 100 restaurants with 5-25 of 60 products each
+    rnd = random.Random(0)
+    restaurants = [
+        (Restaurant(id=restaurant_id, latitude=55.6 + rnd.random() * 0.3, longitude=37.4 + rnd.random() * 0.4),
+         frozenset(rnd.sample(range(60), rnd.randint(5, 25))))
+        for restaurant_id in range(100)
+    ]
+    product_index = split_orders.build_product_index(restaurants)
+    orders = [
+        (set(rnd.sample(range(60), rnd.randint(2, 6))), (55.6 + rnd.random() * 0.3, 37.4 + rnd.random() * 0.4))
+        for _ in range(size)
+    ]
+
+    def run():
+        for product_ids, coordinates in orders:
+            split_orders.find_split(product_ids, product_index, coordinates)
+    return run
+
+
+def bench_courier_batching(size):
+    # synthetic: `size` orders of one restaurant ready within ten minutes, up to 5 km around it
+    rnd = random.Random(0)
+    now = datetime.datetime(2021, 1, 1, tzinfo=datetime.timezone.utc)
+    points = [(rnd.uniform(-5, 5), rnd.uniform(-5, 5)) for _ in range(size)]
+    ready_at = [now + datetime.timedelta(seconds=rnd.randrange(600)) for _ in range(size)]
+    return lambda: courier_batching.plan_restaurant_runs(points, ready_at)
+
+
+BENCHMARKS = {
+    'fetch_restaurants': bench_fetch_restaurants,
+    'total_price': bench_total_price,
+    'product_list_api': bench_product_list_api,
+    'product_list_api_cached': bench_product_list_api_cached,
+    'view_products': bench_view_products,
+    'geocoder_hits': bench_geocoder_hits,
+    'geocoder_cache_hits': bench_geocoder_cache_hits,
+    'geocoder_misses': bench_geocoder_misses,
+    'assignment': bench_assignment,
+    'split_orders': bench_split_orders,
+    'courier_batching': bench_courier_batching,
+}
+
+
+class Command(BaseCommand):
+    help = 'Микробенчмарки горячих функций со сравнением с сохранённым эталоном'
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help=f'какие бенчмарки запускать: {", ".join(BENCHMARKS)}')
+        parser.add_argument('--sizes', default='100,1000', help='размеры данных через запятую')
+        parser.add_argument('--repeat', type=int, default=5, help='сколько раз повторять замер')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='файл с эталонными результатами')
+        parser.add_argument('--save-baseline', action='store_true', help='сохранить результаты как эталон')
+        parser.add_argument('--threshold', type=float, default=0.25,
+                            help='допустимое замедление относительно эталона, доля')
+
+    def handle(self, *args, **options):
+        names = options['names'] or list(BENCHMARKS)
+        unknown = set(names) - set(BENCHMARKS)
+        if unknown:
+            raise CommandError(f'Unknown benchmarks: {", ".join(sorted(unknown))}')
+        # without a baseline nothing would be compared and a regression would pass unnoticed
+        if not options['save_baseline'] and not os.path.exists(options['baseline']):
+            raise CommandError(f'Baseline {options["baseline"]} not found, save it with --save-baseline')
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        settings.DEBUG = False
+
+        results = {}
+        for size in sizes:
+            with perf_tools.isolated_database(), perf_tools.stub_geocoder():
+                perf_tools.seed_dataset(
+                    restaurants=max(5, size // 20),
+                    products=max(20, size // 10),
+                    orders=size,
+                )
+                get_user_model().objects.create_user('benchmark-manager', is_staff=True)
+                for name in names:
+                    run = BENCHMARKS[name](size)
+                    run()
+                    timings = []
+                    for _ in range(options['repeat']):
+                        started = time.perf_counter()
+                        run()
+                        timings.append(time.perf_counter() - started)
+                    results[f'{name}[{size}]'] = round(min(timings) * 1000, 3)
+
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as baseline_file:
+                json.dump(results, baseline_file, indent=4, sort_keys=True)
+            self.stdout.write(f'Эталон сохранён в {options["baseline"]}')
+
+        with open(options['baseline']) as baseline_file:
+            baseline = json.load(baseline_file)
+
+        regressions = []
+        missing = []
+        for key, elapsed_ms in results.items():
+            line = f'{key:<32}{elapsed_ms:>12.3f} ms'
+            if key not in baseline:
+                missing.append(key)
+                line += '  NO BASELINE'
+            else:
+                change = elapsed_ms / baseline[key] - 1 if baseline[key] else 0
+                line += f'{baseline[key]:>12.3f} ms{change:>+9.1%}'
+                if change > options['threshold']:
+                    regressions.append(key)
+                    line += '  REGRESSION'
+            self.stdout.write(line)
+
+        if regressions:
+            raise CommandError(f'Performance regressions: {", ".join(regressions)}')
+        if missing:
+            raise CommandError(
+                f'Benchmarks missing from the baseline: {", ".join(missing)}, save it with --save-baseline')
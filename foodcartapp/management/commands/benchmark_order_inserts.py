@@ -0,0 +1,62 @@
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+
+from foodcartapp import perf_tools
+from foodcartapp.models import Order, Product
+
+
+def write_orders(args):
+    orders_count, product_ids = args
+    connections.close_all()
+    client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+    payload = {
+        'firstname': 'Иван',
+        'lastname': 'Петров',
+        'phonenumber': '+79291000000',
+        'address': 'Москва, Заказная улица, 1',
+        'products': [{'product': product_id, 'quantity': 1} for product_id in product_ids],
+    }
+    failed = 0
+    for _ in range(orders_count):
+        try:
+            response = client.post('/api/order/', payload, content_type='application/json')
+            failed += response.status_code >= 400
+        except Exception:
+            failed += 1
+    connections.close_all()
+    return failed
+
+
+class Command(BaseCommand):
+    help = 'Замеряет пропускную способность оформления заказов при нескольких пишущих процессах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4, help='число пишущих процессов')
+        parser.add_argument('--orders', type=int, default=200, help='заказов на каждый процесс')
+
+    def handle(self, *args, **options):
+        settings.DEBUG = False
+        settings.ORDER_INTAKE_BUFFER = None
+        connection = connections['default']
+        self.stdout.write(f'Движок БД: {connection.settings_dict["ENGINE"]}, '
+                          f'CONN_MAX_AGE={connection.settings_dict["CONN_MAX_AGE"]}')
+
+        with perf_tools.isolated_database():
+            perf_tools.seed_dataset(restaurants=2, products=10, orders=0)
+            product_ids = list(Product.objects.values_list('id', flat=True)[:3])
+            connections.close_all()
+
+            started = time.perf_counter()
+            with multiprocessing.get_context('fork').Pool(options['writers']) as pool:
+                failures = pool.map(write_orders, [(options['orders'], product_ids)] * options['writers'])
+            elapsed = time.perf_counter() - started
+            created = Order.objects.count()
+
+        self.stdout.write(f'Писателей: {options["writers"]}, заказов создано: {created}, '
+                          f'ошибок: {sum(failures)}, время: {elapsed:.2f} с, '
+                          f'заказов в секунду: {created / elapsed:.1f}')
@@ -0,0 +1,37 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import DecimalField, Sum, Value
+from django.db.models.functions import Coalesce
+
+from foodcartapp.models import Order
+
+CENT = Decimal('0.01')
+
+
+class Command(BaseCommand):
+    help = 'Сверяет сохранённые суммы заказов с суммой их позиций'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='пересчитать расходящиеся суммы')
+
+    def handle(self, *args, **options):
+        orders = Order.objects.annotate(
+            items_total=Coalesce(Sum('order_items__price'), Value(0), output_field=DecimalField()),
+        ).only('total_price')
+        # SQLite sums decimals as floats, so the sums are compared in Python after rounding to cents
+        mismatched = (order for order in orders.iterator() if order.items_total.quantize(CENT) != order.total_price)
+
+        count = 0
+        for order in mismatched:
+            count += 1
+            self.stdout.write(f'Заказ {order.pk}: сохранено {order.total_price}, по позициям {order.items_total.quantize(CENT)}')
+            if options['fix']:
+                order.update_total_price()
+
+        if not count:
+            self.stdout.write('Все суммы заказов совпадают с позициями')
+        elif options['fix']:
+            self.stdout.write(f'Исправлено заказов: {count}')
+        else:
+            raise CommandError(f'{count} orders have a stale total_price, run with --fix to recalculate')
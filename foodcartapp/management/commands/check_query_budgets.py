@@ -0,0 +1,55 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.utils import timezone
+
+from foodcartapp import archive, perf_tools
+from foodcartapp.sales import refresh_sales_rollups
+from monitoring.query_budget import measure_pages
+
+
+class Command(BaseCommand):
+    help = 'Проверяет, что число SQL-запросов страниц не превышает бюджет и не растёт с объёмом данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--small', type=int, default=10, help='число заказов в малом наборе данных')
+        parser.add_argument('--large', type=int, default=40, help='число заказов в большом наборе данных')
+
+    def measure(self, orders):
+        with perf_tools.isolated_database(), perf_tools.stub_geocoder():
+            perf_tools.seed_dataset(restaurants=max(2, orders // 5), products=max(5, orders // 2), orders=orders)
+            # the archive pages are measured with data, orders are archived after their rollups
+            refresh_sales_rollups()
+            finished = archive.archivable_orders(timezone.now()).order_by('pk').values_list('pk', flat=True)
+            archive.archive_batch(list(finished[:orders // 4]))
+            user = get_user_model().objects.create_superuser('budget-admin', 'admin@example.com', 'password')
+            client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+            client.force_login(user)
+
+            results = {}
+            for path, response, queries, budget in measure_pages(client):
+                if response.status_code != 200:
+                    raise CommandError(f'{path} responded with {response.status_code}')
+                results[path] = (queries, budget)
+            return results
+
+    def handle(self, *args, **options):
+        settings.DEBUG = False
+        small = self.measure(options['small'])
+        large = self.measure(options['large'])
+
+        failures = []
+        for path, (large_count, budget) in sorted(large.items()):
+            small_count = small[path][0]
+            status = 'OK'
+            if large_count > budget:
+                status = 'OVER BUDGET'
+            elif large_count > small_count:
+                status = 'GROWS WITH DATA'
+            if status != 'OK':
+                failures.append(path)
+            self.stdout.write(f'{path:<50}{small_count:>6}{large_count:>6}{budget:>6}  {status}')
+
+        if failures:
+            raise CommandError(f'Query budget violations: {", ".join(failures)}')
@@ -0,0 +1,92 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from foodcartapp import perf_tools
+from foodcartapp.models import Order, OrderItem, Product, RestaurantMenuItem
+from foodcartapp.sales import refresh_sales_rollups
+
+# name: (queryset factory, table that must be read through the index, index name)
+QUERY_PLANS = {
+    'available menu items by restaurant': (
+        lambda: RestaurantMenuItem.objects.filter(availability=True).select_related(
+            'restaurant').order_by('restaurant_id'),
+        'foodcartapp_restaurantmenuitem', 'menuitem_available_idx',
+    ),
+    'available products': (
+        lambda: Product.objects.select_related('category').available(),
+        'foodcartapp_restaurantmenuitem', 'menuitem_product_avail_idx',
+    ),
+    'orders by status and creation time': (
+        lambda: Order.objects.filter(order_status='new').order_by('created'),
+        'foodcartapp_order', 'order_status_created_idx',
+    ),
+    'items of orders': (
+        lambda: OrderItem.objects.filter(order_id__in=[1, 2, 3]).values('order_id', 'product_id', 'quantity', 'price'),
+        'foodcartapp_orderitem', 'orderitem_order_covering_idx',
+    ),
+    'orders waiting for sales rollups': (
+        lambda: Order.objects.filter(rollup_dirty=True).dates('created', 'day'),
+        'foodcartapp_order', 'order_rollup_dirty_idx',
+    ),
+    'most expensive orders': (
+        lambda: Order.objects.order_by('-total_price')[:20],
+        'foodcartapp_order', 'order_total_price_idx',
+    ),
+}
+
+
+def full_scans(plan, table):
+    """Plan lines that read the whole table instead of an index."""
+    lines = []
+    for line in plan.splitlines():
+        if connection.vendor == 'postgresql' and f'Seq Scan on {table}' in line:
+            lines.append(line)
+        elif connection.vendor == 'sqlite':
+            # SQLite writes 'SCAN TABLE t' before 3.36 and 'SCAN t' after, covering index scans mention USING
+            words = line.replace('SCAN TABLE', 'SCAN').split()
+            if 'SCAN' in words and table in words and 'USING' not in words:
+                lines.append(line)
+    return lines
+
+
+class Command(BaseCommand):
+    help = 'Проверяет по EXPLAIN, что горячие запросы читают таблицы через индексы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=2000, help='число заказов в тестовой базе')
+        parser.add_argument('--verbose-plans', action='store_true', help='вывести планы запросов целиком')
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'Query plans of {connection.vendor} are not supported')
+
+        failures = []
+        with perf_tools.isolated_database():
+            perf_tools.seed_dataset(restaurants=20, products=100, orders=options['orders'])
+            # as in production, only orders changed since the last refresh wait for the rollups
+            refresh_sales_rollups()
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    cursor.execute('ANALYZE')
+                    # on a small database a sequential scan is cheaper anyway,
+                    # the check is whether the planner can use the index at all
+                    cursor.execute('SET enable_seqscan = off')
+                else:
+                    cursor.execute('ANALYZE')
+
+            for name, (get_queryset, table, index_name) in QUERY_PLANS.items():
+                plan = get_queryset().explain()
+                problems = [f'full scan: {line.strip()}' for line in full_scans(plan, table)]
+                if index_name not in plan:
+                    problems.append(f'index {index_name} is not used')
+
+                self.stdout.write(f'{name:<40}{"OK" if not problems else "FAIL"}')
+                for problem in problems:
+                    self.stdout.write(f'    {problem}')
+                if options['verbose_plans'] or problems:
+                    self.stdout.write('    ' + plan.replace('\n', '\n    '))
+                if problems:
+                    failures.append(name)
+
+        if failures:
+            raise CommandError(f'Queries without index access: {", ".join(failures)}')
@@ -0,0 +1,35 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError
+
+from foodcartapp import order_intake
+
+
+class Command(BaseCommand):
+    help = 'Переносит заказы из буфера приёма в базу данных пачками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='сколько заказов сохранять в одной транзакции')
+        parser.add_argument('--interval', type=float, default=None,
+                            help='работать постоянно, проверяя буфер раз в столько секунд')
+
+    def handle(self, *args, **options):
+        if not settings.ORDER_INTAKE_BUFFER:
+            raise CommandError('ORDER_INTAKE_BUFFER is not set')
+
+        while True:
+            try:
+                created = order_intake.drain(settings.ORDER_INTAKE_BUFFER, options['batch_size'])
+            except OperationalError as error:
+                if options['interval'] is None:
+                    raise CommandError(f'Orders stay in the buffer, the database is unavailable: {error}')
+                self.stderr.write(f'Заказы остались в буфере, база недоступна: {error}')
+                created = 0
+            if created:
+                self.stdout.write(f'Сохранено заказов: {created}')
+            if options['interval'] is None:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,182 @@
+import datetime
+import random
+
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from phonenumber_field.phonenumber import PhoneNumber
+
+from foodcartapp import menu_cache
+from foodcartapp.models import (ArchivedOrder, Order, OrderItem, Place,
+                                Product, ProductCategory, Restaurant,
+                                RestaurantMenuItem)
+
+RESTAURANT_ADDRESS_TEMPLATE = 'Москва, Ресторанная улица, {}'
+ORDER_ADDRESS_TEMPLATE = 'Москва, Заказная улица, {}'
+
+# relative order volume for every hour of the day: lunch and dinner peaks
+HOURLY_WEIGHTS = [1, 1, 1, 1, 1, 1, 2, 4, 6, 6, 8, 14, 20, 16, 10, 8, 9, 14, 18, 16, 10, 6, 3, 2]
+STATUS_WEIGHTS = {'new': 5, 'preparation': 5, 'in_delivery': 5, 'finished': 85}
+# a fixed date keeps the data of the same --seed the same on any day
+DEFAULT_UNTIL = datetime.date(2024, 1, 31)
+
+
+def coordinates(rnd):
+    return 55.55 + rnd.random() * 0.35, 37.35 + rnd.random() * 0.5
+
+
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def next_id(*models):
+    """An id above the ids of all the models, e.g. of orders and of archived orders."""
+    return max(model.objects.aggregate(max_id=Max('id'))['max_id'] or 0 for model in models) + 1
+
+
+class Command(BaseCommand):
+    help = 'Генерирует большой набор ресторанов, товаров и заказов для проверки производительности'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=50)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--products', type=int, default=300)
+        parser.add_argument('--orders', type=int, default=100000)
+        parser.add_argument('--addresses', type=int, default=None,
+                            help='число разных адресов доставки, по умолчанию равно числу заказов, но не больше 100000')
+        parser.add_argument('--menu-density', type=float, default=0.8,
+                            help='доля товаров, которые есть в меню ресторана')
+        parser.add_argument('--availability', type=float, default=0.9,
+                            help='доля пунктов меню, которые сейчас в продаже')
+        parser.add_argument('--days', type=int, default=90, help='за сколько дней до --until создавать заказы')
+        parser.add_argument('--until', type=datetime.date.fromisoformat, default=DEFAULT_UNTIL,
+                            help=f'дата последнего заказа, по умолчанию {DEFAULT_UNTIL}')
+        parser.add_argument('--chunk-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rnd = random.Random(options['seed'])
+        self.chunk_size = options['chunk_size']
+
+        restaurants = self.create_restaurants(options['restaurants'])
+        products = self.create_products(options['categories'], options['products'])
+        menus = self.create_menu_items(restaurants, products, options['menu_density'], options['availability'])
+        addresses = self.create_order_addresses(options['addresses'] or min(options['orders'], 100000))
+        self.create_orders(options['orders'], addresses, restaurants, products, menus, options)
+
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), [Order, OrderItem]):
+                cursor.execute(sql)
+        # bulk_create does not send signals
+        menu_cache.bump_menu_version()
+
+        if options['verbosity']:
+            self.stdout.write(
+                f'Создано: ресторанов {len(restaurants)}, товаров {len(products)}, заказов {options["orders"]}')
+
+    def create_places(self, addresses):
+        for chunk in chunked(addresses, self.chunk_size):
+            Place.objects.bulk_create([
+                Place(address=address, latitude=lat, longitude=lon)
+                for address in chunk
+                for lat, lon in [coordinates(self.rnd)]
+            ], ignore_conflicts=True)
+
+    def create_restaurants(self, count):
+        first_number = next_id(Restaurant)
+        restaurants = [
+            Restaurant(name=f'Star Burger {number}', address=RESTAURANT_ADDRESS_TEMPLATE.format(number),
+                       contact_phone=f'+7495{number:07d}', latitude=lat, longitude=lon)
+            for number in range(first_number, first_number + count)
+            for lat, lon in [coordinates(self.rnd)]
+        ]
+        Restaurant.objects.bulk_create(restaurants)
+        Place.objects.bulk_create([
+            Place(address=restaurant.address, latitude=restaurant.latitude, longitude=restaurant.longitude)
+            for restaurant in restaurants
+        ], ignore_conflicts=True)
+        return list(Restaurant.objects.filter(name__in=[restaurant.name for restaurant in restaurants]).order_by('id'))
+
+    def create_products(self, categories_count, products_count):
+        ProductCategory.objects.bulk_create([
+            ProductCategory(name=f'Категория {number}') for number in range(categories_count)
+        ])
+        categories = list(ProductCategory.objects.order_by('-id')[:categories_count])
+        first_number = next_id(Product)
+        products = [
+            Product(name=f'Товар {number}', category=self.rnd.choice(categories), image='burger.jpg',
+                    price=self.rnd.randint(50, 900), special_status=self.rnd.random() < 0.05)
+            for number in range(first_number, first_number + products_count)
+        ]
+        Product.objects.bulk_create(products)
+        return list(Product.objects.order_by('-id')[:products_count])
+
+    def create_menu_items(self, restaurants, products, density, availability):
+        menus = {}
+        menu_items = []
+        for restaurant in restaurants:
+            menu = [product for product in products if self.rnd.random() < density]
+            menus[restaurant.id] = menu
+            menu_items += [
+                RestaurantMenuItem(restaurant=restaurant, product=product,
+                                   availability=self.rnd.random() < availability)
+                for product in menu
+            ]
+        RestaurantMenuItem.objects.bulk_create(menu_items)
+        return menus
+
+    def create_order_addresses(self, count):
+        addresses = [ORDER_ADDRESS_TEMPLATE.format(number) for number in range(1, count + 1)]
+        self.create_places(addresses)
+        return addresses
+
+    def generate_orders(self, count, first_id, addresses, restaurants, products, menus, options):
+        until = options['until']
+        period_start = datetime.datetime.combine(
+            until - datetime.timedelta(days=options['days'] - 1), datetime.time(), tzinfo=datetime.timezone.utc)
+        statuses = list(STATUS_WEIGHTS)
+        status_weights = list(STATUS_WEIGHTS.values())
+        phonenumbers = [PhoneNumber.from_string(f'+7929{number:07d}') for number in range(1000)]
+
+        for order_id in range(first_id, first_id + count):
+            created = period_start + datetime.timedelta(
+                days=self.rnd.randrange(options['days']),
+                hours=self.rnd.choices(range(24), weights=HOURLY_WEIGHTS)[0],
+                seconds=self.rnd.randrange(3600),
+            )
+            status = self.rnd.choices(statuses, weights=status_weights)[0]
+            restaurant = None if status == 'new' or not restaurants else self.rnd.choice(restaurants)
+            called = None if status == 'new' else created + datetime.timedelta(minutes=self.rnd.expovariate(1 / 5))
+            delivered = None
+            if status == 'finished':
+                delivered = called + datetime.timedelta(minutes=20 + self.rnd.expovariate(1 / 25))
+
+            menu = menus[restaurant.id] if restaurant and menus[restaurant.id] else products
+            items = [
+                OrderItem(order_id=order_id, product=product, quantity=quantity, price=product.price * quantity)
+                for product in self.rnd.sample(menu, min(len(menu), self.rnd.randint(1, 4)))
+                for quantity in [self.rnd.randint(1, 3)]
+            ]
+            order = Order(
+                id=order_id, firstname='Клиент', lastname=f'Номер {order_id}',
+                address=self.rnd.choice(addresses), phonenumber=self.rnd.choice(phonenumbers),
+                order_status=status, payment=self.rnd.choice(['cash', 'card']),
+                created=created, called=called, delivered=delivered, restaurant=restaurant,
+                total_price=sum(item.price for item in items),
+            )
+            yield order, items
+
+    def create_orders(self, count, addresses, restaurants, products, menus, options):
+        orders = self.generate_orders(count, next_id(Order, ArchivedOrder), addresses, restaurants, products, menus, options)
+        for chunk in chunked(orders, self.chunk_size):
+            with transaction.atomic():
+                Order.objects.bulk_create([order for order, _ in chunk])
+                OrderItem.objects.bulk_create([item for _, items in chunk for item in items])
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии и WebP-версии картинок товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='пересоздать копии и у товаров, где они уже есть')
+
+    def handle(self, *args, **options):
+        generated = failed = 0
+        for product in Product.objects.exclude(image='').only('id', 'image', 'image_variants').iterator():
+            if not options['force'] and product.image_variants.get('source') == product.image.name:
+                continue
+            product.update_image_variants()
+            if product.image_variants:
+                generated += 1
+            else:
+                failed += 1
+        self.stdout.write(f'Обработано товаров: {generated}, не удалось прочитать картинку: {failed}')
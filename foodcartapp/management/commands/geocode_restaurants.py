@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from foodcartapp import geodata_functions, menu_cache
+from foodcartapp.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = 'Заполняет координаты ресторанов по их адресам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='пересчитать координаты и у ресторанов, где они уже есть')
+
+    def handle(self, *args, **options):
+        restaurants = Restaurant.objects.exclude(address='')
+        if not options['force']:
+            restaurants = restaurants.filter(latitude__isnull=True) | restaurants.filter(longitude__isnull=True)
+        restaurants = list(restaurants)
+
+        coordinates = geodata_functions.get_coordinates_for_addresses(
+            settings.YANDEX_API_KEY, [restaurant.address for restaurant in restaurants])
+        not_found = 0
+        for restaurant in restaurants:
+            restaurant.longitude, restaurant.latitude = coordinates.get(restaurant.address) or (None, None)
+            not_found += restaurant.latitude is None
+        Restaurant.objects.bulk_update(restaurants, ['latitude', 'longitude'])
+        # bulk_update does not send signals
+        menu_cache.bump_menu_version()
+
+        self.stdout.write(f'Обновлено ресторанов: {len(restaurants) - not_found}, адрес не найден: {not_found}')
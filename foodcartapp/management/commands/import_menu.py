@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from foodcartapp.menu_import import import_menu
+
+
+class Command(BaseCommand):
+    help = 'Загружает товары, категории и меню ресторанов из CSV-файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV с колонками restaurant, product, category, price, available, description')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='сколько строк сохранять в одной транзакции')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        with open(options['path'], encoding='utf-8-sig', newline='') as csv_file:
+            report = import_menu(csv_file, options['chunk_size'])
+        elapsed = time.perf_counter() - started
+
+        for line_number, message in report.errors:
+            self.stderr.write(f'Строка {line_number}: {message}')
+        self.stdout.write(
+            f'Строк: {report.rows}, товаров создано {report.created_products}, обновлено {report.updated_products}, '
+            f'позиций меню создано {report.created_menu_items}, обновлено {report.updated_menu_items}, '
+            f'ошибок {len(report.errors)}, время {elapsed:.1f} с'
+        )
+        if report.errors and not report.rows:
+            raise CommandError('Nothing imported')
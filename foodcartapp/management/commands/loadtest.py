@@ -0,0 +1,255 @@
+import itertools
+import json
+import multiprocessing
+import queue
+import random
+import socket
+import threading
+import time
+from collections import defaultdict
+
+import requests
+import uvicorn
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import (ThreadedWSGIServer,
+                                          WSGIRequestHandler)
+from django.db import connections
+
+from foodcartapp import perf_tools
+from foodcartapp.management.commands.generate_dataset import \
+    ORDER_ADDRESS_TEMPLATE
+from foodcartapp.models import Product
+
+MANAGER_USERNAME = 'loadtest-manager'
+MANAGER_PASSWORD = 'loadtest-password'
+
+DEFAULT_MIX = 'products=6,order=3,manager_orders=1'
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def serve_wsgi(port_queue):
+    connections.close_all()
+    server = ThreadedWSGIServer(('127.0.0.1', 0), QuietRequestHandler)
+    server.set_app(WSGIHandler())
+    port_queue.put(server.server_port)
+    server.serve_forever()
+
+
+def serve_asgi(port_queue):
+    connections.close_all()
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    # clients connecting before uvicorn starts wait in the backlog instead of being refused
+    sock.listen(128)
+    port_queue.put(sock.getsockname()[1])
+    config = uvicorn.Config(ASGIHandler(), lifespan='off', log_level='warning', access_log=False)
+    uvicorn.Server(config).run(sockets=[sock])
+
+
+SERVERS = {
+    'wsgi': serve_wsgi,
+    'asgi': serve_asgi,
+}
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return None
+    index = max(0, int(round(percent / 100 * len(sorted_values))) - 1)
+    return sorted_values[index]
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        if name not in Command.endpoints:
+            raise CommandError(f'Unknown endpoint in mix: {name}')
+        weights[name] = int(weight or 1)
+    return weights
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочный тест публичного API и страниц менеджера на сгенерированной базе'
+
+    endpoints = {
+        'products': ('GET', '/api/products/'),
+        'banners': ('GET', '/api/banners/'),
+        'order': ('POST', '/api/order/'),
+        'manager_products': ('GET', '/manager/products/'),
+        'manager_orders': ('GET', '/manager/orders/'),
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=30, help='длительность теста, секунды')
+        parser.add_argument('--concurrency', type=int, default=8, help='число одновременных клиентов')
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help=f'доли запросов к эндпоинтам, по умолчанию {DEFAULT_MIX}')
+        parser.add_argument('--restaurants', type=int, default=10)
+        parser.add_argument('--products', type=int, default=50)
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--new-addresses', type=float, default=0,
+                            help='доля заказов на адреса, которых нет в базе: их геокодирует страница заказов')
+        parser.add_argument('--server', choices=list(SERVERS), default='wsgi',
+                            help='wsgi — многопоточный сервер Django, asgi — uvicorn')
+        parser.add_argument('--output', help='куда записать результаты в JSON')
+
+    def handle(self, *args, **options):
+        weights = parse_mix(options['mix'])
+        settings.DEBUG = False
+
+        with perf_tools.isolated_database(), perf_tools.stub_geocoder():
+            perf_tools.seed_dataset(
+                restaurants=options['restaurants'],
+                products=options['products'],
+                orders=options['orders'],
+                seed=options['seed'],
+            )
+            get_user_model().objects.create_user(
+                MANAGER_USERNAME, password=MANAGER_PASSWORD, is_staff=True)
+            product_ids = list(Product.objects.values_list('id', flat=True))
+            connections.close_all()
+
+            port_queue = multiprocessing.get_context('fork').Queue()
+            server = multiprocessing.get_context('fork').Process(
+                target=SERVERS[options['server']], args=(port_queue,), daemon=True)
+            server.start()
+            try:
+                try:
+                    base_url = f'http://127.0.0.1:{port_queue.get(timeout=10)}'
+                except queue.Empty:
+                    raise CommandError(f'The {options["server"]} server did not start in 10 seconds')
+                results = self.run_clients(base_url, weights, product_ids, options)
+            finally:
+                server.terminate()
+                server.join()
+
+        report = self.build_report(results, options)
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w') as output_file:
+                json.dump(report, output_file, indent=4, ensure_ascii=False)
+
+    def run_clients(self, base_url, weights, product_ids, options):
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        startup_errors = []
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['duration']
+
+        def client(number):
+            rnd = random.Random(options['seed'] * 1000 + number)
+            public_session = requests.Session()
+            manager_session = requests.Session()
+            try:
+                if any(name.startswith('manager_') for name in weights):
+                    self.login(manager_session, base_url)
+            except (requests.RequestException, CommandError) as error:
+                # a client that could not start would silently lower the load
+                with lock:
+                    startup_errors.append(f'client {number}: {error}')
+                return
+            new_addresses = (f'Москва, Новая улица, {number}-{index}' for index in itertools.count())
+
+            def next_address():
+                if rnd.random() < options['new_addresses']:
+                    return next(new_addresses)
+                return ORDER_ADDRESS_TEMPLATE.format(rnd.randint(1, options['orders']))
+
+            names = list(weights)
+            while time.monotonic() < deadline:
+                name = rnd.choices(names, weights=[weights[name] for name in names])[0]
+                method, path = self.endpoints[name]
+                payload = None
+                if name == 'order':
+                    payload = {
+                        'firstname': 'Иван',
+                        'lastname': 'Петров',
+                        'phonenumber': '+79291000000',
+                        'address': next_address(),
+                        'products': [
+                            {'product': product_id, 'quantity': rnd.randint(1, 3)}
+                            for product_id in rnd.sample(product_ids, min(len(product_ids), rnd.randint(1, 3)))
+                        ],
+                    }
+                session = manager_session if name.startswith('manager_') else public_session
+                started = time.perf_counter()
+                try:
+                    response = session.request(method, base_url + path, json=payload)
+                    failed = not response.ok
+                except requests.RequestException:
+                    failed = True
+                elapsed = time.perf_counter() - started
+                with lock:
+                    if failed:
+                        errors[name] += 1
+                    else:
+                        latencies[name].append(elapsed)
+
+        started = time.monotonic()
+        threads = [threading.Thread(target=client, args=(number,)) for number in range(options['concurrency'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        if startup_errors:
+            raise CommandError('Clients failed to start: ' + '; '.join(startup_errors))
+        return latencies, errors, elapsed
+
+    def login(self, session, base_url):
+        login_url = f'{base_url}/manager/login/'
+        session.get(login_url).raise_for_status()
+        if settings.CSRF_COOKIE_NAME not in session.cookies:
+            raise CommandError('The login page did not set the CSRF cookie')
+        session.post(login_url, data={
+            'username': MANAGER_USERNAME,
+            'password': MANAGER_PASSWORD,
+            'csrfmiddlewaretoken': session.cookies[settings.CSRF_COOKIE_NAME],
+        }, headers={'Referer': login_url}).raise_for_status()
+        if settings.SESSION_COOKIE_NAME not in session.cookies:
+            raise CommandError(f'Manager {MANAGER_USERNAME} could not log in')
+
+    def build_report(self, results, options):
+        latencies, errors, elapsed = results
+        endpoints = {}
+        for name in sorted(set(latencies) | set(errors)):
+            values = sorted(latencies[name])
+            endpoints[name] = {
+                'requests': len(values),
+                'errors': errors[name],
+                'throughput_rps': round(len(values) / elapsed, 2),
+                'p50_ms': round(percentile(values, 50) * 1000, 2) if values else None,
+                'p95_ms': round(percentile(values, 95) * 1000, 2) if values else None,
+                'p99_ms': round(percentile(values, 99) * 1000, 2) if values else None,
+            }
+        return {
+            'config': {
+                **{
+                    key: options[key]
+                    for key in ['server', 'duration', 'concurrency', 'mix', 'restaurants', 'products', 'orders',
+                                'seed', 'new_addresses']
+                },
+                'stub_geocoder_delay_ms': settings.STUB_GEOCODER_DELAY_MS,
+            },
+            'elapsed_seconds': round(elapsed, 2),
+            'endpoints': endpoints,
+        }
+
+    def print_report(self, report):
+        self.stdout.write(f'{"endpoint":<20}{"requests":>10}{"errors":>8}{"rps":>10}'
+                          f'{"p50 ms":>10}{"p95 ms":>10}{"p99 ms":>10}')
+        for name, stats in report['endpoints'].items():
+            self.stdout.write(
+                f'{name:<20}{stats["requests"]:>10}{stats["errors"]:>8}{stats["throughput_rps"]:>10}'
+                f'{stats["p50_ms"] or "-":>10}{stats["p95_ms"] or "-":>10}{stats["p99_ms"] or "-":>10}'
+            )
@@ -0,0 +1,25 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from foodcartapp.sales import refresh_sales_rollups
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сводки продаж за дни, в которые появились или изменились заказы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='пересчитать все дни, начиная с даты ГГГГ-ММ-ДД')
+
+    def handle(self, *args, **options):
+        days = None
+        if options['since']:
+            try:
+                since = datetime.date.fromisoformat(options['since'])
+            except ValueError:
+                raise CommandError(f'Invalid date: {options["since"]}')
+            today = timezone.localdate()
+            days = [since + datetime.timedelta(days=offset) for offset in range((today - since).days + 1)]
+        days = refresh_sales_rollups(days)
+        self.stdout.write(f'Пересчитано дней: {len(days)}')
@@ -0,0 +1,95 @@
+"""Per-process cache of menu-derived data, invalidated through `MenuVersion`.
+
+Every change of restaurants, products, categories and menu items bumps the
+version in the database, signals cover `save()` and `delete()`, code doing
+`update()` or `bulk_create()` calls `bump_menu_version` itself. Each worker
+re-reads the version at most once per `MENU_VERSION_CHECK_INTERVAL` seconds
+and drops its cached values when it has changed.
+
+Versions and values are kept per database alias the reads are routed to: a
+lagging replica has its own older version, so a menu computed from it is
+never served as the primary's current one.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from foodcartapp import models
+
+MENU_VERSION_ID = 1
+
+_lock = threading.Lock()
+# database alias -> {'version': ..., 'checked_at': ...}
+_states = {}
+# (database alias, key) -> (menu version, value)
+_values = {}
+
+
+def _increment():
+    if models.MenuVersion.objects.filter(pk=MENU_VERSION_ID).update(version=F('version') + 1):
+        return
+    try:
+        with transaction.atomic():
+            models.MenuVersion.objects.create(pk=MENU_VERSION_ID, version=1)
+    except IntegrityError:
+        models.MenuVersion.objects.filter(pk=MENU_VERSION_ID).update(version=F('version') + 1)
+
+
+def bump_menu_version():
+    """Bump the version once the current transaction commits.
+
+    Bumping earlier would let another worker cache the old menu under the new version.
+    """
+    def bump():
+        _increment()
+        # this process sees its own changes at once
+        for state in _states.values():
+            state['checked_at'] = float('-inf')
+
+    transaction.on_commit(bump)
+
+
+def current_menu_version(using=None):
+    using = using or router.db_for_read(models.MenuVersion)
+    state = _states.setdefault(using, {'version': None, 'checked_at': float('-inf')})
+    now = time.monotonic()
+    if now - state['checked_at'] >= settings.MENU_VERSION_CHECK_INTERVAL:
+        state['version'] = models.MenuVersion.objects.using(using).filter(
+            pk=MENU_VERSION_ID).values_list('version', flat=True).first() or 0
+        state['checked_at'] = now
+    return state['version']
+
+
+def get_or_set(key, compute):
+    """Return the value cached for the current menu version, computing it when missing or stale.
+
+    `compute` reads through the same router as the version, see `star_burger.db_router`.
+    """
+    using = router.db_for_read(models.MenuVersion)
+    version = current_menu_version(using)
+    cached = _values.get((using, key))
+    if cached and cached[0] == version:
+        return cached[1]
+    value = compute()
+    with _lock:
+        _values[(using, key)] = (version, value)
+    return value
+
+
+def clear():
+    with _lock:
+        _values.clear()
+        _states.clear()
+
+
+@receiver([post_save, post_delete], sender='foodcartapp.Restaurant')
+@receiver([post_save, post_delete], sender='foodcartapp.Product')
+@receiver([post_save, post_delete], sender='foodcartapp.ProductCategory')
+@receiver([post_save, post_delete], sender='foodcartapp.RestaurantMenuItem')
+def bump_on_menu_change(sender, **kwargs):
+    bump_menu_version()
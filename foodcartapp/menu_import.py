@@ -0,0 +1,229 @@
+"""Import products, categories and restaurant menus from CSV.
+
+One row is one menu item:
+
+    restaurant,product,category,price,available,description
+    Star Burger Арбат,Чизбургер,Бургеры,250,1,
+
+`restaurant`, `product` and `price` are required. Restaurants, categories and
+products are matched by name and created when missing; a product gets the
+price, category and description of its last row. New products have no
+image until it is uploaded in the admin. Names longer than the model fields
+allow and prices that don't fit the price field are reported as row errors. The file is read as a stream and written
+in chunks, one transaction per chunk.
+"""
+import csv
+import decimal
+
+from django.db import connection, transaction
+
+from foodcartapp import menu_cache
+from foodcartapp.models import Product, ProductCategory, Restaurant, RestaurantMenuItem
+
+REQUIRED_COLUMNS = {'restaurant', 'product', 'price'}
+TRUE_VALUES = {'1', 'true', 'yes', 'да', '+'}
+FALSE_VALUES = {'0', 'false', 'no', 'нет', '-'}
+NAME_LENGTHS = {
+    'restaurant': Restaurant._meta.get_field('name').max_length,
+    'product': Product._meta.get_field('name').max_length,
+    'category': ProductCategory._meta.get_field('name').max_length,
+}
+PRICE_FIELD = Product._meta.get_field('price')
+PRICE_STEP = decimal.Decimal(1).scaleb(-PRICE_FIELD.decimal_places)
+PRICE_LIMIT = decimal.Decimal(10) ** (PRICE_FIELD.max_digits - PRICE_FIELD.decimal_places)
+# keeps IN clauses under the SQLite bound parameters limit
+IDS_PER_QUERY = 900
+
+
+class RowError(ValueError):
+    pass
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created_products = 0
+        self.updated_products = 0
+        self.created_menu_items = 0
+        self.updated_menu_items = 0
+        # (line number, message)
+        self.errors = []
+
+
+def parse_row(row):
+    restaurant = (row.get('restaurant') or '').strip()
+    product = (row.get('product') or '').strip()
+    if not restaurant or not product:
+        raise RowError('не указан ресторан или товар')
+    for column, max_length in NAME_LENGTHS.items():
+        if len((row.get(column) or '').strip()) > max_length:
+            raise RowError(f'название в колонке {column} длиннее {max_length} символов')
+    try:
+        price = decimal.Decimal((row.get('price') or '').strip().replace(',', '.'))
+    except decimal.InvalidOperation:
+        raise RowError(f'неверная цена: {row.get("price")!r}')
+    if price < 0 or not price.is_finite():
+        raise RowError(f'неверная цена: {row.get("price")!r}')
+    if price >= PRICE_LIMIT:
+        raise RowError(f'цена больше {PRICE_LIMIT - PRICE_STEP}: {row.get("price")!r}')
+    if price != price.quantize(PRICE_STEP):
+        raise RowError(f'в цене больше {PRICE_FIELD.decimal_places} знаков после запятой: {row.get("price")!r}')
+    available = (row.get('available') or '1').strip().lower()
+    if available not in TRUE_VALUES | FALSE_VALUES:
+        raise RowError(f'неверное значение available: {row.get("available")!r}')
+    return {
+        'restaurant': restaurant,
+        'product': product,
+        'category': (row.get('category') or '').strip(),
+        'price': price.quantize(PRICE_STEP),
+        'available': available in TRUE_VALUES,
+        'description': (row.get('description') or '').strip()[:200],
+    }
+
+
+def save_new(model, objects, fields):
+    """Insert the objects and set their ids, returns the objects that got an id.
+
+    Where the database can't return the ids of inserted rows, as SQLite, they
+    are read back by the values of `fields` from the rows above the last id.
+    """
+    if not objects:
+        return []
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objects)
+    last_id = model.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    model.objects.bulk_create(objects)
+    by_values = {tuple(getattr(obj, field) for field in fields): obj for obj in objects}
+    for obj_id, *values in model.objects.filter(id__gt=last_id).values_list('id', *fields).order_by('id'):
+        obj = by_values.get(tuple(values))
+        # rows inserted meanwhile by someone else don't match or come after ours
+        if obj is not None and obj.id is None:
+            obj.id = obj_id
+    return [obj for obj in objects if obj.id is not None]
+
+
+class MenuImporter:
+    def __init__(self, chunk_size=5000):
+        self.chunk_size = chunk_size
+        self.report = ImportReport()
+        self.restaurants = {restaurant.name: restaurant for restaurant in Restaurant.objects.all()}
+        self.categories = {category.name: category for category in ProductCategory.objects.all()}
+        self.products = {product.name: product for product in Product.objects.order_by('id')}
+        # (restaurant id, product id) -> [menu item id, availability], loaded per restaurant
+        self.menu_items = {}
+        self.loaded_restaurants = set()
+
+    def run(self, lines):
+        reader = csv.DictReader(lines)
+        missing = REQUIRED_COLUMNS - set(reader.fieldnames or [])
+        if missing:
+            self.report.errors.append((1, f'нет колонок: {", ".join(sorted(missing))}'))
+            return self.report
+
+        chunk = []
+        for row in reader:
+            self.report.rows += 1
+            try:
+                chunk.append({**parse_row(row), 'line': reader.line_num})
+            except RowError as error:
+                self.report.errors.append((reader.line_num, str(error)))
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+        menu_cache.bump_menu_version()
+        return self.report
+
+    @transaction.atomic
+    def import_chunk(self, rows):
+        products = self.upsert_products(rows)
+
+        created, updated = [], []
+        pending = {}
+        lines = {}
+        for row in rows:
+            if row['product'] not in products:
+                self.report.errors.append((row['line'], 'товар не найден после сохранения'))
+                continue
+            restaurant = self.get_restaurant(row['restaurant'])
+            key = (restaurant.id, products[row['product']].id)
+            if key in pending:
+                pending[key].availability = row['available']
+                continue
+            existing = self.menu_items.get(key)
+            if existing is None:
+                menu_item = RestaurantMenuItem(restaurant_id=key[0], product_id=key[1], availability=row['available'])
+                created.append(menu_item)
+            elif existing[1] != row['available']:
+                menu_item = RestaurantMenuItem(id=existing[0], restaurant_id=key[0], product_id=key[1],
+                                               availability=row['available'])
+                updated.append(menu_item)
+            else:
+                continue
+            pending[key] = menu_item
+            lines[key] = row['line']
+
+        saved = save_new(RestaurantMenuItem, created, ('restaurant_id', 'product_id'))
+        for key, menu_item in pending.items():
+            if menu_item.id is not None:
+                self.menu_items[key] = [menu_item.id, menu_item.availability]
+            else:
+                self.report.errors.append((lines[key], 'пункт меню не найден после сохранения'))
+        # one UPDATE per availability value is much cheaper than bulk_update's CASE per row
+        for availability in (True, False):
+            ids = [menu_item.id for menu_item in updated if menu_item.availability == availability]
+            for start in range(0, len(ids), IDS_PER_QUERY):
+                RestaurantMenuItem.objects.filter(id__in=ids[start:start + IDS_PER_QUERY]).update(
+                    availability=availability)
+        self.report.created_menu_items += len(saved)
+        self.report.updated_menu_items += len(updated)
+
+    def upsert_products(self, rows):
+        latest = {row['product']: row for row in rows}
+        created, updated = [], []
+        for name, row in latest.items():
+            category = self.get_category(row['category'])
+            product = self.products.get(name)
+            if product is None:
+                product = Product(name=name, price=row['price'], category=category, description=row['description'])
+                created.append(product)
+            elif (product.price, product.category_id, product.description) != (
+                    row['price'], category and category.id, row['description'] or product.description):
+                product.price = row['price']
+                product.category = category
+                product.description = row['description'] or product.description
+                updated.append(product)
+
+        saved = save_new(Product, created, ('name',))
+        for product in saved:
+            self.products[product.name] = product
+        Product.objects.bulk_update(updated, ['price', 'category', 'description'])
+        self.report.created_products += len(saved)
+        self.report.updated_products += len(updated)
+        # products the read-back missed are left out, their rows are reported
+        return {name: self.products[name] for name in latest if name in self.products}
+
+    def get_restaurant(self, name):
+        restaurant = self.restaurants.get(name)
+        if restaurant is None:
+            restaurant = self.restaurants[name] = Restaurant.objects.create(name=name)
+        if restaurant.id not in self.loaded_restaurants:
+            for menu_item_id, product_id, availability in RestaurantMenuItem.objects.filter(
+                    restaurant=restaurant).values_list('id', 'product_id', 'availability'):
+                self.menu_items[(restaurant.id, product_id)] = [menu_item_id, availability]
+            self.loaded_restaurants.add(restaurant.id)
+        return restaurant
+
+    def get_category(self, name):
+        if not name:
+            return None
+        category = self.categories.get(name)
+        if category is None:
+            category = self.categories[name] = ProductCategory.objects.create(name=name)
+        return category
+
+
+def import_menu(lines, chunk_size=5000):
+    """Import CSV lines, returns an `ImportReport` with `(line number, message)` errors."""
+    return MenuImporter(chunk_size).run(lines)
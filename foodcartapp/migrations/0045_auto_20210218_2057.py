@@ -1,11 +1,14 @@
 # Generated by Django 3.0.7 on 2021-02-18 20:57
 
 from django.db import migrations
+from django.db.models import F, OuterRef, Subquery
 
 
 def calc_order_items_price(apps, schema_editor):
     OrderItem = apps.get_model('foodcartapp', 'OrderItem')
-    OrderItem.objects.select_related('product').update(price=F('quantity') * F('product__price'))
+    Product = apps.get_model('foodcartapp', 'Product')
+    product_price = Product.objects.filter(pk=OuterRef('product_id')).values('price')
+    OrderItem.objects.update(price=F('quantity') * Subquery(product_price))
 
 
 class Migration(migrations.Migration):
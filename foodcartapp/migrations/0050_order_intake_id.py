@@ -0,0 +1,55 @@
+# Generated by Django 3.0.7 on 2026-10-19 08:11
+
+from django.db import migrations, models
+import django.utils.timezone
+import phonenumber_field.modelfields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0049_auto_20210719_1549'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='intake_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True, verbose_name='номер в буфере приёма'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='called',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='время звонка'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='created',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='время создания'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='delivered',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='время доставки'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='order_status',
+            field=models.CharField(choices=[('new', 'Новый'), ('preparation', 'Готовится'), ('in_delivery', 'У курьера'), ('finished', 'Доставлен')], db_index=True, default='new', max_length=15, verbose_name='статус заказа'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='payment',
+            field=models.CharField(choices=[('cash', 'Наличные'), ('card', 'Картой на сайте')], db_index=True, max_length=15, verbose_name='способ оплаты'),
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='phonenumber',
+            field=phonenumber_field.modelfields.PhoneNumberField(db_index=True, max_length=128, region=None),
+        ),
+        migrations.AlterField(
+            model_name='restaurant',
+            name='name',
+            field=models.CharField(db_index=True, max_length=50, verbose_name='название'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 3.0.7 on 2026-10-19 08:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0050_order_intake_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocoderDailyUsage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='дата')),
+                ('requests', models.PositiveIntegerField(default=0, verbose_name='запросов к API')),
+            ],
+            options={
+                'verbose_name': 'использование Геокодера за день',
+                'verbose_name_plural': 'использование Геокодера по дням',
+            },
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 3.1.14 on 2026-10-19 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0052_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='order_status',
+            field=models.CharField(choices=[('new', 'Новый'), ('preparation', 'Готовится'), ('in_delivery', 'У курьера'), ('finished', 'Доставлен')], default='new', max_length=15, verbose_name='статус заказа'),
+        ),
+        migrations.AlterField(
+            model_name='restaurantmenuitem',
+            name='availability',
+            field=models.BooleanField(default=True, verbose_name='в продаже'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['order_status', 'created'], name='order_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['order', 'product', 'quantity', 'price'], name='orderitem_order_covering_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantmenuitem',
+            index=models.Index(condition=models.Q(availability=True), fields=['restaurant', 'product', 'availability'], name='menuitem_available_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='restaurantmenuitem',
+            index=models.Index(fields=['product', 'availability'], name='menuitem_product_avail_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.db import migrations
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_order_total_price(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    OrderItem = apps.get_model('foodcartapp', 'OrderItem')
+    order_total = OrderItem.objects.filter(order=OuterRef('pk')).values('order').annotate(
+        total=Sum('price')).values('total')
+    Order.objects.update(total_price=Coalesce(
+        Subquery(order_total, output_field=DecimalField()), Value(0), output_field=DecimalField()))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('foodcartapp', '0054_order_total_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_order_total_price, migrations.RunPython.noop),
+    ]
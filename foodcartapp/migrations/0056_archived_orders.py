@@ -0,0 +1,53 @@
+# Generated by Django 3.1.14 on 2026-10-19 08:32
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import phonenumber_field.modelfields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0055_fill_order_total_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='номер заказа')),
+                ('firstname', models.CharField(max_length=50, verbose_name='имя')),
+                ('lastname', models.CharField(max_length=50, verbose_name='фамилия')),
+                ('address', models.CharField(max_length=250, verbose_name='адрес')),
+                ('phonenumber', phonenumber_field.modelfields.PhoneNumberField(max_length=128, region=None)),
+                ('order_status', models.CharField(choices=[('new', 'Новый'), ('preparation', 'Готовится'), ('in_delivery', 'У курьера'), ('finished', 'Доставлен')], max_length=15, verbose_name='статус заказа')),
+                ('comment', models.TextField(blank=True, verbose_name='комментарий')),
+                ('created', models.DateTimeField(db_index=True, verbose_name='время создания')),
+                ('called', models.DateTimeField(blank=True, null=True, verbose_name='время звонка')),
+                ('delivered', models.DateTimeField(blank=True, null=True, verbose_name='время доставки')),
+                ('payment', models.CharField(choices=[('cash', 'Наличные'), ('card', 'Картой на сайте')], max_length=15, verbose_name='способ оплаты')),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='сумма заказа')),
+                ('archived', models.DateTimeField(default=django.utils.timezone.now, verbose_name='время архивации')),
+                ('restaurant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to='foodcartapp.restaurant', verbose_name='ресторан')),
+            ],
+            options={
+                'verbose_name': 'архивный заказ',
+                'verbose_name_plural': 'архивные заказы',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveSmallIntegerField(verbose_name='количество')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=8, null=True, verbose_name='стоимость позиции')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_items', to='foodcartapp.archivedorder', verbose_name='заказ')),
+                ('product', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_order_items', to='foodcartapp.product', verbose_name='продукт')),
+            ],
+            options={
+                'verbose_name': 'элемент архивного заказа',
+                'verbose_name_plural': 'элементы архивного заказа',
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 3.1.14 on 2026-10-19 08:41
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0058_restaurant_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProductSales',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='день')),
+                ('quantity', models.PositiveIntegerField(verbose_name='продано штук')),
+                ('orders_count', models.PositiveIntegerField(verbose_name='заказов')),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='выручка')),
+            ],
+            options={
+                'verbose_name': 'продажи товара за день',
+                'verbose_name_plural': 'продажи товаров по дням',
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyRestaurantSales',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='день')),
+                ('orders_count', models.PositiveIntegerField(verbose_name='заказов')),
+                ('revenue', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='выручка')),
+            ],
+            options={
+                'verbose_name': 'продажи ресторана за день',
+                'verbose_name_plural': 'продажи ресторанов по дням',
+            },
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='rollup_dirty',
+            field=models.BooleanField(default=True, editable=False, verbose_name='не учтён в сводках продаж'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(rollup_dirty=True), fields=['created'], name='order_rollup_dirty_idx'),
+        ),
+        migrations.AddField(
+            model_name='dailyrestaurantsales',
+            name='restaurant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_sales', to='foodcartapp.restaurant', verbose_name='ресторан'),
+        ),
+        migrations.AddField(
+            model_name='dailyproductsales',
+            name='product',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_sales', to='foodcartapp.product', verbose_name='товар'),
+        ),
+        migrations.AddField(
+            model_name='dailyproductsales',
+            name='restaurant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_product_sales', to='foodcartapp.restaurant', verbose_name='ресторан'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyrestaurantsales',
+            index=models.Index(fields=['day', 'restaurant'], name='restaurant_sales_day_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyproductsales',
+            index=models.Index(fields=['day', 'product'], name='product_sales_day_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.1.14 on 2026-10-19 08:43
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0059_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeliveryTimeStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='день')),
+                ('hour', models.PositiveSmallIntegerField(verbose_name='час')),
+                ('call_minutes', models.JSONField(verbose_name='минут до звонка')),
+                ('delivery_minutes', models.JSONField(verbose_name='минут до доставки')),
+                ('restaurant', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='delivery_time_stats', to='foodcartapp.restaurant', verbose_name='ресторан')),
+            ],
+            options={
+                'verbose_name': 'время доставки за час',
+                'verbose_name_plural': 'время доставки по часам',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='deliverytimestats',
+            index=models.Index(fields=['day', 'restaurant'], name='delivery_stats_day_idx'),
+        ),
+    ]
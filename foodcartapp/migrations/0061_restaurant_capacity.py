@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-19 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0060_delivery_time_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='restaurant',
+            name='capacity',
+            field=models.PositiveSmallIntegerField(default=20, help_text='сколько новых и готовящихся заказов назначать ресторану автоматически', verbose_name='вместимость'),
+        ),
+    ]
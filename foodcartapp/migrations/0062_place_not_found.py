@@ -0,0 +1,23 @@
+# Generated by Django 3.1.14 on 2026-10-19 09:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0061_restaurant_capacity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='place',
+            name='latitude',
+            field=models.FloatField(blank=True, help_text='пусто, если Геокодер не нашёл адрес', null=True, verbose_name='широта'),
+        ),
+        migrations.AlterField(
+            model_name='place',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True, verbose_name='долгота'),
+        ),
+    ]
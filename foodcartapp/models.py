@@ -3,12 +3,13 @@ import itertools
 from django.conf import settings
 from django.core.validators import MinValueValidator
 from django.db import models
-from django.db.models import Prefetch, Sum
+from django.db.models import Sum
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from geopy import distance
 from phonenumber_field.modelfields import PhoneNumberField
 
-from foodcartapp import geodata_functions
+from foodcartapp import geodata_functions, images, menu_cache, split_orders
 
 
 class Restaurant(models.Model):
@@ -16,6 +17,11 @@ class Restaurant(models.Model):
     address = models.CharField('адрес', max_length=100, blank=True)
     contact_phone = models.CharField(
         'контактный телефон', max_length=50, blank=True)
+    latitude = models.FloatField('широта', null=True, blank=True)
+    longitude = models.FloatField('долгота', null=True, blank=True)
+    capacity = models.PositiveSmallIntegerField(
+        'вместимость', default=20,
+        help_text='сколько новых и готовящихся заказов назначать ресторану автоматически')
 
     class Meta:
         verbose_name = 'ресторан'
@@ -24,6 +30,24 @@ class Restaurant(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def coordinates(self):
+        """`(latitude, longitude)` as geopy expects them, or None if unknown."""
+        if self.latitude is None or self.longitude is None:
+            return None
+        return self.latitude, self.longitude
+
+    def geocode_address(self):
+        """Fill the coordinates from the address, the caller saves the restaurant.
+
+        The coordinates are cleared first, so if the geocoder fails with
+        `requests.exceptions.RequestException` the restaurant has none.
+        """
+        self.longitude, self.latitude = None, None
+        if self.address:
+            found = geodata_functions.geocode(settings.YANDEX_API_KEY, self.address)
+            self.longitude, self.latitude = found or (None, None)
+
 
 class ProductQuerySet(models.QuerySet):
     def available(self):
@@ -48,6 +72,7 @@ class Product(models.Model):
     price = models.DecimalField('цена', max_digits=8, decimal_places=2,
                                 validators=[MinValueValidator(0)])
     image = models.ImageField('картинка')
+    image_variants = models.JSONField('уменьшенные копии картинки', default=dict, blank=True, editable=False)
     special_status = models.BooleanField(
         'спец.предложение', default=False, db_index=True)
     description = models.TextField('описание', max_length=200, blank=True)
@@ -61,6 +86,34 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self.image and self.image_variants.get('source') != self.image.name:
+            self.update_image_variants()
+
+    def update_image_variants(self):
+        self.image_variants = images.generate_variants(self.image, self.image_variants)
+        Product.objects.filter(pk=self.pk).update(image_variants=self.image_variants)
+        # update() does not send signals, the cached menus still have the old variants
+        menu_cache.bump_menu_version()
+
+    def get_image_url(self, size_name):
+        return images.variant_url(self.image, self.image_variants, size_name)
+
+    @property
+    def small_image_url(self):
+        return self.get_image_url('small')
+
+
+class RestaurantMenuItemQuerySet(models.QuerySet):
+    def set_availability(self, available):
+        """Switch availability of the menu items with one UPDATE. Returns the number of changed items."""
+        updated = self.exclude(availability=available).update(availability=available)
+        if updated:
+            # update() does not send signals
+            menu_cache.bump_menu_version()
+        return updated
+
 
 class RestaurantMenuItem(models.Model):
     restaurant = models.ForeignKey(Restaurant, on_delete=models.CASCADE, related_name='menu_items',
@@ -68,7 +121,9 @@ class RestaurantMenuItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='menu_items',
                                 verbose_name='продукт')
     availability = models.BooleanField(
-        'в продаже', default=True, db_index=True)
+        'в продаже', default=True)
+
+    objects = RestaurantMenuItemQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'пункт меню ресторана'
@@ -76,6 +131,14 @@ class RestaurantMenuItem(models.Model):
         unique_together = [
             ['restaurant', 'product']
         ]
+        indexes = [
+            # available menus grouped by restaurant, read without touching the table. The index is
+            # partial because SQLite does not search an index by a bare boolean column condition
+            models.Index(fields=['restaurant', 'product', 'availability'], name='menuitem_available_idx',
+                         condition=models.Q(availability=True)),
+            # products that are on sale anywhere
+            models.Index(fields=['product', 'availability'], name='menuitem_product_avail_idx'),
+        ]
 
     def __str__(self):
         return f"{self.restaurant.name} - {self.product.name}"
@@ -83,43 +146,79 @@ class RestaurantMenuItem(models.Model):
 
 class Place(models.Model):
     address = models.CharField('адрес', max_length=150, unique=True)
-    latitude = models.FloatField('широта')
-    longitude = models.FloatField('долгота')
+    latitude = models.FloatField('широта', null=True, blank=True, help_text='пусто, если Геокодер не нашёл адрес')
+    longitude = models.FloatField('долгота', null=True, blank=True)
     updated = models.DateTimeField('дата обновления', auto_now=True)
 
 
+class GeocoderDailyUsage(models.Model):
+    date = models.DateField('дата', unique=True)
+    requests = models.PositiveIntegerField('запросов к API', default=0)
+
+    class Meta:
+        verbose_name = 'использование Геокодера за день'
+        verbose_name_plural = 'использование Геокодера по дням'
+
+
+def get_restaurant_capabilities():
+    """List of `(restaurant, ids of products it has available)`."""
+    menu_items = RestaurantMenuItem.objects.filter(availability=True).select_related(
+        'restaurant').order_by('restaurant_id')
+    restaurants = []
+    for _, group in itertools.groupby(menu_items, lambda menu_item: menu_item.restaurant_id):
+        group = list(group)
+        restaurants.append((group[0].restaurant, {menu_item.product_id for menu_item in group}))
+    return restaurants
+
+
 class OrderQuerySet(models.QuerySet):
-    def fetch_restaurants(self):
-        self = self.prefetch_related(
-            Prefetch('order_items', queryset=OrderItem.objects.select_related('product')))
-        menu_items = RestaurantMenuItem.objects.exclude(availability=False).select_related(
-            'restaurant', 'product').order_by('restaurant_id')
+    def fetch_restaurants(self, coordinates=None):
+        """Orders with the restaurants able to cook them and the distances to the customers.
+
+        Addresses are geocoded unless their `coordinates` are given, as async views do.
+        """
+        self = self.prefetch_related('order_items')
+        restaurants = menu_cache.get_or_set('restaurant_capabilities', get_restaurant_capabilities)
+
+        if coordinates is None:
+            coordinates = geodata_functions.get_coordinates_for_addresses(
+                settings.YANDEX_API_KEY, [order.address for order in self])
+        product_index = None
 
         for order in self:
-            order_coords = geodata_functions.get_coordinates_from_db_or_api(settings.YANDEX_API_KEY, order.address)
-            order.products = [
-                item.product.id for item in order.order_items.all()]
+            order_coords = None
+            if coordinates.get(order.address):
+                # the geocoder answers longitude first, geopy wants latitude first
+                lon, lat = coordinates[order.address]
+                order_coords = (lat, lon)
+            order.products = [item.product_id for item in order.order_items.all()]
             order.restaurants = {}
 
-            for restaurant, group in itertools.groupby(menu_items, lambda menu_item: menu_item.restaurant):
-                products_in_restaurant = [menu_item.product.id for menu_item in group]
-
-                if all(product in products_in_restaurant for product in order.products):
-                    restaurant_coords = geodata_functions.get_coordinates_from_db_or_api(
-                        settings.YANDEX_API_KEY, restaurant.address)
+            for restaurant, products_in_restaurant in restaurants:
+                if products_in_restaurant.issuperset(order.products):
                     dist = None
-                    if order_coords and restaurant_coords:
+                    if order_coords and restaurant.coordinates:
                         dist = round(
-                            distance.distance(order_coords, restaurant_coords).km, 2)
+                            distance.distance(order_coords, restaurant.coordinates).km, 2)
                     order.restaurants[restaurant.address] = dist
 
-            order.restaurants = {k: v for k, v in sorted(order.restaurants.items(), key=lambda item: item[1])}
+            order.restaurants = {
+                k: v for k, v in sorted(order.restaurants.items(), key=lambda item: (item[1] is None, item[1] or 0))
+            }
+
+            # no restaurant has every product, look for several that have them together
+            order.split_restaurants = None
+            if not order.restaurants and order_coords:
+                if product_index is None:
+                    product_index = split_orders.build_product_index(restaurants)
+                split = split_orders.find_split(order.products, product_index, order_coords)
+                if split:
+                    order.split_restaurants = [
+                        (restaurant.address, len(covered), round(distance, 2)) for restaurant, covered, distance in split
+                    ]
 
         return self
 
-    def total_price(self):
-        return self.annotate(total_price=Sum('order_items__price'))
-
 
 class Order(models.Model):
     ORDER_STATUS = (
@@ -137,7 +236,7 @@ class Order(models.Model):
     address = models.CharField('адрес', max_length=250)
     phonenumber = PhoneNumberField(db_index=True)
     order_status = models.CharField('статус заказа',
-                                    max_length=15, choices=ORDER_STATUS, default='new', db_index=True)
+                                    max_length=15, choices=ORDER_STATUS, default='new')
     comment = models.TextField('комментарий', max_length=500, blank=True)
     created = models.DateTimeField('время создания', default=timezone.now, db_index=True)
     called = models.DateTimeField('время звонка', null=True, blank=True, db_index=True)
@@ -146,16 +245,37 @@ class Order(models.Model):
         'способ оплаты', max_length=15, choices=PAYMENT_METHOD, db_index=True)
     restaurant = models.ForeignKey(Restaurant, on_delete=models.SET_NULL, null=True, blank=True, related_name='orders',
                                    verbose_name="ресторан")
+    intake_id = models.UUIDField('номер в буфере приёма', null=True, blank=True, unique=True, editable=False)
+    total_price = models.DecimalField('сумма заказа', max_digits=10, decimal_places=2, default=0, editable=False)
+    rollup_dirty = models.BooleanField('не учтён в сводках продаж', default=True, editable=False)
 
     objects = OrderQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'заказ'
         verbose_name_plural = 'заказы'
+        indexes = [
+            models.Index(fields=['order_status', 'created'], name='order_status_created_idx'),
+            models.Index(fields=['total_price'], name='order_total_price_idx'),
+            models.Index(fields=['created'], name='order_rollup_dirty_idx', condition=models.Q(rollup_dirty=True)),
+        ]
 
     def __str__(self):
         return f'{self.firstname} {self.lastname}, {self.address}'
 
+    def save(self, *args, **kwargs):
+        # any change may move the order between days or restaurants of the sales rollups
+        self.rollup_dirty = True
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], 'rollup_dirty'}
+        super().save(*args, **kwargs)
+
+    def update_total_price(self):
+        """Recalculate the stored total after the order items were changed."""
+        self.total_price = self.order_items.aggregate(total=Coalesce(Sum('price'), 0))['total']
+        self.rollup_dirty = True
+        Order.objects.filter(pk=self.pk).update(total_price=self.total_price, rollup_dirty=True)
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='order_items',
@@ -172,6 +292,130 @@ class OrderItem(models.Model):
         unique_together = [
             ['order', 'product']
         ]
+        indexes = [
+            # order contents and totals are read from the index alone
+            models.Index(fields=['order', 'product', 'quantity', 'price'], name='orderitem_order_covering_idx'),
+        ]
 
     def __str__(self):
         return f"{self.product.name}, {self.order}"
+
+
+class ArchivedOrder(models.Model):
+    """Finished order moved out of the `Order` table by the `archive_orders` command.
+
+    Keeps the id of the original order.
+    """
+    id = models.IntegerField('номер заказа', primary_key=True)
+    firstname = models.CharField('имя', max_length=50)
+    lastname = models.CharField('фамилия', max_length=50)
+    address = models.CharField('адрес', max_length=250)
+    phonenumber = PhoneNumberField()
+    order_status = models.CharField('статус заказа', max_length=15, choices=Order.ORDER_STATUS)
+    comment = models.TextField('комментарий', blank=True)
+    created = models.DateTimeField('время создания', db_index=True)
+    called = models.DateTimeField('время звонка', null=True, blank=True)
+    delivered = models.DateTimeField('время доставки', null=True, blank=True)
+    payment = models.CharField('способ оплаты', max_length=15, choices=Order.PAYMENT_METHOD)
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='archived_orders', verbose_name='ресторан')
+    total_price = models.DecimalField('сумма заказа', max_digits=10, decimal_places=2, default=0)
+    archived = models.DateTimeField('время архивации', default=timezone.now)
+
+    class Meta:
+        verbose_name = 'архивный заказ'
+        verbose_name_plural = 'архивные заказы'
+
+    def __str__(self):
+        return f'{self.firstname} {self.lastname}, {self.address}'
+
+
+class ArchivedOrderItem(models.Model):
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='order_items',
+                              verbose_name='заказ')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True,
+                                related_name='archived_order_items', verbose_name='продукт')
+    quantity = models.PositiveSmallIntegerField('количество')
+    price = models.DecimalField('стоимость позиции', null=True, max_digits=8, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'элемент архивного заказа'
+        verbose_name_plural = 'элементы архивного заказа'
+
+    def __str__(self):
+        return f'{self.product}, {self.order}'
+
+
+class DailyRestaurantSales(models.Model):
+    """Orders of a restaurant for a day, filled by `foodcartapp.sales`."""
+    day = models.DateField('день')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='daily_sales', verbose_name='ресторан')
+    orders_count = models.PositiveIntegerField('заказов')
+    revenue = models.DecimalField('выручка', max_digits=12, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'продажи ресторана за день'
+        verbose_name_plural = 'продажи ресторанов по дням'
+        indexes = [
+            models.Index(fields=['day', 'restaurant'], name='restaurant_sales_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.day}, {self.restaurant}'
+
+
+class DailyProductSales(models.Model):
+    """Sales of a product by a restaurant for a day, filled by `foodcartapp.sales`."""
+    day = models.DateField('день')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='daily_product_sales', verbose_name='ресторан')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True,
+                                related_name='daily_sales', verbose_name='товар')
+    quantity = models.PositiveIntegerField('продано штук')
+    orders_count = models.PositiveIntegerField('заказов')
+    revenue = models.DecimalField('выручка', max_digits=12, decimal_places=2)
+
+    class Meta:
+        verbose_name = 'продажи товара за день'
+        verbose_name_plural = 'продажи товаров по дням'
+        indexes = [
+            models.Index(fields=['day', 'product'], name='product_sales_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.day}, {self.product}'
+
+
+class DeliveryTimeStats(models.Model):
+    """Histograms of minutes to call and to deliver the orders created in an hour, filled by `foodcartapp.delivery_stats`.
+
+    A histogram is a list of counts per bucket of `delivery_stats.CALL_BUCKETS`
+    or `DELIVERY_BUCKETS` followed by the sum of minutes and the number of orders.
+    """
+    day = models.DateField('день')
+    hour = models.PositiveSmallIntegerField('час')
+    restaurant = models.ForeignKey(Restaurant, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='delivery_time_stats', verbose_name='ресторан')
+    call_minutes = models.JSONField('минут до звонка')
+    delivery_minutes = models.JSONField('минут до доставки')
+
+    class Meta:
+        verbose_name = 'время доставки за час'
+        verbose_name_plural = 'время доставки по часам'
+        indexes = [
+            models.Index(fields=['day', 'restaurant'], name='delivery_stats_day_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.day} {self.hour}:00, {self.restaurant}'
+
+
+class MenuVersion(models.Model):
+    """Single row counter bumped on every change of restaurants, products and menus."""
+    version = models.PositiveBigIntegerField('версия меню', default=0)
+    updated = models.DateTimeField('дата обновления', auto_now=True)
+
+    class Meta:
+        verbose_name = 'версия меню'
+        verbose_name_plural = 'версия меню'
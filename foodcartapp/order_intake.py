@@ -0,0 +1,179 @@
+import fcntl
+import json
+import logging
+import os
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from foodcartapp import models
+
+logger = logging.getLogger(__name__)
+
+
+def _open_locked(path):
+    """Open buffer file for appending and lock it.
+
+    The drainer swaps the file out with a rename, so after taking the lock
+    we check that the descriptor still points to the file under `path`.
+    """
+    while True:
+        buffer_file = open(path, 'a', encoding='utf-8')
+        fcntl.flock(buffer_file, fcntl.LOCK_EX)
+        try:
+            if os.fstat(buffer_file.fileno()).st_ino == os.stat(path).st_ino:
+                return buffer_file
+        except FileNotFoundError:
+            pass
+        buffer_file.close()
+
+
+def append_order(path, validated_data):
+    intake_id = uuid.uuid4()
+    record = {
+        'intake_id': str(intake_id),
+        'created': timezone.now().isoformat(),
+        'firstname': validated_data['firstname'],
+        'lastname': validated_data['lastname'],
+        'phonenumber': str(validated_data['phonenumber']),
+        'address': validated_data['address'],
+        'products': [
+            {
+                'product': item['product'].id,
+                'quantity': item['quantity'],
+                'price': str(item['product'].price * item['quantity']),
+            }
+            for item in validated_data['products']
+        ],
+    }
+    line = json.dumps(record, ensure_ascii=False) + '\n'
+
+    with _open_locked(path) as buffer_file:
+        buffer_file.write(line)
+        buffer_file.flush()
+        os.fsync(buffer_file.fileno())
+    return intake_id
+
+
+def _take_pending(path, draining_path):
+    """Move the buffer aside so new orders go to a fresh file."""
+    if not os.path.exists(path):
+        return False
+
+    with _open_locked(path):
+        os.replace(path, draining_path)
+    return True
+
+
+def _read_lines(draining_path):
+    with open(draining_path, encoding='utf-8') as draining_file:
+        for line in draining_file:
+            if not line.endswith('\n'):
+                # a writer died mid-line, the record was never acknowledged
+                break
+            yield line
+
+
+def _move_to_failed(failed_path, lines):
+    """Append records that can not be committed to the dead-letter file, keeping them as they were buffered."""
+    with open(failed_path, 'a', encoding='utf-8') as failed_file:
+        failed_file.writelines(lines)
+        failed_file.flush()
+        os.fsync(failed_file.fileno())
+
+
+def _commit_batch(records):
+    intake_ids = [record['intake_id'] for record in records]
+    committed = set(
+        str(intake_id) for intake_id in
+        models.Order.objects.filter(intake_id__in=intake_ids).values_list('intake_id', flat=True)
+    )
+    records = [record for record in records if record['intake_id'] not in committed]
+    if not records:
+        return 0
+
+    models.Order.objects.bulk_create([
+        models.Order(
+            intake_id=record['intake_id'],
+            created=parse_datetime(record['created']),
+            firstname=record['firstname'],
+            lastname=record['lastname'],
+            phonenumber=record['phonenumber'],
+            address=record['address'],
+            total_price=sum(Decimal(item['price']) for item in record['products']),
+        )
+        for record in records
+    ])
+    order_ids = dict(
+        (str(intake_id), order_id) for intake_id, order_id in
+        models.Order.objects.filter(
+            intake_id__in=[record['intake_id'] for record in records]
+        ).values_list('intake_id', 'id')
+    )
+    models.OrderItem.objects.bulk_create([
+        models.OrderItem(
+            order_id=order_ids[record['intake_id']],
+            product_id=item['product'],
+            quantity=item['quantity'],
+            price=Decimal(item['price']),
+        )
+        for record in records
+        for item in record['products']
+    ])
+    return len(records)
+
+
+def _commit_lines(lines, failed_path):
+    """Commit a batch, or record by record if the batch fails. Returns the number of created orders.
+
+    Only records the database rejects or that can not be parsed fail, other
+    database errors, e.g. a locked or unavailable database, are raised and
+    leave the records in the buffer.
+    """
+    try:
+        with transaction.atomic():
+            return _commit_batch([json.loads(line) for line in lines])
+    except (IntegrityError, DataError, InvalidOperation, ValueError, KeyError, TypeError):
+        if len(lines) == 1:
+            logger.exception('Buffered order can not be saved, moved to %s: %s', failed_path, lines[0].strip())
+            _move_to_failed(failed_path, lines)
+            return 0
+    # one bad record must not keep the valid ones of its batch out of the database
+    return sum(_commit_lines([line], failed_path) for line in lines)
+
+
+def _drain_file(draining_path, failed_path, batch_size):
+    created = 0
+    batch = []
+    for line in _read_lines(draining_path):
+        batch.append(line)
+        if len(batch) >= batch_size:
+            created += _commit_lines(batch, failed_path)
+            batch = []
+    if batch:
+        created += _commit_lines(batch, failed_path)
+
+    os.remove(draining_path)
+    return created
+
+
+def drain(path, batch_size=500):
+    """Commit buffered orders in batches, one transaction per batch.
+
+    Orders carry their `intake_id`, so a batch that was committed right
+    before a crash is skipped when a leftover `.draining` file is drained
+    again on the next run. A batch that fails is committed record by record,
+    records that still fail are moved to the `.failed` file and logged.
+    `OperationalError` is raised and keeps the `.draining` file for the next run.
+    """
+    draining_path = f'{path}.draining'
+    failed_path = f'{path}.failed'
+    created = 0
+    if os.path.exists(draining_path):
+        created += _drain_file(draining_path, failed_path, batch_size)
+    if _take_pending(path, draining_path):
+        created += _drain_file(draining_path, failed_path, batch_size)
+    return created
@@ -0,0 +1,84 @@
+"""Helpers shared by the load-test and benchmark commands."""
+import asyncio
+import contextlib
+import hashlib
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+from django.test.utils import setup_databases, teardown_databases
+from django.utils import timezone
+
+from foodcartapp import geodata_functions, menu_cache
+
+
+def fake_coordinates(address):
+    """Stable coordinates around Moscow derived from the address text."""
+    digest = hashlib.md5(address.encode('utf-8')).digest()
+    lon = 37.35 + digest[0] / 255 * 0.5
+    lat = 55.55 + digest[1] / 255 * 0.35
+    return str(round(lon, 6)), str(round(lat, 6))
+
+
+@contextlib.contextmanager
+def stub_geocoder(delay_ms=None):
+    """Answer geocoder requests locally, without going to Yandex.
+
+    Every answer takes `delay_ms` milliseconds, `STUB_GEOCODER_DELAY_MS` by
+    default, as a network round trip would. Concurrent requests are limited
+    by `GEOCODER_CONCURRENCY` like the real ones.
+    """
+    delay = (settings.STUB_GEOCODER_DELAY_MS if delay_ms is None else delay_ms) / 1000
+
+    def fetch_coordinates(apikey, place):
+        time.sleep(delay)
+        return fake_coordinates(place)
+
+    async def fetch_many_coordinates(apikey, places):
+        semaphore = asyncio.Semaphore(settings.GEOCODER_CONCURRENCY)
+
+        async def fetch(place):
+            async with semaphore:
+                await asyncio.sleep(delay)
+                return fake_coordinates(place)
+
+        return dict(zip(places, await asyncio.gather(*[fetch(place) for place in places])))
+
+    originals = geodata_functions.fetch_coordinates, geodata_functions.fetch_many_coordinates
+    geodata_functions.fetch_coordinates = fetch_coordinates
+    geodata_functions.fetch_many_coordinates = fetch_many_coordinates
+    try:
+        yield
+    finally:
+        geodata_functions.fetch_coordinates, geodata_functions.fetch_many_coordinates = originals
+
+
+@contextlib.contextmanager
+def isolated_database():
+    """Run the block against a freshly migrated throwaway database.
+
+    SQLite gets a temporary file instead of the in-memory test database,
+    so the data can be shared with other threads and forked processes.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for alias in connections:
+            if connections[alias].vendor == 'sqlite':
+                database = settings.DATABASES[alias]
+                database.setdefault('TEST', {})['NAME'] = os.path.join(tmp_dir, f'{alias}.sqlite3')
+        old_config = setup_databases(verbosity=0, interactive=False)
+        # values cached for the other database may share its menu version
+        menu_cache.clear()
+        try:
+            yield
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            menu_cache.clear()
+
+
+def seed_dataset(restaurants=10, products=50, orders=1000, seed=0):
+    # orders end today, so the reports of the last days are not empty
+    call_command('generate_dataset', restaurants=restaurants, products=products,
+                 categories=max(1, products // 10), orders=orders, until=timezone.localdate(), seed=seed, verbosity=0)
@@ -0,0 +1,97 @@
+"""Daily sales rollups for the manager reports.
+
+`DailyRestaurantSales` and `DailyProductSales` keep the orders, sold items
+and revenue per day, so reports read a row per day instead of every order
+item. Every saved order gets `Order.rollup_dirty`, `refresh_sales_rollups`
+recomputes the days of such orders from both the working and the archive
+tables and clears the flags. The delivery time histograms of
+`foodcartapp.delivery_stats` are recomputed along with them. Orders are
+archived only after they were rolled up, see `foodcartapp.archive`.
+"""
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from foodcartapp import delivery_stats
+from foodcartapp.models import (ArchivedOrder, ArchivedOrderItem, DailyProductSales, DailyRestaurantSales, Order,
+                                OrderItem)
+
+
+def day_bounds(day):
+    start = timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+    end = timezone.make_aware(datetime.datetime.combine(day + datetime.timedelta(days=1), datetime.time.min))
+    return start, end
+
+
+def dirty_days():
+    """Days with orders changed since their rollups were computed."""
+    return list(Order.objects.filter(rollup_dirty=True).dates('created', 'day'))
+
+
+@transaction.atomic
+def recompute_day(day):
+    start, end = day_bounds(day)
+    # flags are cleared before reading: an order changed meanwhile stays dirty for the next run
+    Order.objects.filter(rollup_dirty=True, created__gte=start, created__lt=end).update(rollup_dirty=False)
+
+    restaurants = defaultdict(lambda: [0, Decimal(0)])
+    for model in (Order, ArchivedOrder):
+        rows = model.objects.filter(created__gte=start, created__lt=end).values('restaurant_id').annotate(
+            orders_count=Count('id'), revenue=Sum('total_price')).order_by()
+        for row in rows:
+            totals = restaurants[row['restaurant_id']]
+            totals[0] += row['orders_count']
+            totals[1] += row['revenue']
+
+    products = defaultdict(lambda: [0, 0, Decimal(0)])
+    for model in (OrderItem, ArchivedOrderItem):
+        rows = model.objects.filter(order__created__gte=start, order__created__lt=end).values(
+            'order__restaurant_id', 'product_id').annotate(
+            quantity=Sum('quantity'), orders_count=Count('order_id', distinct=True),
+            revenue=Coalesce(Sum('price'), 0)).order_by()
+        for row in rows:
+            totals = products[(row['order__restaurant_id'], row['product_id'])]
+            totals[0] += row['quantity']
+            totals[1] += row['orders_count']
+            totals[2] += row['revenue']
+
+    DailyRestaurantSales.objects.filter(day=day).delete()
+    DailyProductSales.objects.filter(day=day).delete()
+    DailyRestaurantSales.objects.bulk_create([
+        DailyRestaurantSales(day=day, restaurant_id=restaurant_id, orders_count=orders_count, revenue=revenue)
+        for restaurant_id, (orders_count, revenue) in restaurants.items()
+    ])
+    DailyProductSales.objects.bulk_create([
+        DailyProductSales(day=day, restaurant_id=restaurant_id, product_id=product_id, quantity=quantity,
+                          orders_count=orders_count, revenue=revenue)
+        for (restaurant_id, product_id), (quantity, orders_count, revenue) in products.items()
+    ])
+    delivery_stats.recompute_day(day, start, end)
+
+
+def refresh_sales_rollups(days=None):
+    """Recompute the given days or the days of dirty orders, returns the recomputed days."""
+    days = dirty_days() if days is None else list(days)
+    for day in days:
+        recompute_day(day)
+    return days
+
+
+def sales_report(since, until, top_products=20):
+    """Totals by day, by restaurant and the best selling products for the days from `since` to `until`."""
+    restaurant_sales = DailyRestaurantSales.objects.filter(day__gte=since, day__lte=until)
+    product_sales = DailyProductSales.objects.filter(day__gte=since, day__lte=until)
+    return {
+        'days': restaurant_sales.values('day').annotate(
+            orders_count=Sum('orders_count'), revenue=Sum('revenue')).order_by('-day'),
+        'restaurants': restaurant_sales.values('restaurant__name').annotate(
+            orders_count=Sum('orders_count'), revenue=Sum('revenue')).order_by('-revenue'),
+        'products': product_sales.values('product__name').annotate(
+            quantity=Sum('quantity'), orders_count=Sum('orders_count'),
+            revenue=Sum('revenue')).order_by('-revenue')[:top_products],
+    }
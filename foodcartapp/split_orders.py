@@ -0,0 +1,105 @@
+"""Restaurants that jointly cook an order none of them can cook alone.
+
+The cover with the smallest sum of distances to the customer is a weighted
+set cover, searched by branch and bound over the restaurants that have at
+least one product of the order:
+
+- a restaurant is dropped when a not farther one has all of its products
+  of the order;
+- the uncovered product with the fewest restaurants is covered next;
+- a branch stops as soon as its distance reaches the best cover found,
+  the first one comes from a greedy pass.
+
+A cover has at most `MAX_RESTAURANTS` restaurants, and the search returns
+the best cover found in `TIME_BUDGET` seconds, so a backlog of such orders
+can not stall the orders page.
+"""
+import math
+import time
+from collections import defaultdict
+
+from foodcartapp import geodata_functions
+
+MAX_RESTAURANTS = 3
+TIME_BUDGET = 0.005
+
+
+def build_product_index(restaurants):
+    """`{product id: [(restaurant, its product ids), ...]}` for restaurants with known coordinates."""
+    index = defaultdict(list)
+    for restaurant, product_ids in restaurants:
+        if restaurant.coordinates:
+            for product_id in product_ids:
+                index[product_id].append((restaurant, product_ids))
+    return index
+
+
+def _candidates(product_ids, product_index, order_coordinates):
+    """`(distance, restaurant, products of the order it has)` without dominated restaurants, nearest first."""
+    found = {}
+    for product_id in product_ids:
+        for restaurant, available in product_index[product_id]:
+            if restaurant.id not in found:
+                found[restaurant.id] = (
+                    geodata_functions.distance_km(order_coordinates, restaurant.coordinates),
+                    restaurant,
+                    product_ids & available,
+                )
+    kept = []
+    for candidate in sorted(found.values(), key=lambda candidate: candidate[0]):
+        if not any(other[2] >= candidate[2] for other in kept):
+            kept.append(candidate)
+    return kept
+
+
+def _greedy(product_ids, candidates, max_restaurants):
+    uncovered, chosen = set(product_ids), []
+    while uncovered and len(chosen) < max_restaurants:
+        best = min(
+            (candidate for candidate in candidates if candidate[2] & uncovered),
+            key=lambda candidate: candidate[0] / len(candidate[2] & uncovered),
+        )
+        chosen.append(best)
+        uncovered -= best[2]
+    return None if uncovered else chosen
+
+
+def find_split(product_ids, product_index, order_coordinates, max_restaurants=MAX_RESTAURANTS,
+               time_budget=TIME_BUDGET):
+    """Cheapest `[(restaurant, covered product ids, distance), ...]`, None if there is no cover within the limits.
+
+    `order_coordinates` are `(latitude, longitude)`, `product_index` comes from `build_product_index`.
+    """
+    product_ids = frozenset(product_ids)
+    if not product_ids or not all(product_index.get(product_id) for product_id in product_ids):
+        return None
+    candidates = _candidates(product_ids, product_index, order_coordinates)
+    by_product = {
+        product_id: [candidate for candidate in candidates if product_id in candidate[2]]
+        for product_id in product_ids
+    }
+
+    best_chosen = _greedy(product_ids, candidates, max_restaurants)
+    best_cost = sum(candidate[0] for candidate in best_chosen) if best_chosen else math.inf
+    deadline = time.perf_counter() + time_budget
+
+    def search(uncovered, chosen, cost):
+        nonlocal best_chosen, best_cost
+        if not uncovered:
+            best_chosen, best_cost = list(chosen), cost
+            return
+        if len(chosen) == max_restaurants or time.perf_counter() > deadline:
+            return
+        product_id = min(uncovered, key=lambda product_id: len(by_product[product_id]))
+        for candidate in by_product[product_id]:
+            # candidates are sorted by distance, the next ones cost even more
+            if cost + candidate[0] >= best_cost:
+                break
+            chosen.append(candidate)
+            search(uncovered - candidate[2], chosen, cost + candidate[0])
+            chosen.pop()
+
+    search(product_ids, [], 0)
+    if best_chosen is None:
+        return None
+    return [(restaurant, covered, distance) for distance, restaurant, covered in best_chosen]
@@ -0,0 +1,97 @@
+from unittest import mock
+
+import requests
+from django.contrib import admin, messages
+from django.contrib.auth import get_user_model
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from foodcartapp import geodata_functions, menu_cache
+from foodcartapp.models import Product, Restaurant, RestaurantMenuItem
+
+
+class PaginatedMenuInlineTest(TestCase):
+    def setUp(self):
+        menu_cache.clear()
+        self.restaurant = Restaurant.objects.create(name='Арбат', address='Москва, Арбат, 1')
+        products = [Product.objects.create(name=f'Бургер {number}', price=250) for number in range(60)]
+        RestaurantMenuItem.objects.bulk_create([
+            RestaurantMenuItem(restaurant=self.restaurant, product=product) for product in reversed(products)
+        ])
+        self.client.force_login(get_user_model().objects.create_superuser('admin', password='password'))
+
+    def get_change_form(self, query):
+        return self.client.get(reverse('admin:foodcartapp_restaurant_change', args=[self.restaurant.pk]) + query)
+
+    def test_pages_follow_the_primary_key(self):
+        item_ids = list(RestaurantMenuItem.objects.order_by('pk').values_list('pk', flat=True))
+
+        first_page = self.get_change_form('').context['inline_admin_formsets'][0].formset
+        second_page = self.get_change_form('?menu_items-page=2').context['inline_admin_formsets'][0].formset
+
+        self.assertEqual([form.instance.pk for form in first_page.forms], item_ids[:50])
+        self.assertEqual([form.instance.pk for form in second_page.forms], item_ids[50:])
+
+    def test_page_links_keep_changelist_filters(self):
+        response = self.get_change_form('?_changelist_filters=q%3D%D0%90%D1%80&menu_items-page=2')
+
+        self.assertContains(response, 'href="?_changelist_filters=q%3D%D0%90%D1%80&amp;menu_items-page=1"')
+
+
+class RestaurantSaveModelTest(TestCase):
+    def setUp(self):
+        menu_cache.clear()
+        geodata_functions._coordinates_cache.clear()
+        self.restaurant = Restaurant.objects.create(
+            name='Арбат', address='Москва, Арбат, 1', contact_phone='+74951234567', latitude=55.75, longitude=37.59)
+        self.model_admin = admin.site._registry[Restaurant]
+        self.request = RequestFactory().post('/')
+        self.request.user = get_user_model().objects.create_superuser('admin', password='password')
+        self.request._messages = CookieStorage(self.request)
+
+    def save(self, fetch_coordinates, **changes):
+        restaurant = Restaurant.objects.get(pk=self.restaurant.pk)
+        form_class = self.model_admin.get_form(self.request, restaurant)
+        initial = form_class(instance=restaurant).initial
+        form = form_class({**initial, **changes}, instance=restaurant)
+        self.assertTrue(form.is_valid(), form.errors)
+        with mock.patch.object(geodata_functions, 'fetch_coordinates', fetch_coordinates):
+            self.model_admin.save_model(self.request, form.save(commit=False), form, change=True)
+        self.restaurant.refresh_from_db()
+        return [(message.level, message.message) for message in self.request._messages]
+
+    def test_new_address_is_geocoded(self):
+        fetch_coordinates = mock.Mock(return_value=('37.62', '55.76'))
+
+        self.assertEqual(self.save(fetch_coordinates, address='Москва, Тверская, 1'), [])
+
+        fetch_coordinates.assert_called_once()
+        self.assertEqual(self.restaurant.coordinates, (55.76, 37.62))
+
+    def test_coordinates_edited_by_hand_are_kept(self):
+        fetch_coordinates = mock.Mock(return_value=('37.62', '55.76'))
+
+        self.save(fetch_coordinates, address='Москва, Тверская, 1', latitude=55.7, longitude=37.5)
+
+        fetch_coordinates.assert_not_called()
+        self.assertEqual(self.restaurant.coordinates, (55.7, 37.5))
+
+    def test_missing_coordinates_are_geocoded(self):
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(latitude=None, longitude=None)
+        fetch_coordinates = mock.Mock(return_value=('37.59', '55.75'))
+
+        self.save(fetch_coordinates, name='Арбат, 1')
+
+        fetch_coordinates.assert_called_once()
+        self.assertEqual(self.restaurant.coordinates, (55.75, 37.59))
+
+    def test_geocoder_failure_saves_without_coordinates(self):
+        fetch_coordinates = mock.Mock(side_effect=requests.exceptions.ConnectionError)
+
+        saved_messages = self.save(fetch_coordinates, address='Москва, Тверская, 1')
+
+        self.assertEqual(self.restaurant.address, 'Москва, Тверская, 1')
+        self.assertIsNone(self.restaurant.coordinates)
+        self.assertEqual([level for level, _ in saved_messages], [messages.WARNING])
+        self.assertIn('Геокодер не ответил', saved_messages[0][1])
@@ -0,0 +1,41 @@
+from django.test import TestCase
+from django.utils import timezone
+
+from foodcartapp import archive
+from foodcartapp.management.commands.generate_dataset import next_id
+from foodcartapp.models import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, Product
+
+
+class ArchiveBatchTest(TestCase):
+    def setUp(self):
+        product = Product.objects.create(name='Чизбургер', price=250)
+        self.order = Order.objects.create(
+            firstname='Иван', lastname='Петров', phonenumber='+79001234567', address='Москва, Тверская, 1',
+            order_status='finished', delivered=timezone.now(), total_price=500)
+        OrderItem.objects.create(order=self.order, product=product, quantity=2, price=500)
+
+    def test_order_is_moved_with_its_items(self):
+        self.assertEqual(archive.archive_batch([self.order.pk]), 1)
+
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertEqual(ArchivedOrder.objects.get().pk, self.order.pk)
+        self.assertEqual(ArchivedOrderItem.objects.values_list('order_id', 'quantity').get(), (self.order.pk, 2))
+
+    def test_taken_id_is_not_overwritten(self):
+        ArchivedOrder.objects.create(
+            id=self.order.pk, firstname='Пётр', lastname='Иванов', phonenumber='+79007654321',
+            address='Москва, Арбат, 1', order_status='finished', payment='cash', created=timezone.now(),
+            total_price=100)
+
+        with self.assertRaises(archive.ArchiveConflict):
+            archive.archive_batch([self.order.pk])
+
+        self.assertEqual(ArchivedOrder.objects.get().firstname, 'Пётр')
+        self.assertTrue(Order.objects.filter(pk=self.order.pk).exists())
+        self.assertEqual(OrderItem.objects.count(), 1)
+
+    def test_generated_orders_skip_archived_ids(self):
+        archive.archive_batch([self.order.pk])
+
+        self.assertEqual(next_id(Order, ArchivedOrder), self.order.pk + 1)
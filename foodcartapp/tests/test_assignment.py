@@ -0,0 +1,81 @@
+import itertools
+import math
+import random
+
+from django.test import SimpleTestCase
+
+from foodcartapp.assignment import solve
+
+
+def random_instance(seed):
+    rnd = random.Random(seed)
+    restaurants = {
+        restaurant_id: (rnd.random() * 10, rnd.random() * 10) for restaurant_id in range(rnd.randint(1, 3))
+    }
+    capacities = {restaurant_id: rnd.randint(0, 3) for restaurant_id in restaurants}
+    candidates = {}
+    for order_id in range(rnd.randint(1, 6)):
+        point = (rnd.random() * 10, rnd.random() * 10)
+        options = sorted(
+            (math.dist(point, restaurant), restaurant_id)
+            for restaurant_id, restaurant in restaurants.items() if rnd.random() < 0.8
+        )
+        if options:
+            candidates[order_id] = options
+    return candidates, capacities
+
+
+def total_distance(candidates, assignment):
+    return sum(
+        next(distance for distance, option in candidates[order_id] if option == restaurant_id)
+        for order_id, restaurant_id in assignment.items()
+    )
+
+
+def brute_force(candidates, capacities):
+    """The most assigned orders with the least total distance, as `(assigned, distance)`."""
+    order_ids = list(candidates)
+    best = (0, 0)
+    choices = [[None] + [restaurant_id for _, restaurant_id in candidates[order_id]] for order_id in order_ids]
+    for choice in itertools.product(*choices):
+        assignment = {
+            order_id: restaurant_id for order_id, restaurant_id in zip(order_ids, choice) if restaurant_id is not None
+        }
+        taken = list(assignment.values())
+        if any(taken.count(restaurant_id) > capacity for restaurant_id, capacity in capacities.items()):
+            continue
+        found = (len(assignment), total_distance(candidates, assignment))
+        if found[0] > best[0] or found[0] == best[0] and found[1] < best[1]:
+            best = found
+    return best
+
+
+class SolveTest(SimpleTestCase):
+    def test_matches_brute_force(self):
+        for seed in range(300):
+            candidates, capacities = random_instance(seed)
+            assignment = solve(candidates, capacities)
+            assigned, distance = brute_force(candidates, capacities)
+            with self.subTest(seed=seed):
+                self.assertEqual(len(assignment), assigned)
+                self.assertAlmostEqual(total_distance(candidates, assignment), distance)
+                for restaurant_id, capacity in capacities.items():
+                    self.assertLessEqual(list(assignment.values()).count(restaurant_id), capacity)
+
+    def test_single_restaurant_takes_the_nearest_orders(self):
+        # every order has a single option, so their regrets are equal
+        candidates = {order_id: [(distance, 1)] for order_id, distance in enumerate([5.0, 4.0, 1.0, 3.0, 2.0])}
+
+        self.assertEqual(solve(candidates, {1: 3}), {2: 1, 3: 1, 4: 1})
+
+    def test_unassigned_order_replaces_a_farther_one_through_a_chain(self):
+        candidates = {
+            'near a': [(1.0, 'a'), (2.0, 'b')],
+            'far from b': [(8.0, 'a'), (9.0, 'b')],
+            'only a': [(2.5, 'a')],
+            'only b': [(3.5, 'b')],
+        }
+
+        assignment = solve(candidates, {'a': 1, 'b': 2})
+
+        self.assertEqual(assignment, {'only a': 'a', 'near a': 'b', 'only b': 'b'})
@@ -0,0 +1,35 @@
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from foodcartapp.models import Order, OrderItem, Product
+
+
+class CheckOrderTotalsTest(TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(
+            firstname='Иван', lastname='Петров', phonenumber='+79001234567', address='Москва, Тверская, 1',
+            total_price=Decimal('0.30'))
+        for name, price in (('Соль', Decimal('0.10')), ('Перец', Decimal('0.20'))):
+            OrderItem.objects.create(
+                order=self.order, product=Product.objects.create(name=name, price=price), quantity=1, price=price)
+
+    def check_totals(self, *args):
+        stdout = StringIO()
+        call_command('check_order_totals', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_matching_cents_are_not_reported(self):
+        # SQLite sums 0.1 and 0.2 as floats into 0.30000000000000004
+        self.assertIn('Все суммы заказов совпадают с позициями', self.check_totals())
+
+    def test_stale_total_is_reported_and_fixed(self):
+        Order.objects.filter(pk=self.order.pk).update(total_price=Decimal('0.31'))
+
+        with self.assertRaises(CommandError):
+            self.check_totals()
+        self.assertIn('Исправлено заказов: 1', self.check_totals('--fix'))
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.total_price, Decimal('0.30'))
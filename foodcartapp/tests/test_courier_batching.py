@@ -0,0 +1,108 @@
+import datetime
+import math
+import random
+
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+
+from foodcartapp import courier_batching, geodata_functions, perf_tools
+from foodcartapp.courier_batching import (CELL_KM, MAX_RUN_MINUTES, MAX_STOPS, READY_WINDOW_MINUTES, order_stops,
+                                          plan_courier_runs, plan_restaurant_runs, route_minutes)
+from foodcartapp.models import Order, Restaurant
+
+START = datetime.datetime(2024, 5, 1, 12, 0, tzinfo=datetime.timezone.utc)
+
+
+def random_orders(seed):
+    rnd = random.Random(seed)
+    count = rnd.randint(1, 25)
+    points = [(rnd.uniform(-4, 4), rnd.uniform(-4, 4)) for _ in range(count)]
+    ready_at = [START + datetime.timedelta(minutes=rnd.uniform(0, 40)) for _ in range(count)]
+    return points, ready_at
+
+
+def cells_apart(first, second):
+    return max(abs(math.floor(a / CELL_KM) - math.floor(b / CELL_KM)) for a, b in zip(first, second))
+
+
+class PlanRestaurantRunsTest(SimpleTestCase):
+    def test_runs_keep_the_limits(self):
+        for seed in range(200):
+            points, ready_at = random_orders(seed)
+            runs = plan_restaurant_runs(points, ready_at)
+            with self.subTest(seed=seed):
+                self.assertEqual(sorted(index for route in runs for index in route), list(range(len(points))))
+                # runs start in the order the orders got ready, each from its oldest order
+                seeds = [min(route, key=lambda index: ready_at[index]) for route in runs]
+                self.assertEqual(seeds, sorted(seeds, key=lambda index: ready_at[index]))
+                for route, first in zip(runs, seeds):
+                    self.assertLessEqual(len(route), MAX_STOPS)
+                    length = courier_batching._route_length(points, route)
+                    if len(route) > 1:
+                        self.assertLessEqual(route_minutes(length, len(route)), MAX_RUN_MINUTES)
+                    for index in route:
+                        self.assertLessEqual(abs(ready_at[index] - ready_at[first]),
+                                             datetime.timedelta(minutes=READY_WINDOW_MINUTES))
+                        self.assertLessEqual(cells_apart(points[index], points[first]), 1)
+
+    def test_close_orders_ready_together_share_a_run(self):
+        points = [(0.1, 0.1), (0.5, 0.5), (0.3, 0.3)]
+        ready_at = [START, START + datetime.timedelta(minutes=2), START + datetime.timedelta(minutes=4)]
+
+        self.assertEqual(plan_restaurant_runs(points, ready_at), [[0, 2, 1]])
+
+    def test_orders_ready_far_apart_go_in_separate_runs(self):
+        points = [(0.1, 0.1), (0.2, 0.2)]
+        ready_at = [START, START + datetime.timedelta(minutes=READY_WINDOW_MINUTES + 1)]
+
+        self.assertEqual(plan_restaurant_runs(points, ready_at), [[0], [1]])
+
+
+class OrderStopsTest(SimpleTestCase):
+    def test_route_visits_stops_along_a_street_in_order(self):
+        points = [(3, 0), (1, 0), (4, 0), (2, 0)]
+
+        self.assertEqual(order_stops(points, [0, 1, 2, 3]), [1, 3, 0, 2])
+
+    def test_no_reversal_shortens_the_route(self):
+        for seed in range(100):
+            rnd = random.Random(seed)
+            points = [(rnd.uniform(-3, 3), rnd.uniform(-3, 3)) for _ in range(rnd.randint(1, 8))]
+            route = order_stops(points, range(len(points)))
+            length = courier_batching._route_length(points, route)
+            with self.subTest(seed=seed):
+                self.assertEqual(sorted(route), list(range(len(points))))
+                for start in range(len(route)):
+                    for end in range(start + 1, len(route)):
+                        reversed_route = route[:start] + route[start:end + 1][::-1] + route[end + 1:]
+                        self.assertGreater(courier_batching._route_length(points, reversed_route), length - 1e-6)
+
+
+class PlanCourierRunsTest(TestCase):
+    def setUp(self):
+        geodata_functions._coordinates_cache.clear()
+        restaurant = Restaurant.objects.create(name='Арбат', address='Москва, Арбат, 1')
+        self.orders = []
+        addresses = ['Москва, Тверская, 1', 'Москва, Тверская, 3', 'Москва, Тверская, 5']
+        for number, address in enumerate(addresses):
+            latitude, longitude = map(float, reversed(perf_tools.fake_coordinates(address)))
+            if not number:
+                # the restaurant is at the first address, so the run stays within the limits
+                Restaurant.objects.filter(pk=restaurant.pk).update(latitude=latitude, longitude=longitude)
+            self.orders.append(Order.objects.create(
+                firstname='Иван', lastname='Петров', phonenumber='+79001234567', address=address,
+                order_status='in_delivery', restaurant=restaurant if number != 2 else None, called=timezone.now()))
+        Order.objects.create(
+            firstname='Иван', lastname='Петров', phonenumber='+79001234567', address='Москва, Тверская, 7',
+            order_status='finished', restaurant=restaurant)
+
+    def test_orders_in_delivery_are_batched(self):
+        with perf_tools.stub_geocoder():
+            runs, unplaced = plan_courier_runs()
+
+        self.assertEqual(unplaced, [self.orders[2]])
+        self.assertEqual(sorted(order.pk for run in runs for order in run.orders),
+                         [self.orders[0].pk, self.orders[1].pk])
+        for run in runs:
+            self.assertEqual(run.restaurant.name, 'Арбат')
+            self.assertLessEqual(run.minutes, MAX_RUN_MINUTES)
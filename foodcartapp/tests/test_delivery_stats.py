@@ -0,0 +1,68 @@
+import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+
+from foodcartapp import delivery_stats
+from foodcartapp.delivery_stats import DELIVERY_BUCKETS, delivery_report
+from foodcartapp.models import DeliveryTimeStats, Order, Restaurant
+from foodcartapp.sales import day_bounds
+
+DAY = datetime.date(2024, 5, 1)
+
+
+class DeliveryStatsTest(TestCase):
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name='Арбат', address='Москва, Арбат, 1')
+        # (hour, minutes to call, minutes to deliver)
+        for hour, call, delivery in [(12, 4, 28), (12, 8, 33), (12, 12, 44), (12, 2, None), (18, 50, 200)]:
+            self.create_order(hour, call, delivery)
+        # not called yet, so left out
+        self.create_order(12, None, None)
+
+    def create_order(self, hour, call, delivery):
+        created = timezone.make_aware(datetime.datetime.combine(DAY, datetime.time(hour)))
+        Order.objects.create(
+            firstname='Иван', lastname='Петров', phonenumber='+79001234567', address='Москва, Тверская, 1',
+            restaurant=self.restaurant, created=created,
+            called=created + datetime.timedelta(minutes=call) if call is not None else None,
+            delivered=created + datetime.timedelta(minutes=delivery) if delivery is not None else None)
+
+    def test_orders_are_counted_in_buckets_by_hour(self):
+        delivery_stats.recompute_day(DAY, *day_bounds(DAY))
+
+        stats = DeliveryTimeStats.objects.filter(day=DAY, restaurant=self.restaurant)
+        self.assertEqual(
+            {hour: (call, delivery) for hour, call, delivery in stats.values_list(
+                'hour', 'call_minutes', 'delivery_minutes')},
+            {
+                # counts per bucket, then the sum of minutes and the number of orders
+                12: ([0, 1, 0, 1, 1, 1, 0, 0, 0, 0, 0, 26, 4], [0, 0, 0, 1, 1, 0, 1, 0, 0, 0, 0, 0, 0, 105, 3]),
+                # 200 minutes overflow the last bucket and are only in the totals
+                18: ([0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 0, 50, 1], [0] * len(DELIVERY_BUCKETS) + [200, 1]),
+            },
+        )
+
+    def test_recompute_replaces_the_day(self):
+        delivery_stats.recompute_day(DAY, *day_bounds(DAY))
+        Order.objects.filter(created__hour=18).delete()
+
+        delivery_stats.recompute_day(DAY, *day_bounds(DAY))
+
+        self.assertEqual(list(DeliveryTimeStats.objects.values_list('hour', flat=True)), [12])
+
+    def test_report_shows_upper_bounds_of_percentiles(self):
+        delivery_stats.recompute_day(DAY, *day_bounds(DAY))
+
+        report = delivery_report(DAY, DAY)
+
+        self.assertEqual(report['quantiles'], ['p50', 'p90'])
+        self.assertEqual(report['restaurants'], [
+            {'name': 'Арбат', 'called': 5, 'delivered': 4, 'call': [10, 60], 'delivery': [35, None]},
+        ])
+        self.assertEqual(report['hours'], [
+            {'name': '12:00', 'called': 4, 'delivered': 3, 'call': [5, 15], 'delivery': [35, 45]},
+            {'name': '18:00', 'called': 1, 'delivered': 1, 'call': [60, 60], 'delivery': [None, None]},
+        ])
+        self.assertEqual(delivery_report(DAY + datetime.timedelta(days=1), DAY + datetime.timedelta(days=7)),
+                         {'quantiles': ['p50', 'p90'], 'restaurants': [], 'hours': []})
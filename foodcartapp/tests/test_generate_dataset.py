@@ -0,0 +1,33 @@
+import datetime
+
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase
+
+from foodcartapp.management.commands.generate_dataset import DEFAULT_UNTIL
+from foodcartapp.models import Order
+
+
+class GenerateDatasetTest(TestCase):
+    def generate(self, **options):
+        with transaction.atomic():
+            call_command('generate_dataset', restaurants=3, products=10, categories=2, orders=30, verbosity=0,
+                         **options)
+            orders = list(Order.objects.order_by('id').values_list('created', 'order_status', 'total_price'))
+            transaction.set_rollback(True)
+        return orders
+
+    def test_same_seed_gives_the_same_orders_on_any_day(self):
+        orders = self.generate(seed=7)
+
+        self.assertEqual(self.generate(seed=7), orders)
+        self.assertNotEqual(self.generate(seed=8), orders)
+        period_start = DEFAULT_UNTIL - datetime.timedelta(days=89)
+        self.assertTrue(all(period_start <= created.date() <= DEFAULT_UNTIL for created, *_ in orders))
+
+    def test_orders_end_on_the_given_day(self):
+        until = datetime.date(2024, 6, 1)
+
+        orders = self.generate(until=until, days=1)
+
+        self.assertEqual({created.date() for created, *_ in orders}, {until})
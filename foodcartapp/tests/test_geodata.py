@@ -0,0 +1,67 @@
+import datetime
+from unittest import mock
+
+import requests
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from foodcartapp import geodata_functions
+from foodcartapp.models import Place
+
+FOUND = 'Москва, Тверская, 1'
+NOT_FOUND = 'Москва, улица Несуществующая, 999'
+FAILING = 'Москва, Арбат, 1'
+
+
+async def fetch_many_coordinates(apikey, places):
+    # the failing address is left out, as after a timeout
+    return {place: ('37.61', '55.76') if place == FOUND else None for place in places if place != FAILING}
+
+
+class GeocoderCacheTest(TestCase):
+    def setUp(self):
+        geodata_functions._coordinates_cache.clear()
+
+    def geocode(self, address, found):
+        geodata_functions._coordinates_cache.clear()
+        with mock.patch.object(geodata_functions, 'fetch_coordinates', return_value=found) as fetch:
+            coordinates = geodata_functions.get_coordinates_from_db_or_api('key', address)
+        return coordinates, fetch.call_count
+
+    def test_address_not_found_is_not_geocoded_again(self):
+        self.assertEqual(self.geocode(NOT_FOUND, None), (None, 1))
+        self.assertEqual(Place.objects.values_list('address', 'longitude', 'latitude').get(), (NOT_FOUND, None, None))
+
+        db_hits = geodata_functions.GEOCODER_DB_HITS.get()
+        self.assertEqual(self.geocode(NOT_FOUND, None), (None, 0))
+        self.assertEqual(geodata_functions.GEOCODER_DB_HITS.get(), db_hits + 1)
+
+    @override_settings(GEOCODER_NOT_FOUND_RETRY_DAYS=7)
+    def test_address_not_found_long_ago_is_geocoded_again(self):
+        self.geocode(NOT_FOUND, None)
+        Place.objects.update(updated=timezone.now() - datetime.timedelta(days=8))
+
+        self.assertEqual(self.geocode(NOT_FOUND, ('37.5', '55.7')), ((37.5, 55.7), 1))
+        self.assertEqual(Place.objects.values_list('longitude', 'latitude').get(), (37.5, 55.7))
+
+    def test_addresses_not_found_are_stored_and_failed_ones_are_not(self):
+        with mock.patch.object(geodata_functions, 'fetch_many_coordinates', fetch_many_coordinates):
+            coordinates = geodata_functions.get_coordinates_for_addresses('key', [FOUND, NOT_FOUND, FAILING])
+
+        self.assertEqual(coordinates, {FOUND: (37.61, 55.76), NOT_FOUND: None})
+        self.assertEqual(set(Place.objects.values_list('address', 'longitude')), {(FOUND, 37.61), (NOT_FOUND, None)})
+
+        geodata_functions._coordinates_cache.clear()
+        with mock.patch.object(geodata_functions, 'fetch_many_coordinates', side_effect=AssertionError):
+            coordinates = geodata_functions.get_coordinates_for_addresses('key', [FOUND, NOT_FOUND])
+        self.assertEqual(coordinates, {FOUND: (37.61, 55.76), NOT_FOUND: None})
+
+    @override_settings(GEOCODER_TIMEOUT=3)
+    def test_connection_error_is_not_stored(self):
+        errors = geodata_functions.GEOCODER_HTTP_ERRORS.get()
+        with mock.patch.object(requests, 'get', side_effect=requests.exceptions.ConnectTimeout) as get:
+            self.assertIsNone(geodata_functions.get_coordinates_from_db_or_api('key', FAILING))
+
+        self.assertEqual(get.call_args.kwargs['timeout'], 3)
+        self.assertEqual(geodata_functions.GEOCODER_HTTP_ERRORS.get(), errors + 1)
+        self.assertFalse(Place.objects.exists())
@@ -0,0 +1,55 @@
+import io
+import tempfile
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TransactionTestCase, override_settings
+from PIL import Image
+
+from foodcartapp import menu_cache
+from foodcartapp.models import MenuVersion, Product
+
+
+def png_file(name):
+    content = io.BytesIO()
+    Image.new('RGB', (800, 600), 'orange').save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue(), content_type='image/png')
+
+
+class ImageVariantsTest(TransactionTestCase):
+    """Menu versions are bumped on commit, so the changes are committed for real."""
+
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        settings_override = override_settings(MEDIA_ROOT=media_root.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        menu_cache.clear()
+
+    def menu_version(self):
+        return MenuVersion.objects.values_list('version', flat=True).first() or 0
+
+    def test_regenerated_variants_invalidate_cached_menus(self):
+        product = Product.objects.create(name='Чизбургер', price=250, image=png_file('burger.png'))
+        self.assertEqual(product.image_variants['source'], product.image.name)
+        version = self.menu_version()
+
+        call_command('generate_image_variants', '--force', stdout=io.StringIO())
+
+        self.assertGreater(self.menu_version(), version)
+
+    def test_products_sharing_an_image_keep_their_own_variants(self):
+        first = Product.objects.create(name='Чизбургер', price=250, image=png_file('burger.png'))
+        second = Product.objects.create(name='Двойной чизбургер', price=350, image=first.image.name)
+
+        names = [first.image_variants[size_name]['original'] for size_name in ('small', 'medium', 'large')]
+        self.assertTrue(set(names).isdisjoint(
+            second.image_variants[size_name]['original'] for size_name in ('small', 'medium', 'large')))
+
+        second.update_image_variants()
+
+        for name in names:
+            self.assertTrue(default_storage.exists(name))
+        self.assertEqual(Product.objects.get(pk=first.pk).image_variants, first.image_variants)
@@ -0,0 +1,44 @@
+from django.test import TransactionTestCase, override_settings
+
+from foodcartapp import menu_cache
+from foodcartapp.models import MenuVersion, Product
+
+
+@override_settings(MENU_VERSION_CHECK_INTERVAL=3600)
+class MenuCacheTest(TransactionTestCase):
+    def setUp(self):
+        menu_cache.clear()
+        self.computed = 0
+
+    def product_names(self):
+        def compute():
+            self.computed += 1
+            return sorted(Product.objects.values_list('name', flat=True))
+        return menu_cache.get_or_set('product_names', compute)
+
+    def test_value_is_computed_once_per_version(self):
+        Product.objects.create(name='Чизбургер', price=250)
+
+        self.assertEqual(self.product_names(), ['Чизбургер'])
+        self.assertEqual(self.product_names(), ['Чизбургер'])
+        self.assertEqual(self.computed, 1)
+
+    def test_menu_change_invalidates_the_cache_of_this_process_at_once(self):
+        self.assertEqual(self.product_names(), [])
+        version = menu_cache.current_menu_version()
+
+        Product.objects.create(name='Чизбургер', price=250)
+
+        self.assertEqual(MenuVersion.objects.get().version, version + 1)
+        self.assertEqual(self.product_names(), ['Чизбургер'])
+        self.assertEqual(self.computed, 2)
+
+    def test_change_by_another_process_is_seen_after_the_check_interval(self):
+        self.assertEqual(self.product_names(), [])
+        # another worker saved a product and bumped the version
+        Product.objects.bulk_create([Product(name='Чизбургер', price=250)])
+        menu_cache._increment()
+
+        self.assertEqual(self.product_names(), [])
+        with override_settings(MENU_VERSION_CHECK_INTERVAL=0):
+            self.assertEqual(self.product_names(), ['Чизбургер'])
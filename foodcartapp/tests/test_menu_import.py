@@ -0,0 +1,89 @@
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from foodcartapp import menu_cache
+from foodcartapp.menu_import import import_menu
+from foodcartapp.models import Product, RestaurantMenuItem
+
+
+class MenuImportTest(TestCase):
+    def setUp(self):
+        menu_cache.clear()
+
+    def test_creates_restaurants_products_and_menu_items(self):
+        report = import_menu([
+            'restaurant,product,category,price,available,description',
+            'Арбат,Чизбургер,Бургеры,250,1,',
+            'Арбат,Кола,,90,0,Холодная',
+            'Тверская,Чизбургер,Бургеры,260,1,',
+        ])
+
+        self.assertEqual(report.errors, [])
+        self.assertEqual(report.created_products, 2)
+        self.assertEqual(report.created_menu_items, 3)
+        self.assertEqual(Product.objects.get(name='Чизбургер').price, 260)
+        self.assertIsNone(Product.objects.get(name='Кола').category)
+        self.assertFalse(RestaurantMenuItem.objects.get(product__name='Кола').availability)
+
+    def test_second_import_updates_availability(self):
+        import_menu(['restaurant,product,price,available', 'Арбат,Кола,90,1'])
+        report = import_menu(['restaurant,product,price,available', 'Арбат,Кола,90,0'])
+
+        self.assertEqual(report.updated_menu_items, 1)
+        self.assertEqual(report.created_menu_items, 0)
+        self.assertFalse(RestaurantMenuItem.objects.get().availability)
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        report = import_menu([
+            'restaurant,product,category,price',
+            'Арбат,Кола,,дорого',
+            f'Арбат,{"К" * 51},,90',
+            f'Арбат,Кола,{"Н" * 51},90',
+            'Арбат,Чизбургер,,250',
+        ])
+
+        self.assertEqual([line for line, _ in report.errors], [2, 3, 4])
+        self.assertEqual(list(Product.objects.values_list('name', flat=True)), ['Чизбургер'])
+
+    def test_prices_not_fitting_the_price_field_are_reported(self):
+        report = import_menu([
+            'restaurant,product,price',
+            'Арбат,Кола,1000000',
+            'Арбат,Кола,90.005',
+            'Арбат,Кола,1e30',
+            'Арбат,Чизбургер,999999.99',
+            'Арбат,Картошка,"99,50"',
+        ])
+
+        self.assertEqual([line for line, _ in report.errors], [2, 3, 4])
+        self.assertIn('цена больше 999999.99', report.errors[0][1])
+        self.assertIn('больше 2 знаков после запятой', report.errors[1][1])
+        self.assertEqual(dict(Product.objects.values_list('name', 'price')),
+                         {'Чизбургер': Decimal('999999.99'), 'Картошка': Decimal('99.50')})
+
+    def test_menu_items_missed_by_the_read_back_are_reported(self):
+        # the inserted rows are not found, as if they had other ids
+        with mock.patch.object(RestaurantMenuItem.objects, 'bulk_create'):
+            report = import_menu(['restaurant,product,price', 'Арбат,Кола,90', 'Арбат,Чизбургер,250'])
+
+        self.assertEqual(report.errors, [(2, 'пункт меню не найден после сохранения'),
+                                         (3, 'пункт меню не найден после сохранения')])
+        self.assertEqual(report.created_menu_items, 0)
+        self.assertEqual(report.created_products, 2)
+
+    def test_imported_products_without_image_and_category_are_served(self):
+        import_menu(['restaurant,product,price', 'Арбат,Кола,90'])
+
+        response = self.client.get('/api/products/')
+
+        self.assertEqual(response.status_code, 200)
+        product, = response.json()
+        self.assertIsNone(product['category'])
+        self.assertIsNone(product['image'])
+        self.assertEqual(product['image_srcset'], '')
+
+        self.client.force_login(get_user_model().objects.create_user('manager', is_staff=True))
+        self.assertEqual(self.client.get('/manager/products/').status_code, 200)
@@ -0,0 +1,86 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TransactionTestCase, override_settings
+
+from foodcartapp import order_intake
+from foodcartapp.models import Order, Product
+
+
+class OrderIntakeTest(TransactionTestCase):
+    # batches are committed for real: SQLite checks foreign keys only on commit
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.buffer_path = os.path.join(directory.name, 'orders.jsonl')
+        self.burger = Product.objects.create(name='Чизбургер', price=250)
+        self.cola = Product.objects.create(name='Кола', price=90)
+
+    def post_order(self, products):
+        with override_settings(ORDER_INTAKE_BUFFER=self.buffer_path):
+            return self.client.post('/api/order/', {
+                'firstname': 'Иван',
+                'lastname': 'Петров',
+                'phonenumber': '+79291234567',
+                'address': 'Москва, Тверская, 1',
+                'products': products,
+            }, content_type='application/json')
+
+    def test_buffered_orders_are_committed(self):
+        response = self.post_order([{'product': self.burger.id, 'quantity': 2}])
+        self.assertEqual(response.status_code, 202)
+
+        self.assertEqual(order_intake.drain(self.buffer_path), 1)
+        order = Order.objects.get(intake_id=response.json()['intake_id'])
+        self.assertEqual(order.total_price, 500)
+        self.assertEqual(order_intake.drain(self.buffer_path), 0)
+
+    def test_order_with_repeated_product_is_rejected(self):
+        response = self.post_order([
+            {'product': self.burger.id, 'quantity': 1},
+            {'product': self.burger.id, 'quantity': 1},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(os.path.exists(self.buffer_path))
+
+    def test_failing_record_does_not_block_the_queue(self):
+        self.post_order([{'product': self.burger.id, 'quantity': 1}])
+        self.post_order([{'product': self.cola.id, 'quantity': 1}])
+        self.post_order([{'product': self.burger.id, 'quantity': 3}])
+        deleted_product_id = self.cola.id
+        self.cola.delete()
+        with open(self.buffer_path, 'a', encoding='utf-8') as buffer_file:
+            buffer_file.write('not json\n')
+
+        with self.assertLogs('foodcartapp.order_intake', 'ERROR'):
+            created = order_intake.drain(self.buffer_path)
+
+        self.assertEqual(created, 2)
+        self.assertEqual(Order.objects.count(), 2)
+        self.assertFalse(os.path.exists(f'{self.buffer_path}.draining'))
+        with open(f'{self.buffer_path}.failed', encoding='utf-8') as failed_file:
+            failed = failed_file.readlines()
+        self.assertEqual(len(failed), 2)
+        self.assertEqual(json.loads(failed[0])['products'][0]['product'], deleted_product_id)
+        self.assertEqual(failed[1], 'not json\n')
+
+        self.post_order([{'product': self.burger.id, 'quantity': 1}])
+        self.assertEqual(order_intake.drain(self.buffer_path), 1)
+
+    def test_unavailable_database_keeps_orders_in_the_buffer(self):
+        self.post_order([{'product': self.burger.id, 'quantity': 1}])
+        self.post_order([{'product': self.cola.id, 'quantity': 1}])
+
+        locked = mock.patch.object(Order.objects, 'bulk_create', side_effect=OperationalError('database is locked'))
+        with locked, self.assertRaises(OperationalError):
+            order_intake.drain(self.buffer_path)
+
+        self.assertFalse(os.path.exists(f'{self.buffer_path}.failed'))
+        self.assertTrue(os.path.exists(f'{self.buffer_path}.draining'))
+        self.assertEqual(order_intake.drain(self.buffer_path), 2)
+        self.assertEqual(Order.objects.count(), 2)
@@ -0,0 +1,37 @@
+import time
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, override_settings
+
+from foodcartapp import geodata_functions, perf_tools
+
+PLACES = ['Москва, Тверская, 1', 'Москва, Тверская, 3', 'Москва, Тверская, 5']
+
+
+@override_settings(STUB_GEOCODER_DELAY_MS=100, GEOCODER_CONCURRENCY=10)
+class StubGeocoderTest(SimpleTestCase):
+    def test_answers_take_the_configured_delay(self):
+        with perf_tools.stub_geocoder():
+            started = time.perf_counter()
+            coordinates = geodata_functions.fetch_coordinates('key', PLACES[0])
+            elapsed = time.perf_counter() - started
+
+        self.assertEqual(coordinates, perf_tools.fake_coordinates(PLACES[0]))
+        self.assertGreaterEqual(elapsed, 0.1)
+
+    def test_concurrent_requests_wait_together(self):
+        with perf_tools.stub_geocoder():
+            started = time.perf_counter()
+            coordinates = async_to_sync(geodata_functions.fetch_many_coordinates)('key', PLACES)
+            elapsed = time.perf_counter() - started
+
+        self.assertEqual(coordinates, {place: perf_tools.fake_coordinates(place) for place in PLACES})
+        self.assertGreaterEqual(elapsed, 0.1)
+        self.assertLess(elapsed, 0.3)
+
+    def test_explicit_delay_overrides_the_setting(self):
+        with perf_tools.stub_geocoder(delay_ms=0):
+            started = time.perf_counter()
+            geodata_functions.fetch_coordinates('key', PLACES[0])
+
+            self.assertLess(time.perf_counter() - started, 0.1)
@@ -0,0 +1,19 @@
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from foodcartapp.management.commands.check_query_plans import QUERY_PLANS
+
+
+class CheckQueryPlansTest(SimpleTestCase):
+    def test_hot_queries_use_indexes(self):
+        # the command migrates a database of its own, which can't be nested in the in-memory test database
+        result = subprocess.run(
+            [sys.executable, 'manage.py', 'check_query_plans', '--orders', '300'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True)
+
+        self.assertEqual(result.returncode, 0, result.stdout + result.stderr)
+        for name in QUERY_PLANS:
+            self.assertIn(f'{name:<40}OK', result.stdout)
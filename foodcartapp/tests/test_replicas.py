@@ -0,0 +1,106 @@
+import json
+import os
+import sqlite3
+import tempfile
+
+from django.db import connections
+from django.http import JsonResponse
+from django.test import RequestFactory, TransactionTestCase, override_settings
+
+from foodcartapp import menu_cache
+from foodcartapp.models import MenuVersion, Product, Restaurant, RestaurantMenuItem
+from star_burger.db_router import PIN_COOKIE_NAME, read_from_replica
+
+REPLICA = 'replica_test'
+
+
+@read_from_replica
+def product_names_view(request):
+    names_before = sorted(Product.objects.values_list('name', flat=True))
+    Product.objects.create(name='Новинка', price=100)
+    names_after = sorted(Product.objects.values_list('name', flat=True))
+    return JsonResponse({'before': names_before, 'after': names_after})
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA], ORDER_INTAKE_BUFFER='')
+class ReplicaRoutingTest(TransactionTestCase):
+    """The replica is a separate database file, so a read shows where it went by the data it finds."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.replica_directory = tempfile.TemporaryDirectory()
+        replica_path = os.path.join(cls.replica_directory.name, 'replica.sqlite3')
+        # the replica starts as a copy of the migrated, still empty primary
+        connections['default'].ensure_connection()
+        with sqlite3.connect(replica_path) as replica:
+            connections['default'].connection.backup(replica)
+        replica.close()
+        connections.databases[REPLICA] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': replica_path}
+        # the test runner checks the aliases before the replica exists
+        cls.databases = {'default', REPLICA}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        cls.replica_directory.cleanup()
+
+    def setUp(self):
+        menu_cache.clear()
+        for database, name in (('default', 'Основной бургер'), (REPLICA, 'Бургер с реплики')):
+            restaurant = Restaurant.objects.using(database).create(name='Арбат', address='Арбат, 1')
+            product = Product.objects.using(database).create(name=name, price=250)
+            RestaurantMenuItem.objects.using(database).create(restaurant=restaurant, product=product)
+
+    def tearDown(self):
+        # flush skips the replica: its tables are not migrated by Django
+        for model in (RestaurantMenuItem, Product, Restaurant):
+            model.objects.using(REPLICA).all().delete()
+
+    def product_names(self):
+        return [product['name'] for product in self.client.get('/api/products/').json()]
+
+    def test_lagging_replica_does_not_poison_the_primary_menu(self):
+        # the replica has not received the menu changes of the primary yet
+        self.assertGreater(menu_cache.current_menu_version(), MenuVersion.objects.using(REPLICA).count())
+
+        self.assertEqual(self.product_names(), ['Бургер с реплики'])
+        self.client.cookies[PIN_COOKIE_NAME] = '1'
+        self.assertEqual(self.product_names(), ['Основной бургер'])
+
+    def test_decorated_view_reads_from_replica(self):
+        self.assertEqual(self.product_names(), ['Бургер с реплики'])
+
+    def test_write_goes_to_primary_and_pins_the_request(self):
+        response = product_names_view(RequestFactory().get('/'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {
+            'before': ['Бургер с реплики'],
+            'after': ['Новинка', 'Основной бургер'],
+        })
+        self.assertTrue(Product.objects.using('default').filter(name='Новинка').exists())
+        self.assertFalse(Product.objects.using(REPLICA).filter(name='Новинка').exists())
+
+    def test_unsafe_request_pins_the_client_to_primary(self):
+        product_id = Product.objects.using('default').get().id
+        response = self.client.post('/api/order/', {
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': '+79001234567',
+            'address': 'Москва, Тверская, 1',
+            'products': [{'product': product_id, 'quantity': 1}],
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(PIN_COOKIE_NAME, response.cookies)
+        self.assertEqual(self.product_names(), ['Основной бургер'])
+
+    def test_failed_unsafe_request_does_not_pin(self):
+        response = self.client.post('/api/order/', {}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(PIN_COOKIE_NAME, response.cookies)
+        self.assertEqual(self.product_names(), ['Бургер с реплики'])
@@ -0,0 +1,88 @@
+import datetime
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import TestCase
+from django.utils import timezone
+
+from foodcartapp import archive
+from foodcartapp.models import (ArchivedOrderItem, DailyProductSales, DailyRestaurantSales, Order, OrderItem,
+                                Product, Restaurant)
+from foodcartapp.sales import refresh_sales_rollups
+
+# recent days keep `refresh_sales_rollups --since` short
+FIRST_DAY = timezone.localdate() - datetime.timedelta(days=2)
+SECOND_DAY = FIRST_DAY + datetime.timedelta(days=1)
+
+
+class SalesRollupsTest(TestCase):
+    def setUp(self):
+        self.restaurant = Restaurant.objects.create(name='Арбат', address='Москва, Арбат, 1')
+        self.burger = Product.objects.create(name='Чизбургер', price=Decimal('250.50'))
+        self.cola = Product.objects.create(name='Кола', price=Decimal('90.10'))
+        self.first_day_orders = [
+            self.create_order(FIRST_DAY, 10, [(self.burger, 2), (self.cola, 1)]),
+            self.create_order(FIRST_DAY, 18, [(self.burger, 1)]),
+        ]
+        self.second_day_order = self.create_order(SECOND_DAY, 12, [(self.cola, 3)])
+
+    def create_order(self, day, hour, items):
+        order = Order.objects.create(
+            firstname='Иван', lastname='Петров', phonenumber='+79001234567', address='Москва, Тверская, 1',
+            restaurant=self.restaurant, order_status='finished',
+            created=timezone.make_aware(datetime.datetime.combine(day, datetime.time(hour))))
+        for product, quantity in items:
+            OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price * quantity)
+        order.update_total_price()
+        return order
+
+    def restaurant_sales(self):
+        return set(DailyRestaurantSales.objects.values_list('day', 'orders_count', 'revenue'))
+
+    def product_revenue(self, day):
+        return dict(DailyProductSales.objects.filter(day=day).values_list('product__name', 'revenue'))
+
+    def test_days_of_dirty_orders_are_recomputed_and_flags_cleared(self):
+        self.assertEqual(refresh_sales_rollups(), [FIRST_DAY, SECOND_DAY])
+
+        self.assertFalse(Order.objects.filter(rollup_dirty=True).exists())
+        self.assertEqual(self.restaurant_sales(), {
+            (FIRST_DAY, 2, Decimal('841.60')),
+            (SECOND_DAY, 1, Decimal('270.30')),
+        })
+        self.assertEqual(refresh_sales_rollups(), [])
+
+    def test_only_days_of_changed_orders_are_recomputed(self):
+        refresh_sales_rollups()
+        # a stale row shows whether the first day was recomputed
+        DailyRestaurantSales.objects.filter(day=FIRST_DAY).update(revenue=0)
+        self.second_day_order.comment = 'Без лука'
+        self.second_day_order.save()
+
+        self.assertEqual(refresh_sales_rollups(), [SECOND_DAY])
+        self.assertEqual(DailyRestaurantSales.objects.get(day=FIRST_DAY).revenue, 0)
+
+    def test_archived_orders_keep_their_revenue(self):
+        revenue = OrderItem.objects.filter(order__in=self.first_day_orders).aggregate(revenue=Sum('price'))['revenue']
+        refresh_sales_rollups()
+        before = self.product_revenue(FIRST_DAY)
+
+        archive.archive_batch([order.pk for order in self.first_day_orders])
+        refresh_sales_rollups([FIRST_DAY])
+
+        self.assertEqual(self.product_revenue(FIRST_DAY), before)
+        self.assertEqual(sum(before.values()), revenue)
+        self.assertEqual(ArchivedOrderItem.objects.aggregate(revenue=Sum('price'))['revenue'], revenue)
+        self.assertEqual(DailyRestaurantSales.objects.get(day=FIRST_DAY).revenue, revenue)
+
+    def test_command_recomputes_all_days_since_the_date(self):
+        stdout = StringIO()
+        days_since = (timezone.localdate() - FIRST_DAY).days + 1
+
+        call_command('refresh_sales_rollups', '--since', FIRST_DAY.isoformat(), stdout=stdout)
+
+        self.assertIn(f'Пересчитано дней: {days_since}', stdout.getvalue())
+        self.assertFalse(Order.objects.filter(rollup_dirty=True).exists())
+        self.assertEqual(len(self.restaurant_sales()), 2)
@@ -0,0 +1,63 @@
+import itertools
+import math
+import random
+
+from django.test import SimpleTestCase
+
+from foodcartapp.geodata_functions import distance_km
+from foodcartapp.models import Restaurant
+from foodcartapp.split_orders import MAX_RESTAURANTS, build_product_index, find_split
+
+
+def random_instance(seed):
+    rnd = random.Random(seed)
+    restaurants = []
+    for restaurant_id in range(1, rnd.randint(2, 8)):
+        restaurant = Restaurant(id=restaurant_id, name=f'Ресторан {restaurant_id}')
+        # some restaurants are not geocoded yet
+        if rnd.random() < 0.9:
+            restaurant.latitude, restaurant.longitude = 55.6 + rnd.random() * 0.3, 37.4 + rnd.random() * 0.4
+        product_ids = frozenset(product_id for product_id in range(6) if rnd.random() < 0.35)
+        restaurants.append((restaurant, product_ids))
+    order_products = set(rnd.sample(range(6), rnd.randint(1, 4)))
+    order_coordinates = (55.6 + rnd.random() * 0.3, 37.4 + rnd.random() * 0.4)
+    return restaurants, order_products, order_coordinates
+
+
+def brute_force(restaurants, order_products, order_coordinates):
+    """Least total distance of up to `MAX_RESTAURANTS` restaurants having all the products, None without a cover."""
+    placed = [(restaurant, product_ids) for restaurant, product_ids in restaurants if restaurant.coordinates]
+    best = None
+    for size in range(1, MAX_RESTAURANTS + 1):
+        for chosen in itertools.combinations(placed, size):
+            if not order_products <= set().union(*(product_ids for _, product_ids in chosen)):
+                continue
+            cost = sum(distance_km(order_coordinates, restaurant.coordinates) for restaurant, _ in chosen)
+            if best is None or cost < best:
+                best = cost
+    return best
+
+
+class FindSplitTest(SimpleTestCase):
+    def test_matches_brute_force(self):
+        for seed in range(300):
+            restaurants, order_products, order_coordinates = random_instance(seed)
+            split = find_split(order_products, build_product_index(restaurants), order_coordinates,
+                               time_budget=math.inf)
+            expected = brute_force(restaurants, order_products, order_coordinates)
+            with self.subTest(seed=seed):
+                if expected is None:
+                    self.assertIsNone(split)
+                    continue
+                self.assertIsNotNone(split)
+                self.assertLessEqual(len(split), MAX_RESTAURANTS)
+                self.assertEqual(set().union(*(covered for _, covered, _ in split)), order_products)
+                for restaurant, covered, distance in split:
+                    self.assertLessEqual(covered, dict(restaurants)[restaurant])
+                    self.assertAlmostEqual(distance, distance_km(order_coordinates, restaurant.coordinates))
+                self.assertAlmostEqual(sum(distance for _, _, distance in split), expected)
+
+    def test_order_without_a_restaurant_for_a_product_has_no_split(self):
+        restaurant = Restaurant(id=1, latitude=55.75, longitude=37.6)
+
+        self.assertIsNone(find_split({1, 2}, build_product_index([(restaurant, frozenset({1}))]), (55.7, 37.6)))
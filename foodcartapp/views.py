@@ -1,5 +1,7 @@
 import json
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.db import transaction
 from django.http import JsonResponse
 from django.templatetags.static import static
@@ -9,10 +11,15 @@ from rest_framework.response import Response
 from rest_framework.serializers import (CharField, ModelSerializer,
                                         ValidationError)
 
+from monitoring.query_budget import query_budget
+from star_burger.db_router import read_from_replica
+
+from . import images, menu_cache, order_intake
 from .models import Order, OrderItem, Product
 
 
-def banners_list_api(request):
+@query_budget(0)
+async def banners_list_api(request):
     # FIXME move data to db?
     return JsonResponse([
         {
@@ -36,7 +43,7 @@ def banners_list_api(request):
     })
 
 
-def product_list_api(request):
+def dump_products():
     products = Product.objects.select_related('category').available()
 
     dumped_products = []
@@ -47,17 +54,27 @@ def product_list_api(request):
             'price': product.price,
             'special_status': product.special_status,
             'description': product.description,
+            # products imported from CSV may have neither a category nor an image
             'category': {
                 'id': product.category.id,
                 'name': product.category.name,
-            },
-            'image': product.image.url,
+            } if product.category else None,
+            'image': product.image.url if product.image else None,
+            'image_srcset': images.srcset(product.image, product.image_variants),
+            'image_webp_srcset': images.srcset(product.image, product.image_variants, 'webp'),
             'restaurant': {
                 'id': product.id,
                 'name': product.name,
             }
         }
         dumped_products.append(dumped_product)
+    return dumped_products
+
+
+@query_budget(2)
+@read_from_replica
+async def product_list_api(request):
+    dumped_products = await sync_to_async(menu_cache.get_or_set)('product_list', dump_products)
     return JsonResponse(dumped_products, safe=False, json_dumps_params={
         'ensure_ascii': False,
         'indent': 4,
@@ -80,6 +97,12 @@ class OrderSerializer(ModelSerializer):
         fields = ['firstname', 'lastname',
                   'address', 'phonenumber', 'products']
 
+    def validate_products(self, products):
+        product_ids = [item['product'].id for item in products]
+        if len(product_ids) != len(set(product_ids)):
+            raise ValidationError('Товары в заказе повторяются, укажите количество вместо повтора')
+        return products
+
 
 @transaction.atomic
 @api_view(['POST'])
@@ -87,21 +110,27 @@ def register_order(request):
     serializer = OrderSerializer(data=request.data)
     serializer.is_valid(raise_exception=True)
 
+    if settings.ORDER_INTAKE_BUFFER:
+        intake_id = order_intake.append_order(settings.ORDER_INTAKE_BUFFER, serializer.validated_data)
+        return Response({**serializer.data, 'intake_id': intake_id}, status=status.HTTP_202_ACCEPTED)
+
+    items = [
+        OrderItem(
+            product=product['product'],
+            quantity=product['quantity'],
+            price=product['product'].price * product['quantity'])
+        for product in serializer.validated_data['products']
+    ]
     order = Order.objects.create(
         firstname=serializer.validated_data['firstname'],
         lastname=serializer.validated_data['lastname'],
         phonenumber=serializer.validated_data['phonenumber'],
         address=serializer.validated_data['address'],
+        total_price=sum(item.price for item in items),
     )
-
-    items = OrderItem.objects.bulk_create(
-        [OrderItem(
-            product=product['product'],
-            quantity=product['quantity'],
-            price=product['product'].price * product['quantity'],
-            order_id=order.id)
-            for product in serializer.validated_data['products']]
-    )
+    for item in items:
+        item.order = order
+    OrderItem.objects.bulk_create(items)
 
     serializer = OrderSerializer(order)
     return Response(serializer.data)
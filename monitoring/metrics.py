@@ -0,0 +1,202 @@
+"""Minimal Prometheus-style metrics.
+
+Every process keeps its metrics in memory. When `METRICS_DIR` is set, the
+process also dumps them to its own file in that directory at most once per
+`METRICS_FLUSH_INTERVAL` seconds, and the `/metrics` view sums the files of
+all worker processes. Clean the directory when the service is restarted.
+"""
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REGISTRY = {}
+
+_lock = threading.Lock()
+_process_tokens = {}
+_last_flush = 0
+
+
+def _process_token():
+    # computed per pid, so workers forked from a preloaded master get own files
+    pid = os.getpid()
+    if pid not in _process_tokens:
+        _process_tokens[pid] = f'{pid}-{uuid.uuid4().hex[:8]}'
+    return _process_tokens[pid]
+
+
+class Metric:
+    type = None
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.values = {}
+        REGISTRY[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels[label]) for label in self.labels)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with _lock:
+            state = self.values.setdefault(key, histogram_state(self.buckets))
+            observe_histogram(self.buckets, state, value)
+
+
+def histogram_state(buckets):
+    # per-bucket counts followed by the sum and the count, values above the last bound are only in the totals
+    return [0] * (len(buckets) + 2)
+
+
+def observe_histogram(buckets, state, value):
+    index = bisect.bisect_left(buckets, value)
+    if index < len(buckets):
+        state[index] += 1
+    state[-2] += value
+    state[-1] += 1
+
+
+def histogram_quantile(buckets, state, quantile):
+    """Upper bound of the bucket holding the quantile, None if it overflows the last bucket."""
+    if not state or not state[-1]:
+        return None
+    rank = quantile * state[-1]
+    cumulative = 0
+    for bound, count in zip(buckets, state):
+        cumulative += count
+        if cumulative >= rank:
+            return bound
+    return None
+
+
+class Gauge(Metric):
+    """Value computed by a callback at scrape time instead of being collected per process."""
+    type = 'gauge'
+
+    def __init__(self, name, documentation, callback):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+
+def _dump():
+    with _lock:
+        return {
+            name: [[list(key), value] for key, value in metric.values.items()]
+            for name, metric in REGISTRY.items()
+            if metric.type != 'gauge'
+        }
+
+
+def flush(force=False):
+    global _last_flush
+
+    metrics_dir = settings.METRICS_DIR
+    now = time.monotonic()
+    if not metrics_dir or (not force and now - _last_flush < settings.METRICS_FLUSH_INTERVAL):
+        return
+    _last_flush = now
+
+    os.makedirs(metrics_dir, exist_ok=True)
+    path = os.path.join(metrics_dir, f'metrics-{_process_token()}.json')
+    with open(f'{path}.tmp', 'w') as metrics_file:
+        json.dump(_dump(), metrics_file)
+    os.replace(f'{path}.tmp', path)
+
+
+def collect():
+    """Return metric values summed over all known processes."""
+    if not settings.METRICS_DIR:
+        dumps = [_dump()]
+    else:
+        flush(force=True)
+        dumps = []
+        for path in glob.glob(os.path.join(settings.METRICS_DIR, 'metrics-*.json')):
+            try:
+                with open(path) as metrics_file:
+                    dumps.append(json.load(metrics_file))
+            except (OSError, ValueError):
+                continue
+
+    collected = {name: {} for name in REGISTRY}
+    for dump in dumps:
+        for name, values in dump.items():
+            if name not in collected:
+                continue
+            for key, value in values:
+                key = tuple(key)
+                if isinstance(value, list):
+                    total = collected[name].setdefault(key, [0] * len(value))
+                    collected[name][key] = [left + right for left, right in zip(total, value)]
+                else:
+                    collected[name][key] = collected[name].get(key, 0) + value
+
+    for name, metric in REGISTRY.items():
+        if metric.type == 'gauge':
+            collected[name][()] = metric.callback()
+    return collected
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    escaped = (
+        str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        for value in values
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    lines = []
+    for name, values in collect().items():
+        metric = REGISTRY[name]
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.type}')
+        for key, value in sorted(values.items()):
+            if metric.type == 'histogram':
+                cumulative = 0
+                for bound, count in zip(metric.buckets, value):
+                    cumulative += count
+                    labels = _format_labels(metric.labels + ('le',), key + (_format_value(bound),))
+                    lines.append(f'{name}_bucket{labels} {cumulative}')
+                labels = _format_labels(metric.labels + ('le',), key + ('+Inf',))
+                lines.append(f'{name}_bucket{labels} {value[-1]}')
+                labels = _format_labels(metric.labels, key)
+                lines.append(f'{name}_sum{labels} {_format_value(value[-2])}')
+                lines.append(f'{name}_count{labels} {value[-1]}')
+            else:
+                lines.append(f'{name}{_format_labels(metric.labels, key)} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
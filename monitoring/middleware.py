@@ -0,0 +1,88 @@
+import asyncio
+import contextvars
+import time
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from monitoring import metrics
+
+REQUEST_LATENCY = metrics.Histogram(
+    'django_request_latency_seconds', 'Время обработки запроса', labels=['view'])
+REQUESTS = metrics.Counter(
+    'django_requests_total', 'Число запросов', labels=['view', 'method', 'status'])
+SQL_QUERIES = metrics.Counter(
+    'django_sql_queries_total', 'Число SQL-запросов', labels=['view'])
+SQL_SECONDS = metrics.Counter(
+    'django_sql_query_seconds_total', 'Суммарное время SQL-запросов', labels=['view'])
+
+# context variables are copied into sync_to_async threads, so queries made
+# by async views are attributed to their request as well
+_request_queries = contextvars.ContextVar('request_queries', default=None)
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _request_queries.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.count += 1
+        stats.duration += time.perf_counter() - started
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class MetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        stats = QueryStats()
+        token = _request_queries.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = QueryStats()
+        token = _request_queries.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self.record(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, stats, elapsed):
+        resolver_match = getattr(request, 'resolver_match', None)
+        view = resolver_match.view_name if resolver_match else '<unresolved>'
+        REQUEST_LATENCY.observe(elapsed, view=view)
+        REQUESTS.inc(view=view, method=request.method, status=response.status_code)
+        SQL_QUERIES.inc(stats.count, view=view)
+        SQL_SECONDS.inc(stats.duration, view=view)
+        metrics.flush()
@@ -0,0 +1,68 @@
+"""Declared upper bounds for the number of SQL queries a page may issue.
+
+Views get their budget with the `query_budget` decorator, admin pages with
+`changelist_query_budget` and `change_form_query_budget` attributes of the
+`ModelAdmin`. The `check_query_budgets` command renders every page with
+budget on two data sizes and fails if a page exceeds the budget or issues
+more queries on the larger data set.
+"""
+import contextlib
+
+from django.contrib import admin
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+
+def query_budget(max_queries):
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
+
+
+def _walk_patterns(patterns, prefix=''):
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            yield from _walk_patterns(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern):
+            yield route, pattern.callback
+
+
+def collect_view_budgets():
+    """Yield `(path, budget)` for every argument-less route with a budget."""
+    for route, callback in _walk_patterns(get_resolver().url_patterns):
+        budget = getattr(callback, 'query_budget', None)
+        if budget is None:
+            continue
+        if '<' in route or route.startswith('^'):
+            raise ValueError(f'Query budget of {route} can not be checked: route has parameters')
+        yield '/' + route, budget
+
+
+def collect_admin_budgets(site=admin.site):
+    """Yield `(path, budget)` for admin changelists and change forms with a budget.
+
+    Change forms are rendered for the first object of the model.
+    """
+    for model, model_admin in site._registry.items():
+        url_prefix = f'{site.name}:{model._meta.app_label}_{model._meta.model_name}'
+        budget = getattr(model_admin, 'changelist_query_budget', None)
+        if budget is not None:
+            yield reverse(f'{url_prefix}_changelist'), budget
+
+        budget = getattr(model_admin, 'change_form_query_budget', None)
+        obj = model._default_manager.order_by('pk').first()
+        if budget is not None and obj:
+            yield reverse(f'{url_prefix}_change', args=[obj.pk]), budget
+
+
+def measure_pages(client):
+    """Yield `(path, response, queries, budget)` for every page with a budget, requested by the client."""
+    for path, budget in [*collect_view_budgets(), *collect_admin_budgets()]:
+        with contextlib.ExitStack() as stack:
+            # reads may go to replicas, count queries on every database
+            captured = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+            response = client.get(path)
+        yield path, response, sum(len(queries) for queries in captured), budget
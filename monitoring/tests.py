@@ -0,0 +1,71 @@
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from foodcartapp import archive, geodata_functions, menu_cache, perf_tools
+from foodcartapp.sales import refresh_sales_rollups
+from monitoring import metrics
+from monitoring.query_budget import measure_pages
+
+
+class MetricsAccessTest(TestCase):
+    def test_anonymous_request_from_localhost_is_forbidden_by_default(self):
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1')
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_staff_can_read_metrics(self):
+        self.client.force_login(get_user_model().objects.create_user('manager', is_staff=True))
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/plain', response['Content-Type'])
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_scraper_with_token_can_read_metrics(self):
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.5'])
+    def test_configured_addresses_are_trusted(self):
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.5').status_code, 200)
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.6').status_code, 403)
+
+
+class QueryBudgetTest(TestCase):
+    def setUp(self):
+        menu_cache.clear()
+        geodata_functions._coordinates_cache.clear()
+        # the data of `check_query_budgets`, archive pages are measured with archived orders
+        perf_tools.seed_dataset(restaurants=8, products=20, orders=40)
+        refresh_sales_rollups()
+        finished = archive.archivable_orders(timezone.now()).order_by('pk').values_list('pk', flat=True)
+        archive.archive_batch(list(finished[:10]))
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@example.com', 'password'))
+
+    def test_pages_stay_within_their_budgets(self):
+        with perf_tools.stub_geocoder():
+            pages = list(measure_pages(self.client))
+
+        self.assertTrue(pages)
+        for path, response, queries, budget in pages:
+            with self.subTest(path=path):
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(queries, budget)
+
+
+class HistogramTest(SimpleTestCase):
+    def test_quantiles_are_bucket_upper_bounds(self):
+        buckets = (1, 5, 10)
+        state = metrics.histogram_state(buckets)
+        for value in (0.5, 1, 3, 5, 7, 20):
+            metrics.observe_histogram(buckets, state, value)
+
+        # a value equal to a bound goes to its bucket, values above the last bound only to the totals
+        self.assertEqual(state, [2, 2, 1, 36.5, 6])
+        self.assertEqual(metrics.histogram_quantile(buckets, state, 0.5), 5)
+        self.assertEqual(metrics.histogram_quantile(buckets, state, 0.8), 10)
+        self.assertIsNone(metrics.histogram_quantile(buckets, state, 0.9))
+        self.assertIsNone(metrics.histogram_quantile(buckets, metrics.histogram_state(buckets), 0.5))
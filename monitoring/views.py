@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from monitoring import metrics
+
+
+def can_read_metrics(request):
+    """Staff, a scraper with `Authorization: Bearer <METRICS_TOKEN>` or an address from `METRICS_ALLOWED_IPS`."""
+    if request.user.is_staff:
+        return True
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    if settings.METRICS_TOKEN and constant_time_compare(authorization, f'Bearer {settings.METRICS_TOKEN}'):
+        return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics_view(request):
+    if not can_read_metrics(request):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
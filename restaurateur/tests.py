@@ -1,3 +1,152 @@
-from django.test import TestCase
+import datetime
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from foodcartapp import geodata_functions, menu_cache, perf_tools
+from foodcartapp.models import (GeocoderDailyUsage, MenuVersion, Order, OrderItem, Place, Product, Restaurant,
+                                RestaurantMenuItem)
+from foodcartapp.sales import refresh_sales_rollups
+from restaurateur import views
+
+
+class ViewOrdersTest(TestCase):
+    def setUp(self):
+        menu_cache.clear()
+        geodata_functions._coordinates_cache.clear()
+        restaurant = Restaurant.objects.create(
+            name='Арбат', address='Москва, Арбат, 1', latitude=55.75, longitude=37.59)
+        product = Product.objects.create(name='Чизбургер', price=250)
+        RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+        order = Order.objects.create(
+            firstname='Иван', lastname='Петров', phonenumber='+79001234567', address='Москва, Тверская, 1')
+        OrderItem.objects.create(order=order, product=product, quantity=1, price=250)
+        self.manager = get_user_model().objects.create_user('manager', password='password', is_staff=True)
+
+    def test_anonymous_user_is_sent_to_login(self):
+        response = self.client.get(reverse('restaurateur:view_orders'))
+
+        self.assertRedirects(response, f'{reverse("restaurateur:login")}?next={reverse("restaurateur:view_orders")}',
+                             fetch_redirect_response=False)
+
+    def test_not_staff_user_is_sent_to_login(self):
+        self.client.force_login(get_user_model().objects.create_user('customer', password='password'))
+
+        response = self.client.get(reverse('restaurateur:view_orders'))
+
+        self.assertEqual(response.status_code, 302)
+
+    def test_new_addresses_are_geocoded_and_stored(self):
+        self.client.force_login(self.manager)
+
+        with perf_tools.stub_geocoder():
+            response = self.client.get(reverse('restaurateur:view_orders'))
+
+        self.assertContains(response, 'Москва, Арбат, 1 - ')
+        self.assertContains(response, ' км')
+        self.assertEqual(
+            Place.objects.values_list('address', 'longitude', 'latitude').get(),
+            ('Москва, Тверская, 1', *map(float, perf_tools.fake_coordinates('Москва, Тверская, 1'))),
+        )
+        self.assertEqual(GeocoderDailyUsage.objects.get().requests, 1)
+
+
+class ToggleAvailabilityTest(TransactionTestCase):
+    # menu versions are bumped on commit
+
+    def setUp(self):
+        menu_cache.clear()
+        self.restaurants = [Restaurant.objects.create(name=name, address=f'Москва, {name}, 1')
+                            for name in ('Арбат', 'Тверская')]
+        self.products = [Product.objects.create(name=f'Бургер {number}', price=250) for number in range(3)]
+        for restaurant in self.restaurants:
+            for product in self.products:
+                RestaurantMenuItem.objects.create(restaurant=restaurant, product=product)
+        self.client.force_login(get_user_model().objects.create_user('manager', password='password', is_staff=True))
+
+    def toggle(self, data):
+        return self.client.post(reverse('restaurateur:toggle_availability'), data)
+
+    def available_cells(self):
+        return set(RestaurantMenuItem.objects.filter(availability=True).values_list('product_id', 'restaurant_id'))
+
+    def test_selected_cells_are_updated_with_one_query_per_batch(self):
+        cells = [f'{product.id}:{self.restaurants[0].id}' for product in self.products]
+
+        # session, user, BEGIN, an UPDATE per batch of two cells and a menu version bump per batch on commit
+        with mock.patch.object(views, 'SELECTION_BATCH_SIZE', 2), self.assertNumQueries(7), \
+                CaptureQueriesContext(connection) as queries:
+            response = self.toggle({'disable': 'selected', 'cell': cells})
+
+        self.assertRedirects(response, reverse('restaurateur:ProductsView'), fetch_redirect_response=False)
+        menu_updates = [query for query in queries.captured_queries
+                        if query['sql'].startswith('UPDATE "foodcartapp_restaurantmenuitem"')]
+        self.assertEqual(len(menu_updates), 2)
+        self.assertEqual(self.available_cells(), {(product.id, self.restaurants[1].id) for product in self.products})
+
+    def test_whole_restaurant_is_switched(self):
+        self.toggle({'disable': f'restaurant:{self.restaurants[1].id}'})
+
+        self.assertEqual(self.available_cells(), {(product.id, self.restaurants[0].id) for product in self.products})
+
+    def test_malformed_cell_is_rejected(self):
+        for cell in ('1', '1:x', ':1', '1:2:3', '-1:2'):
+            with self.subTest(cell=cell):
+                response = self.toggle({'disable': 'selected', 'cell': [f'{self.products[0].id}:1', cell]})
+
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.available_cells()), 6)
+
+    def test_not_staff_user_can_not_change_the_menu(self):
+        self.client.force_login(get_user_model().objects.create_user('customer', password='password'))
+
+        response = self.toggle({'disable': f'restaurant:{self.restaurants[0].id}'})
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(reverse('restaurateur:login')))
+        self.assertEqual(len(self.available_cells()), 6)
+
+    def test_change_bumps_the_menu_version(self):
+        version = menu_cache.current_menu_version()
+
+        self.toggle({'disable': f'product:{self.products[0].id}'})
+        self.assertEqual(MenuVersion.objects.get().version, version + 1)
+
+        # nothing changes, so the cached menus stay valid
+        self.toggle({'disable': f'product:{self.products[0].id}'})
+        self.assertEqual(MenuVersion.objects.get().version, version + 1)
+
+
+class ViewDeliveryStatsTest(TestCase):
+    def setUp(self):
+        restaurant = Restaurant.objects.create(name='Арбат', address='Москва, Арбат, 1')
+        self.day = timezone.localdate() - datetime.timedelta(days=1)
+        created = timezone.make_aware(datetime.datetime.combine(self.day, datetime.time(12)))
+        # minutes to call and to deliver
+        for call, delivery in [(4, 28), (8, 33), (12, 44), (50, 200)]:
+            Order.objects.create(
+                firstname='Иван', lastname='Петров', phonenumber='+79001234567', address='Москва, Тверская, 1',
+                restaurant=restaurant, created=created, called=created + datetime.timedelta(minutes=call),
+                delivered=created + datetime.timedelta(minutes=delivery))
+        refresh_sales_rollups()
+        self.client.force_login(get_user_model().objects.create_user('manager', password='password', is_staff=True))
+
+    def test_percentiles_are_shown(self):
+        response = self.client.get(reverse('restaurateur:view_delivery_stats'))
+
+        row = '<tr><td>{}</td><td>4</td><td>до 10</td><td>до 60</td><td>4</td><td>до 35</td><td>дольше</td></tr>'
+        self.assertContains(response, row.format('Арбат'), html=True)
+        self.assertContains(response, row.format('12:00'), html=True)
+
+    def test_days_outside_the_period_are_not_shown(self):
+        day = self.day - datetime.timedelta(days=1)
+
+        response = self.client.get(reverse('restaurateur:view_delivery_stats'), {'since': day, 'until': day})
+
+        self.assertNotContains(response, 'Арбат')
+        self.assertContains(response, 'Заказов нет', count=2)
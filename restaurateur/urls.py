@@ -9,11 +9,19 @@ urlpatterns = [
     path('', lambda request: redirect('restaurateur:ProductsView')),
 
     path('products/', views.view_products, name="ProductsView"),
+    path('products/availability/', views.toggle_availability, name="toggle_availability"),
 
     path('restaurants/', views.view_restaurants, name="RestaurantView"),
 
     # TODO заглушка для нереализованного функционала
     path('orders/', views.view_orders, name="view_orders"),
+    path('orders/assign/', views.assign_orders, name="assign_orders"),
+    path('couriers/', views.view_courier_runs, name="view_courier_runs"),
+
+    path('sales/', views.view_sales, name="view_sales"),
+    path('delivery/', views.view_delivery_stats, name="view_delivery_stats"),
+
+    path('geocoder/', views.view_geocoder, name="view_geocoder"),
 
     path('login/', views.LoginView.as_view(), name="login"),
     path('logout/', views.LogoutView.as_view(), name="logout"),
@@ -1,12 +1,32 @@
+import datetime
+import functools
+import operator
+
+from asgiref.sync import sync_to_async
 from django import forms
+from django.conf import settings
+from django.contrib import messages
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 from django.contrib.auth.decorators import user_passes_test
+from django.db import transaction
+from django.db.models import Q
+from django.http import HttpResponseBadRequest
 from django.shortcuts import redirect, render
 from django.urls import reverse_lazy
+from django.utils import timezone
 from django.views import View
+from django.views.decorators.http import require_POST
 
-from foodcartapp.models import Order, Product, Restaurant
+from foodcartapp import courier_batching, geodata_functions
+from foodcartapp.assignment import assign_new_orders
+from foodcartapp.delivery_stats import delivery_report
+from foodcartapp.sales import sales_report
+from foodcartapp.models import (GeocoderDailyUsage, Order, Product, Restaurant,
+                                RestaurantMenuItem)
+from monitoring import metrics
+from monitoring.query_budget import query_budget
+from star_burger.db_router import read_from_replica
 
 
 class Login(forms.Form):
@@ -61,19 +81,33 @@ def is_manager(user):
     return user.is_staff  # FIXME replace with specific permission
 
 
+def manager_required(view):
+    """`user_passes_test(is_manager)` for async views, Django 3.1 decorators wrap only sync ones."""
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # the user is loaded from the session lazily, with database queries
+        if not await sync_to_async(is_manager)(request.user):
+            return auth_views.redirect_to_login(request.get_full_path(), 'restaurateur:login')
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@query_budget(7)
 @user_passes_test(is_manager, login_url='restaurateur:login')
+@read_from_replica
 def view_products(request):
     restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
+    products = list(Product.objects.select_related('category').prefetch_related('menu_items'))
 
-    default_availability = {restaurant.id: False for restaurant in restaurants}
+    # None marks products that are not on the restaurant menu at all
+    default_availability = {restaurant.id: None for restaurant in restaurants}
     products_with_restaurants = []
     for product in products:
         availability = {
             **default_availability,
             **{item.restaurant_id: item.availability for item in product.menu_items.all()},
         }
-        orderer_availability = [availability[restaurant.id]
+        orderer_availability = [(restaurant, availability[restaurant.id])
                                 for restaurant in restaurants]
 
         products_with_restaurants.append(
@@ -86,6 +120,50 @@ def view_products(request):
     })
 
 
+# (product, restaurant) pairs per UPDATE, keeps the WHERE clause under the SQLite limits
+SELECTION_BATCH_SIZE = 300
+
+
+def parse_selected_cells(values):
+    cells = []
+    for value in values:
+        product_id, _, restaurant_id = value.partition(':')
+        if not product_id.isdigit() or not restaurant_id.isdigit():
+            return None
+        cells.append((int(product_id), int(restaurant_id)))
+    return cells
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+@require_POST
+def toggle_availability(request):
+    available = 'enable' in request.POST
+    scope, _, target_id = request.POST.get('enable' if available else 'disable', '').partition(':')
+
+    if scope in ('restaurant', 'product') and target_id.isdigit():
+        menu_items = RestaurantMenuItem.objects.filter(**{f'{scope}_id': int(target_id)})
+        updated = menu_items.set_availability(available)
+    elif scope == 'selected':
+        cells = parse_selected_cells(request.POST.getlist('cell'))
+        if cells is None:
+            return HttpResponseBadRequest('Invalid cell')
+        updated = 0
+        with transaction.atomic():
+            for start in range(0, len(cells), SELECTION_BATCH_SIZE):
+                condition = functools.reduce(operator.or_, [
+                    Q(product_id=product_id, restaurant_id=restaurant_id)
+                    for product_id, restaurant_id in cells[start:start + SELECTION_BATCH_SIZE]
+                ])
+                updated += RestaurantMenuItem.objects.filter(condition).set_availability(available)
+    else:
+        return HttpResponseBadRequest('Unknown availability change')
+
+    action = 'Включено' if available else 'Выключено'
+    messages.success(request, f'{action} позиций меню: {updated}')
+    return redirect('restaurateur:ProductsView')
+
+
+@query_budget(4)
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_restaurants(request):
     return render(request, template_name="restaurants_list.html", context={
@@ -93,9 +171,120 @@ def view_restaurants(request):
     })
 
 
-@user_passes_test(is_manager, login_url='restaurateur:login')
-def view_orders(request):
-    return render(request, template_name='order_items.html', context={
-        'order_items': Order.objects.total_price().fetch_restaurants(),
+@query_budget(9)
+@manager_required
+@read_from_replica
+async def view_orders(request):
+    orders = Order.objects.select_related('restaurant')
+    addresses = await sync_to_async(list)(orders.values_list('address', flat=True).distinct())
+    # the worker serves other requests while the geocoder answers
+    coordinates = await geodata_functions.get_coordinates_for_addresses_async(settings.YANDEX_API_KEY, addresses)
+    return await sync_to_async(render)(request, template_name='order_items.html', context={
+        'order_items': await sync_to_async(orders.fetch_restaurants)(coordinates),
         'opts': Order._meta
     })
+
+
+class PeriodForm(forms.Form):
+    since = forms.DateField(label='С', required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    until = forms.DateField(label='По', required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+
+def get_period(request, days=7):
+    """Form and the days chosen in it, the last `days` days by default."""
+    until = timezone.localdate()
+    since = until - datetime.timedelta(days=days - 1)
+    form = PeriodForm(request.GET or None)
+    if form.is_valid():
+        since = form.cleaned_data['since'] or since
+        until = form.cleaned_data['until'] or until
+    return form, since, until
+
+
+@query_budget(5)
+@user_passes_test(is_manager, login_url='restaurateur:login')
+@read_from_replica
+def view_sales(request):
+    form, since, until = get_period(request)
+    return render(request, template_name='sales_report.html', context={
+        'form': form,
+        'since': since,
+        'until': until,
+        **sales_report(since, until),
+    })
+
+
+@query_budget(3)
+@user_passes_test(is_manager, login_url='restaurateur:login')
+@read_from_replica
+def view_delivery_stats(request):
+    form, since, until = get_period(request)
+    report = delivery_report(since, until)
+    return render(request, template_name='delivery_stats.html', context={
+        'form': form,
+        'since': since,
+        'until': until,
+        'quantiles': report['quantiles'],
+        'sections': [('По ресторанам', report['restaurants']), ('По часам', report['hours'])],
+    })
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+@require_POST
+def assign_orders(request):
+    report = assign_new_orders()
+    messages.success(request, f'Назначено заказов: {len(report.assigned)}, суммарно {report.total_distance:.1f} км')
+    not_assigned = report.without_restaurants + report.without_coordinates + report.without_capacity
+    if not_assigned:
+        messages.warning(
+            request,
+            f'Не назначено заказов: {not_assigned}. Нет ресторана со всеми товарами: {report.without_restaurants}, '
+            f'не найден адрес: {report.without_coordinates}, не хватило вместимости: {report.without_capacity}')
+    return redirect('restaurateur:view_orders')
+
+
+@query_budget(5)
+@user_passes_test(is_manager, login_url='restaurateur:login')
+@read_from_replica
+def view_courier_runs(request):
+    runs, unplaced = courier_batching.plan_courier_runs()
+    return render(request, template_name='courier_runs.html', context={
+        'runs': runs,
+        'unplaced': unplaced,
+        'max_stops': courier_batching.MAX_STOPS,
+        'ready_window': courier_batching.READY_WINDOW_MINUTES,
+        'max_minutes': courier_batching.MAX_RUN_MINUTES,
+        'opts': Order._meta,
+    })
+
+
+@query_budget(6)
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_geocoder(request):
+    collected = metrics.collect()
+    counters = [
+        (metric.documentation, collected[metric.name].get((), 0))
+        for metric in [
+            geodata_functions.GEOCODER_LOOKUPS,
+            geodata_functions.GEOCODER_CACHE_HITS,
+            geodata_functions.GEOCODER_DB_HITS,
+            geodata_functions.GEOCODER_API_CALLS,
+            geodata_functions.GEOCODER_HTTP_ERRORS,
+            geodata_functions.GEOCODER_EMPTY_RESULTS,
+        ]
+    ]
+    latency = geodata_functions.GEOCODER_LATENCY
+    latency_state = collected[latency.name].get(())
+    latency_quantiles = [
+        (f'p{int(quantile * 100)}', metrics.histogram_quantile(latency.buckets, latency_state, quantile))
+        for quantile in [0.5, 0.95, 0.99]
+    ]
+    daily_usage = GeocoderDailyUsage.objects.order_by('-date')[:30]
+
+    return render(request, template_name='geocoder_stats.html', context={
+        'counters': counters,
+        'latency_quantiles': latency_quantiles,
+        'daily_usage': daily_usage,
+        'daily_limit': settings.YANDEX_GEOCODER_DAILY_LIMIT,
+        'today_requests': geodata_functions.get_today_api_requests(),
+    })
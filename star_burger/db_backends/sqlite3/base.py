@@ -0,0 +1,29 @@
+"""SQLite backend tuned for concurrent writers.
+
+Enabled by `SQLITE_PRODUCTION_PROFILE`. Every new connection switches the
+database to WAL journaling and applies the pragmas below. Transactions
+start with BEGIN IMMEDIATE, so a writer waits for the write lock within
+the busy timeout instead of failing with "database is locked" when it
+upgrades a read transaction.
+"""
+from django.db.backends.sqlite3 import base
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = {**PRAGMAS, **self.settings_dict.get('PRAGMAS', {})}
+        for name, value in pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
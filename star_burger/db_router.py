@@ -0,0 +1,82 @@
+"""Send reads of selected views to replica databases, everything else to the primary.
+
+Replicas are listed in `DATABASE_REPLICAS`. Only views decorated with
+`read_from_replica` read from them. A request stays on the primary if it
+already wrote something, and so does a client during `REPLICA_PIN_SECONDS`
+after a successful unsafe request: `ReplicaPinningMiddleware` marks it with
+a cookie, so the client reads its own order even if a replica lags behind.
+"""
+import asyncio
+import contextvars
+import functools
+import random
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+PIN_COOKIE_NAME = 'pin_primary'
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS', 'TRACE'}
+
+# context variables are copied into sync_to_async threads, so async views
+# read from replicas as well
+_replica_reads = contextvars.ContextVar('replica_reads', default=None)
+
+
+class ReplicaReads:
+    def __init__(self, pinned):
+        self.pinned = pinned
+        # one replica per request, so its reads see a single state of the data
+        self.replica = random.choice(settings.DATABASE_REPLICAS) if settings.DATABASE_REPLICAS else None
+
+
+def read_from_replica(view):
+    """Let the view read from a replica unless the client is pinned to the primary."""
+    if asyncio.iscoroutinefunction(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            token = _replica_reads.set(ReplicaReads(pinned=is_pinned(request)))
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+    else:
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            token = _replica_reads.set(ReplicaReads(pinned=is_pinned(request)))
+            try:
+                return view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+    return wrapper
+
+
+def is_pinned(request):
+    return PIN_COOKIE_NAME in request.COOKIES
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _replica_reads.get()
+        if state is None or state.pinned:
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _replica_reads.get()
+        if state is not None:
+            state.pinned = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaPinningMiddleware(MiddlewareMixin):
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(PIN_COOKIE_NAME, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite='Lax')
+        return response
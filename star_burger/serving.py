@@ -0,0 +1,90 @@
+"""Serve collected static files and uploaded media.
+
+Static files are taken from `STATIC_ROOT`, preferring the `.br` and `.gz`
+variants written by `CompressedManifestStaticFilesStorage`. Fingerprinted
+names never change their content, so they are cached forever.
+
+Media are streamed by Django or, with `MEDIA_SERVE_MODE`, handed over to the
+web server: nginx gets an `X-Accel-Redirect` to `MEDIA_ACCEL_REDIRECT_PREFIX`,
+Apache and lighttpd get an `X-Sendfile` with the file path. Both headers
+carry percent-encoded paths: Django MIME-encodes non-ASCII header values,
+which the web servers do not decode.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+import urllib.parse
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/]+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate'
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def resolve_path(root, path):
+    path = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(root, path)
+    except SuspiciousFileOperation:
+        raise Http404(path)
+    if not os.path.isfile(full_path):
+        raise Http404(path)
+    return full_path
+
+
+def accepted_encodings(request):
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    return {part.split(';')[0].strip().lower() for part in header.split(',')}
+
+
+def serve_static(request, path):
+    full_path = resolve_path(settings.STATIC_ROOT, path)
+    stat = os.stat(full_path)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime, stat.st_size):
+        return HttpResponseNotModified()
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    served_path, content_encoding = full_path, None
+    accepted = accepted_encodings(request)
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.isfile(full_path + suffix):
+            served_path, content_encoding = full_path + suffix, encoding
+            break
+
+    response = FileResponse(open(served_path, 'rb'), content_type=content_type)
+    if content_encoding:
+        response['Content-Encoding'] = content_encoding
+    response['Vary'] = 'Accept-Encoding'
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if HASHED_NAME.search(path) else REVALIDATE_CACHE_CONTROL
+    return response
+
+
+def serve_media(request, path):
+    full_path = resolve_path(settings.MEDIA_ROOT, path)
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+
+    if settings.MEDIA_SERVE_MODE == 'x-accel-redirect':
+        relative_path = os.path.relpath(full_path, settings.MEDIA_ROOT).replace(os.sep, '/')
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_PREFIX + urllib.parse.quote(relative_path)
+        return response
+    if settings.MEDIA_SERVE_MODE == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = urllib.parse.quote(full_path)
+        return response
+
+    stat = os.stat(full_path)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime, stat.st_size):
+        return HttpResponseNotModified()
+    response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    return response
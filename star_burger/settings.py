@@ -18,6 +18,7 @@ ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', ['127.0.0.1', 'localhost'])
 INSTALLED_APPS = [
     'foodcartapp.apps.FoodcartappConfig',
     'restaurateur.apps.RestaurateurConfig',
+    'monitoring.apps.MonitoringConfig',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -30,7 +31,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'monitoring.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'star_burger.db_router.ReplicaPinningMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -76,9 +79,12 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'star_burger.wsgi.application'
+ASGI_APPLICATION = 'star_burger.asgi.application'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+MEDIA_SERVE_MODE = env('MEDIA_SERVE_MODE', 'django')
+MEDIA_ACCEL_REDIRECT_PREFIX = env('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
 
 DATABASES = {
     'default': dj_database_url.config(
@@ -86,6 +92,28 @@ DATABASES = {
     )
 }
 
+for number, replica_url in enumerate(env.list('DATABASE_REPLICA_URLS', []), start=1):
+    DATABASES[f'replica_{number}'] = {
+        **dj_database_url.parse(replica_url),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['star_burger.db_router.PrimaryReplicaRouter']
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', 10)
+
+if env.bool('SQLITE_PRODUCTION_PROFILE', False):
+    for database in DATABASES.values():
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            continue
+        database.update({
+            'ENGINE': 'star_burger.db_backends.sqlite3',
+            'CONN_MAX_AGE': env.int('CONN_MAX_AGE', 600),
+            'OPTIONS': {
+                'timeout': env.int('SQLITE_BUSY_TIMEOUT', 20),
+            },
+        })
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -113,6 +141,9 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+if not DEBUG:
+    STATICFILES_STORAGE = 'star_burger.storage.CompressedManifestStaticFilesStorage'
+
 INTERNAL_IPS = [
     '127.0.0.1'
 ]
@@ -124,3 +155,22 @@ STATICFILES_DIRS = [
 ]
 
 YANDEX_API_KEY = env('YANDEX_API_KEY', None)
+YANDEX_GEOCODER_DAILY_LIMIT = env.int('YANDEX_GEOCODER_DAILY_LIMIT', 1000)
+GEOCODER_CACHE_TTL = env.int('GEOCODER_CACHE_TTL', 3600)
+GEOCODER_CACHE_SIZE = env.int('GEOCODER_CACHE_SIZE', 10000)
+GEOCODER_NOT_FOUND_RETRY_DAYS = env.int('GEOCODER_NOT_FOUND_RETRY_DAYS', 7)
+GEOCODER_CONCURRENCY = env.int('GEOCODER_CONCURRENCY', 10)
+GEOCODER_TIMEOUT = env.float('GEOCODER_TIMEOUT', 10)
+# latency of the local geocoder stub of the load tests and benchmarks
+STUB_GEOCODER_DELAY_MS = env.int('STUB_GEOCODER_DELAY_MS', 0)
+
+MENU_VERSION_CHECK_INTERVAL = env.float('MENU_VERSION_CHECK_INTERVAL', 0.5)
+
+ORDER_INTAKE_BUFFER = env('ORDER_INTAKE_BUFFER', None)
+ORDER_ARCHIVE_AFTER_DAYS = env.int('ORDER_ARCHIVE_AFTER_DAYS', 90)
+
+METRICS_DIR = env('METRICS_DIR', None)
+METRICS_FLUSH_INTERVAL = env.float('METRICS_FLUSH_INTERVAL', 1)
+# behind a reverse proxy every request comes from its address, so no IP is trusted by default
+METRICS_ALLOWED_IPS = env.list('METRICS_ALLOWED_IPS', [])
+METRICS_TOKEN = env('METRICS_TOKEN', None)
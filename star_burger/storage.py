@@ -0,0 +1,56 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.map', '.json', '.svg', '.html', '.txt', '.xml', '.ico'}
+
+
+def compress_file(path):
+    """Write `.gz` and, when brotli is installed, `.br` next to the file.
+
+    A variant is kept only if it is smaller than the original.
+    """
+    with open(path, 'rb') as source:
+        content = source.read()
+    compressors = [('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli:
+        compressors.append(('.br', brotli.compress))
+
+    written = []
+    for suffix, compress in compressors:
+        compressed = compress(content)
+        if len(compressed) >= len(content):
+            continue
+        with open(path + suffix, 'wb') as variant:
+            variant.write(compressed)
+        written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Fingerprint static files and precompress the text ones at `collectstatic` time.
+
+    Names without a manifest entry fall back to the original name, so pages
+    still render before the first `collectstatic`.
+    """
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS and self.exists(name):
+                compress_file(self.path(name))
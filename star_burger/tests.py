@@ -0,0 +1,103 @@
+import gzip
+import json
+import os
+import tempfile
+import urllib.parse
+
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from star_burger import serving, storage
+
+CSS = 'body { color: #333; }\n' * 50
+
+
+class ServeMediaTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.media_root = os.path.join(directory.name, 'media')
+        os.makedirs(os.path.join(self.media_root, 'variants'))
+        with open(os.path.join(self.media_root, 'variants', 'чизбургер 100.jpg'), 'wb') as image:
+            image.write(b'jpeg')
+        # a file outside the media root that a crafted path could reach
+        with open(os.path.join(directory.name, 'secret.txt'), 'w') as secret:
+            secret.write('secret')
+
+    def serve(self, path):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            return serving.serve_media(RequestFactory().get('/media/' + path), path)
+
+    def test_media_is_streamed_by_default(self):
+        with override_settings(MEDIA_SERVE_MODE='django'):
+            response = self.serve('variants/чизбургер 100.jpg')
+
+        self.assertEqual(b''.join(response.streaming_content), b'jpeg')
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel-redirect', MEDIA_ACCEL_REDIRECT_PREFIX='/protected-media/')
+    def test_accel_redirect_path_is_percent_encoded(self):
+        response = self.serve('variants/чизбургер 100.jpg')
+
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/variants/%D1%87%D0%B8%D0%B7%D0%B1%D1%83%D1%80%D0%B3%D0%B5%D1%80%20100.jpg')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SERVE_MODE='x-sendfile')
+    def test_sendfile_path_is_percent_encoded(self):
+        response = self.serve('variants/чизбургер 100.jpg')
+
+        self.assertEqual(response['X-Sendfile'], urllib.parse.quote(os.path.join(self.media_root, 'variants')) +
+                         '/%D1%87%D0%B8%D0%B7%D0%B1%D1%83%D1%80%D0%B3%D0%B5%D1%80%20100.jpg')
+
+    def test_paths_outside_the_media_root_are_rejected(self):
+        for mode in ('django', 'x-accel-redirect', 'x-sendfile'):
+            for path in ('../secret.txt', 'variants/../../secret.txt', '/../secret.txt', 'variants/missing.jpg'):
+                with self.subTest(mode=mode, path=path), override_settings(MEDIA_SERVE_MODE=mode):
+                    with self.assertRaises(Http404):
+                        self.serve(path)
+
+
+class CompressedManifestStaticFilesStorageTest(SimpleTestCase):
+    def setUp(self):
+        source_directory = tempfile.TemporaryDirectory()
+        static_root = tempfile.TemporaryDirectory()
+        self.addCleanup(source_directory.cleanup)
+        self.addCleanup(static_root.cleanup)
+        self.static_root = static_root.name
+        with open(os.path.join(source_directory.name, 'site.css'), 'w') as css:
+            css.write(CSS)
+        with open(os.path.join(source_directory.name, 'logo.png'), 'wb') as png:
+            png.write(b'\x89PNG' * 100)
+        settings = override_settings(
+            STATICFILES_DIRS=[source_directory.name],
+            STATIC_ROOT=self.static_root,
+            STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder'],
+            STATICFILES_STORAGE='star_burger.storage.CompressedManifestStaticFilesStorage',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(self.static_root, 'staticfiles.json')) as manifest:
+            self.paths = json.load(manifest)['paths']
+
+    def test_text_files_are_fingerprinted_and_precompressed(self):
+        hashed_name = self.paths['site.css']
+        self.assertRegex(hashed_name, serving.HASHED_NAME)
+        with gzip.open(os.path.join(self.static_root, hashed_name + '.gz'), 'rt') as compressed:
+            self.assertEqual(compressed.read(), CSS)
+        self.assertEqual(os.path.isfile(os.path.join(self.static_root, hashed_name + '.br')), bool(storage.brotli))
+
+    def test_binary_files_are_not_compressed(self):
+        self.assertFalse(os.path.exists(os.path.join(self.static_root, self.paths['logo.png'] + '.gz')))
+
+    def test_fingerprinted_file_is_served_compressed_and_cached_forever(self):
+        hashed_name = self.paths['site.css']
+        with override_settings(STATIC_ROOT=self.static_root):
+            response = serving.serve_static(
+                RequestFactory().get('/static/' + hashed_name, HTTP_ACCEPT_ENCODING='gzip, deflate'), hashed_name)
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Cache-Control'], serving.IMMUTABLE_CACHE_CONTROL)
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)).decode(), CSS)
@@ -14,20 +14,29 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 
 """
-from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, include, re_path
 from django.shortcuts import render
 
+from monitoring.views import metrics_view
+
 from . import settings
+from .serving import serve_media, serve_static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('', render, kwargs={'template_name': 'index.html'}, name='start_page'),
     path('api/', include('foodcartapp.urls')),
     path('manager/', include('restaurateur.urls')),
-    path('api-auth/', include('rest_framework.urls'))
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('api-auth/', include('rest_framework.urls')),
+    path('metrics', metrics_view, name='metrics'),
+    re_path(r'^{}(?P<path>.*)$'.format(settings.MEDIA_URL.lstrip('/')), serve_media, name='media'),
+]
+
+if not settings.DEBUG:
+    urlpatterns += [
+        re_path(r'^{}(?P<path>.*)$'.format(settings.STATIC_URL.lstrip('/')), serve_static, name='static'),
+    ]
 
 if settings.DEBUG:
     import debug_toolbar